@@ -8,4 +8,10 @@ echo "PostgreSQL started"
 echo "Waiting for server to RUN"
 cd /app/src
 python3 manage.py migrate --noinput
-python3 manage.py  runserver 0.0.0.0:8000
\ No newline at end of file
+python3 manage.py createcachetable
+if [ "$SERVER_MODE" = "asgi" ]; then
+  # Async views (task-manager/api/v1/async/...) run on the event loop.
+  python3 -m uvicorn freshteam.asgi:application --host 0.0.0.0 --port 8000 --workers ${WEB_CONCURRENCY:-1}
+else
+  python3 manage.py  runserver 0.0.0.0:8000
+fi
\ No newline at end of file
@@ -13,4 +13,10 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'freshteam.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Imported once Django is set up.
+from taskmanager.push import router  # noqa: E402
+
+# Task events (SSE and WebSocket) are served next to the Django views.
+application = router(django_application)
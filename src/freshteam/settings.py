@@ -45,6 +45,10 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Optional, enabled with REQUEST_TIMING=1 (see below).
+    'taskmanager.middleware.RequestTimingMiddleware',
+    # Optional, enabled when read replicas are configured (see below).
+    'taskmanager.middleware.ReplicaRoutingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -85,9 +89,57 @@ DATABASES = {
         "PASSWORD": os.environ.get("SQL_PASSWORD", "password"),
         "HOST": os.environ.get("SQL_HOST", "localhost"),
         "PORT": os.environ.get("SQL_PORT", "5432"),
+        "CONN_MAX_AGE": int(os.environ.get("SQL_CONN_MAX_AGE", 0)),
     }
 }
 
+# Connection pooling (taskmanager.pool), enabled with SQL_POOL=1 for the
+# PostgreSQL and SQLite backends. Each worker process then opens at most
+# SQL_POOL_MAX_SIZE connections per database, reused by every request thread
+# and closed after SQL_POOL_MAX_AGE seconds; a request waits up to
+# SQL_POOL_TIMEOUT seconds for a free one. Idle connections are checked with
+# a "SELECT 1" before reuse unless SQL_POOL_PRE_PING=0. Keep SQL_CONN_MAX_AGE
+# at 0 with the pool, so connections go back to it after each request.
+POOLED_ENGINES = {
+    "django.db.backends.postgresql": "taskmanager.backends.postgresql",
+    "django.db.backends.sqlite3": "taskmanager.backends.sqlite3",
+}
+if os.environ.get("SQL_POOL", "0") == "1":
+    DATABASES["default"]["ENGINE"] = POOLED_ENGINES.get(
+        DATABASES["default"]["ENGINE"], DATABASES["default"]["ENGINE"]
+    )
+DATABASES["default"]["POOL"] = {
+    "MAX_SIZE": int(os.environ.get("SQL_POOL_MAX_SIZE", 10)),
+    "MAX_AGE": int(os.environ.get("SQL_POOL_MAX_AGE", 1800)),
+    "TIMEOUT": float(os.environ.get("SQL_POOL_TIMEOUT", 10)),
+    "PRE_PING": os.environ.get("SQL_POOL_PRE_PING", "1") == "1",
+}
+
+# Read replicas of the default database, as a comma separated list of hosts in
+# SQL_REPLICA_HOSTS, they share the other settings of "default". Reads of safe
+# requests go to a replica (taskmanager.routers), a client that just wrote is
+# pinned to the primary for REPLICA_PIN_SECONDS.
+READ_REPLICAS = []
+for index, host in enumerate(filter(None, os.environ.get("SQL_REPLICA_HOSTS", "").split(","))):
+    alias = "replica_{}".format(index + 1)
+    DATABASES[alias] = dict(DATABASES["default"], HOST=host.strip(), TEST={"MIRROR": "default"})
+    READ_REPLICAS.append(alias)
+
+# Project shards (taskmanager.sharding), as a comma separated list of hosts in
+# SQL_SHARD_HOSTS sharing the other settings of "default". Projects and their
+# tasks are spread over "default" and these shards, users stay in "default".
+# `manage.py move_project` moves a project to another shard.
+PROJECT_SHARDS = []
+for index, host in enumerate(filter(None, os.environ.get("SQL_SHARD_HOSTS", "").split(","))):
+    alias = "shard_{}".format(index + 1)
+    DATABASES[alias] = dict(DATABASES["default"], HOST=host.strip())
+    PROJECT_SHARDS.append(alias)
+if PROJECT_SHARDS:
+    PROJECT_SHARDS.insert(0, "default")
+
+DATABASE_ROUTERS = ["taskmanager.sharding.ShardRouter", "taskmanager.routers.ReplicaRouter"]
+REPLICA_PIN_SECONDS = int(os.environ.get("REPLICA_PIN_SECONDS", 5))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
@@ -132,3 +184,101 @@ STATIC_URL = '/static/'
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 AUTH_USER_MODEL = 'taskmanager.User'
+
+
+REST_FRAMEWORK = {
+    "DEFAULT_AUTHENTICATION_CLASSES": [
+        # First, so unauthenticated requests get a 401 asking for a token.
+        "taskmanager.authentication.SignedTokenAuthentication",
+        "rest_framework.authentication.SessionAuthentication",
+        "rest_framework.authentication.BasicAuthentication",
+    ],
+    # orjson backed JSON, with the stdlib as fallback (taskmanager.renderers).
+    "DEFAULT_RENDERER_CLASSES": [
+        "taskmanager.renderers.FastJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
+    "DEFAULT_PARSER_CLASSES": [
+        "taskmanager.renderers.FastJSONParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    ],
+}
+
+# Task events pushed by the ASGI application (taskmanager.events). With
+# several processes or hosts, set TASK_EVENTS_BACKEND to
+# "taskmanager.events.RedisBackend" and TASK_EVENTS_REDIS_URL. Clients more than
+# TASK_EVENTS_QUEUE_SIZE events behind are dropped.
+TASK_EVENTS_BACKEND = os.environ.get("TASK_EVENTS_BACKEND", "taskmanager.events.MemoryBackend")
+TASK_EVENTS_REDIS_URL = os.environ.get("TASK_EVENTS_REDIS_URL", "redis://localhost:6379/0")
+TASK_EVENTS_QUEUE_SIZE = int(os.environ.get("TASK_EVENTS_QUEUE_SIZE", 100))
+TASK_EVENTS_HEARTBEAT = float(os.environ.get("TASK_EVENTS_HEARTBEAT", 15))
+# Seconds between two checks of the access of a connected client, besides the
+# checks made when the members of its project change.
+TASK_EVENTS_ACCESS_CHECK = float(os.environ.get("TASK_EVENTS_ACCESS_CHECK", 60))
+
+# The "tokens" cache is a table of the default database, created by
+# `manage.py createcachetable`.
+CACHES = {
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+    "tokens": {
+        "BACKEND": "django.core.cache.backends.db.DatabaseCache",
+        "LOCATION": "taskmanager_token_cache",
+    },
+}
+
+# Signed access and refresh tokens (taskmanager.tokens), lifetimes in seconds.
+# TOKEN_DENY_LIST_CACHE is the alias of the cache holding revoked tokens, it
+# must be shared by all workers: the "tokens" database cache, or a memcached or
+# redis one (a local-memory cache is refused by `manage.py check`). Workers
+# remember a token id checked against it for TOKEN_DENY_LIST_CHECK_TTL seconds,
+# the delay before a token revoked by one worker is refused by the others.
+ACCESS_TOKEN_TTL = int(os.environ.get("ACCESS_TOKEN_TTL", 300))
+REFRESH_TOKEN_TTL = int(os.environ.get("REFRESH_TOKEN_TTL", 86400))
+TOKEN_DENY_LIST_CACHE = os.environ.get("TOKEN_DENY_LIST_CACHE", "tokens")
+TOKEN_DENY_LIST_CHECK_TTL = int(os.environ.get("TOKEN_DENY_LIST_CHECK_TTL", 5))
+TOKEN_USER_CACHE_SIZE = int(os.environ.get("TOKEN_USER_CACHE_SIZE", 10000))
+TOKEN_USER_CACHE_TTL = int(os.environ.get("TOKEN_USER_CACHE_TTL", 60))
+
+
+# Project membership lookups (taskmanager.membership)
+# MEMBERSHIP_SHARED_CACHE is the alias of a cache in CACHES shared by all
+# workers, e.g. a memcached or redis one.
+# Without it, the other processes only see a change of the members once their
+# entries expire: MEMBERSHIP_CACHE_TTL is 5 seconds by default then, else 30.
+MEMBERSHIP_CACHE_SIZE = int(os.environ.get("MEMBERSHIP_CACHE_SIZE", 10000))
+MEMBERSHIP_SHARED_CACHE = os.environ.get("MEMBERSHIP_SHARED_CACHE")
+MEMBERSHIP_CACHE_TTL = int(
+    os.environ.get("MEMBERSHIP_CACHE_TTL", 30 if MEMBERSHIP_SHARED_CACHE else 5)
+)
+
+
+# Server-side cache of task list pages, keyed by project version
+# (taskmanager.caching). Set TASK_LIST_CACHE to a cache alias to enable it.
+TASK_LIST_CACHE = os.environ.get("TASK_LIST_CACHE")
+TASK_LIST_CACHE_TIMEOUT = int(os.environ.get("TASK_LIST_CACHE_TIMEOUT", 300))
+
+# Seconds between two checks of a long-polled async task list
+# (taskmanager.async_views).
+TASK_LIST_POLL_INTERVAL = float(os.environ.get("TASK_LIST_POLL_INTERVAL", 1.0))
+
+
+# Idempotency-Key header of the task writes (taskmanager.idempotency): keys
+# are kept IDEMPOTENCY_KEY_TTL seconds (`manage.py purge_idempotency_keys`),
+# and a key claimed for more than IDEMPOTENCY_KEY_LOCK_TIMEOUT seconds without
+# a response is taken over.
+IDEMPOTENCY_KEY_TTL = int(os.environ.get("IDEMPOTENCY_KEY_TTL", 86400))
+IDEMPOTENCY_KEY_LOCK_TIMEOUT = int(os.environ.get("IDEMPOTENCY_KEY_LOCK_TIMEOUT", 60))
+
+# Background deletion of the projects deleted from the admin
+# (`manage.py reap_projects`, taskmanager.reaper): tasks deleted per
+# transaction and seconds of pause between two transactions.
+PROJECT_REAPER_BATCH_SIZE = int(os.environ.get("PROJECT_REAPER_BATCH_SIZE", 1000))
+PROJECT_REAPER_PAUSE = float(os.environ.get("PROJECT_REAPER_PAUSE", 0.1))
+
+
+# Per-request SQL and timing instrumentation (taskmanager.middleware).
+# Requests above one of the thresholds are logged on "taskmanager.timing".
+REQUEST_TIMING_ENABLED = os.environ.get("REQUEST_TIMING", "0") == "1"
+REQUEST_TIMING_SLOW_MS = float(os.environ.get("REQUEST_TIMING_SLOW_MS", 500))
+REQUEST_TIMING_MAX_QUERIES = int(os.environ.get("REQUEST_TIMING_MAX_QUERIES", 50))
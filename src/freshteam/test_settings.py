@@ -0,0 +1,25 @@
+"""
+Settings of `manage.py test`: the project settings, plus the databases the
+replica and sharding tests route to. Other tests don't use them, and the test
+runner only creates the databases of the tests it runs.
+"""
+import os
+import tempfile
+
+from freshteam.settings import *  # noqa: F401,F403
+from freshteam.settings import DATABASES
+
+
+# SQLite databases standing in for a replica and two more project shards,
+# created and migrated like the default one. Nothing replicates to the replica.
+for alias in ("replica", "shard_a", "shard_b"):
+    DATABASES.setdefault(
+        alias,
+        {
+            "ENGINE": "django.db.backends.sqlite3",
+            "NAME": os.path.join(tempfile.gettempdir(), f"freshteam_{alias}.sqlite3"),
+            "TEST": {
+                "NAME": os.path.join(tempfile.gettempdir(), f"test_freshteam_{alias}.sqlite3")
+            },
+        },
+    )
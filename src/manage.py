@@ -6,6 +6,9 @@ import sys
 
 def main():
     """Run administrative tasks."""
+    if sys.argv[1:2] == ['test']:
+        # The extra databases of the replica and sharding tests.
+        os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'freshteam.test_settings')
     os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'freshteam.settings')
     try:
         from django.core.management import execute_from_command_line
@@ -1,7 +1,93 @@
 from django.contrib import admin
+from django.core.exceptions import ValidationError
 
+from taskmanager import sharding
 from taskmanager.models import Project, Task, User
 
 admin.site.register(User)
-admin.site.register(Project)
-admin.site.register(Task)
\ No newline at end of file
+admin.site.register(Task)
+
+
+class ShardListFilter(admin.SimpleListFilter):
+    """
+    The shard whose projects are listed, the first one by default: a
+    queryset reads a single database.
+    """
+
+    title = "shard"
+    parameter_name = "shard"
+
+    def lookups(self, request, model_admin):
+        return [(database, database) for database in sharding.databases()]
+
+    def choices(self, changelist):
+        selected = self.value() or sharding.databases()[0]
+        for database, title in self.lookup_choices:
+            yield {
+                "selected": database == selected,
+                "query_string": changelist.get_query_string({self.parameter_name: database}),
+                "display": title,
+            }
+
+    def queryset(self, request, queryset):
+        databases = sharding.databases()
+        return queryset.using(self.value() if self.value() in databases else databases[0])
+
+
+@admin.register(Project)
+class ProjectAdmin(admin.ModelAdmin):
+    """
+    Deleting projects soft deletes them, their tasks are deleted in the
+    background by `manage.py reap_projects` (see `taskmanager.reaper`).
+
+    With `PROJECT_SHARDS`, the list shows one shard at a time and a project
+    is opened in its own shard.
+    """
+
+    list_display = ("id", "name", "deleted_at")
+    readonly_fields = ("version", "deleted_at")
+
+    def get_list_filter(self, request):
+        list_filter = [("deleted_at", admin.EmptyFieldListFilter)]
+        if len(sharding.databases()) > 1:
+            list_filter.insert(0, ShardListFilter)
+        return list_filter
+
+    def get_object(self, request, object_id, from_field=None):
+        field = self.model._meta.pk if from_field is None else self.model._meta.get_field(from_field)
+        try:
+            object_id = field.to_python(object_id)
+        except (ValidationError, ValueError):
+            return None
+        for database in sharding.databases():
+            project = (
+                self.get_queryset(request).using(database).filter(**{field.name: object_id}).first()
+            )
+            if project is not None:
+                return project
+        return None
+
+    def get_deleted_objects(self, objs, request):
+        # Not the cascade of every task to the confirmation page, it would
+        # load them all. The permissions are still those of the cascade: the
+        # reaper deletes the tasks.
+        objs = list(objs)
+        perms_needed = set()
+        if not all(self.has_delete_permission(request, project) for project in objs):
+            perms_needed.add(Project._meta.verbose_name)
+        task_admin = self.admin_site._registry.get(Task)
+        if task_admin is not None and not task_admin.has_delete_permission(request):
+            if any(
+                Task.objects.using(project._state.db).filter(project=project).exists()
+                for project in objs
+            ):
+                perms_needed.add(Task._meta.verbose_name)
+        projects = [str(project) for project in objs]
+        return projects, {Project._meta.verbose_name_plural: len(projects)}, perms_needed, []
+
+    def delete_model(self, request, obj):
+        obj.soft_delete()
+
+    def delete_queryset(self, request, queryset):
+        for project in queryset:
+            project.soft_delete()
@@ -4,3 +4,10 @@ from django.apps import AppConfig
 class TaskmanagerConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'taskmanager'
+
+    def ready(self):
+        from django.core import checks
+
+        from taskmanager import signals, tokens  # noqa: F401
+
+        checks.register(tokens.check_deny_list)
@@ -0,0 +1,116 @@
+import asyncio
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import Http404, HttpResponse, JsonResponse
+from rest_framework import status
+from rest_framework.exceptions import APIException, NotAuthenticated
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+from taskmanager import sharding
+from taskmanager.renderers import FastJSONRenderer
+from taskmanager.views import TaskView
+
+
+MAX_WAIT = 60
+
+
+def _authenticate(request):
+    """
+    Return None if the request is authenticated, else the `(detail, status,
+    headers)` DRF would answer. Runs in a worker thread: the session and
+    basic authenticators query the db.
+    """
+    try:
+        if request.user.is_authenticated:
+            return None
+        error = NotAuthenticated()
+    except APIException as exc:
+        error = exc
+    header = request.authenticators[0].authenticate_header(request) if request.authenticators else None
+    if header:
+        return error.detail, status.HTTP_401_UNAUTHORIZED, {"WWW-Authenticate": header}
+    return error.detail, status.HTTP_403_FORBIDDEN, {}
+
+
+def _read_task_list(request, project_id, assignee_id):
+    token = sharding.use_shard(sharding.database_for(project_id))
+    try:
+        return TaskView.read_task_list(
+            request, request.user, project_id, assignee_id, "application/json"
+        )
+    except Http404:
+        return {"detail": "Not found."}, status.HTTP_404_NOT_FOUND, {}
+    except APIException as exc:
+        return exc.detail, exc.status_code, {}
+    finally:
+        sharding.reset_shard(token)
+
+
+def _pop_wait(request):
+    """
+    Take the `wait` parameter out of the query string, so the ETag and the
+    Link header are the same as the ones of the sync list.
+    """
+    query = request.GET.copy()
+    wait = query.pop("wait", ["0"])[-1]
+    request.GET = query
+    request.META["QUERY_STRING"] = query.urlencode()
+    try:
+        wait = float(wait)
+    except ValueError:
+        return 0
+    return min(max(wait, 0), MAX_WAIT)
+
+
+async def project_tasks(request, project_id, assignee_id=None):
+    """
+    Async twin of `TaskView.list`, for ASGI deployments.
+
+    The database work runs in the sync thread pool one short step at a time,
+    the event loop is never blocked. With `wait=<seconds>` (at most 60) and
+    an `If-None-Match` header the request is held open, without a thread,
+    until the list changes or the time runs out, so one worker can serve
+    many slow polling clients.
+    """
+    if request.method != "GET":
+        return JsonResponse(
+            {"detail": f'Method "{request.method}" not allowed.'},
+            status=status.HTTP_405_METHOD_NOT_ALLOWED,
+        )
+    wait = _pop_wait(request)
+    request = Request(
+        request,
+        authenticators=[auth() for auth in api_settings.DEFAULT_AUTHENTICATION_CLASSES],
+    )
+    error = await sync_to_async(_authenticate)(request)
+    if error is not None:
+        detail, code, headers = error
+        response = JsonResponse({"detail": detail}, status=code)
+        for name, value in headers.items():
+            response[name] = value
+        return response
+
+    deadline = time.monotonic() + wait
+    interval = getattr(settings, "TASK_LIST_POLL_INTERVAL", 1.0)
+    while True:
+        data, code, headers = await sync_to_async(_read_task_list)(
+            request, project_id, assignee_id
+        )
+        remaining = deadline - time.monotonic()
+        if code != status.HTTP_304_NOT_MODIFIED or remaining <= 0:
+            break
+        await asyncio.sleep(min(interval, remaining))
+
+    if code == status.HTTP_304_NOT_MODIFIED:
+        response = HttpResponse(status=code)
+    else:
+        # Rendered like the sync list, for the same bytes.
+        response = HttpResponse(
+            FastJSONRenderer().render(data), status=code, content_type="application/json"
+        )
+    for name, value in headers.items():
+        response[name] = value
+    return response
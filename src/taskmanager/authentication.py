@@ -0,0 +1,62 @@
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+from rest_framework import authentication, exceptions
+
+from taskmanager import tokens
+from taskmanager.membership import LRUCache
+from taskmanager.models import User
+
+
+# The field values of the users authenticated by token, by id. Kept up to date
+# by the User signals in `taskmanager.signals`, but only in this process: other
+# processes see a change of role or a deactivation after `TOKEN_USER_CACHE_TTL`
+# seconds. Values, not instances: every request gets its own `User`, which the
+# threads serving the other requests can't see changed.
+users = LRUCache(
+    maxsize=getattr(settings, "TOKEN_USER_CACHE_SIZE", 10000),
+    ttl=getattr(settings, "TOKEN_USER_CACHE_TTL", 60),
+)
+
+_FIELDS = [field.attname for field in User._meta.concrete_fields]
+
+
+def get_user(user_id):
+    values = users.get(user_id)
+    if values is None:
+        values = User.objects.filter(pk=user_id).values_list(*_FIELDS).first()
+        if values is None:
+            return None
+        users.set(user_id, values)
+    return User.from_db(DEFAULT_DB_ALIAS, _FIELDS, values)
+
+
+class SignedTokenAuthentication(authentication.BaseAuthentication):
+    """
+    Authenticates `Authorization: Bearer <access token>` requests, see
+    `taskmanager.tokens`.
+
+    Once the user is cached this reads neither the session nor the user
+    table, and no CSRF check is needed as no cookie is involved.
+    """
+
+    keyword = "Bearer"
+
+    def authenticate(self, request):
+        header = authentication.get_authorization_header(request).split()
+        if not header or header[0].lower() != self.keyword.lower().encode():
+            return None
+        if len(header) != 2:
+            raise exceptions.AuthenticationFailed("Invalid token header.")
+
+        try:
+            claims = tokens.read_token(header[1].decode(), tokens.ACCESS)
+        except (tokens.InvalidToken, UnicodeError) as exc:
+            raise exceptions.AuthenticationFailed(str(exc))
+
+        user = get_user(claims["uid"])
+        if user is None or not user.is_active or user.user_role != claims["role"]:
+            raise exceptions.AuthenticationFailed("Invalid token.")
+        return user, claims
+
+    def authenticate_header(self, request):
+        return self.keyword
@@ -0,0 +1,9 @@
+from django.db.backends.postgresql import base
+
+from taskmanager.pool import PooledDatabaseWrapperMixin
+
+
+class DatabaseWrapper(PooledDatabaseWrapperMixin, base.DatabaseWrapper):
+    """
+    The PostgreSQL backend with the connections of `taskmanager.pool`.
+    """
@@ -0,0 +1,13 @@
+from django.db.backends.sqlite3 import base
+
+from taskmanager.pool import PooledDatabaseWrapperMixin
+
+
+class DatabaseWrapper(PooledDatabaseWrapperMixin, base.DatabaseWrapper):
+    """
+    The SQLite backend with the connections of `taskmanager.pool`. In-memory
+    databases live as long as their connection and are not pooled.
+    """
+
+    def use_pool(self):
+        return not self.is_in_memory_db()
@@ -0,0 +1,585 @@
+import itertools
+import json
+import os
+import statistics
+import tempfile
+import time
+
+from asgiref.sync import async_to_sync
+from asgiref.testing import ApplicationCommunicator
+from django.contrib.auth.hashers import make_password
+from django.core.signals import request_finished, request_started
+from django.db import close_old_connections, connection
+from django.db.backends.sqlite3.base import DatabaseWrapper
+from django.db.models import Prefetch
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.renderers import JSONRenderer
+
+from taskmanager import membership, pool, stats, tokens
+from taskmanager.backends.sqlite3.base import DatabaseWrapper as PooledDatabaseWrapper
+from taskmanager.models import Project, Task, User
+from taskmanager.renderers import FastJSONRenderer
+from taskmanager.rows import task_rows, task_values
+from taskmanager.serializers import TaskSerializer
+
+
+class Dataset:
+    """
+    Ids of a synthetic dataset seeded by `seed`.
+    """
+
+    def __init__(self, managers, projects, developers, tasks):
+        self.managers = managers
+        self.projects = projects
+        self.developers = developers
+        self.tasks = tasks
+        # Values prepared by the `Scenario.setup` hooks, by scenario name.
+        self.state = {}
+
+
+def seed(
+    managers=2,
+    projects_per_manager=2,
+    developers_per_project=10,
+    tasks_per_project=1000,
+    assignees_per_task=2,
+    batch_size=1000,
+):
+    """
+    Insert a synthetic dataset in bulk into an empty database.
+
+    Ids are assigned here, so `bulk_create` does not have to return them,
+    and every user shares one password hash ("pass") instead of paying the
+    hashing cost once per user.
+    """
+    password = make_password("pass")
+    ids = itertools.count(1)
+    users, projects, members, tasks, assignees = [], [], [], [], []
+    dataset = Dataset({}, [], {}, {})
+    Members = Project.developers.through
+    Assignees = Task.assignee.through
+
+    for m in range(managers):
+        manager = User(
+            id=next(ids), username=f"manager-{m}", password=password, user_role=User.MANAGER
+        )
+        users.append(manager)
+        for p in range(projects_per_manager):
+            project = Project(id=len(projects) + 1, name=f"project-{m}-{p}", manager=manager)
+            projects.append(project)
+            dataset.projects.append(project.id)
+            dataset.managers[project.id] = manager.id
+
+            developers = []
+            for d in range(developers_per_project):
+                developer = User(
+                    id=next(ids),
+                    username=f"developer-{project.id}-{d}",
+                    password=password,
+                    user_role=User.DEVELOPER,
+                )
+                users.append(developer)
+                developers.append(developer.id)
+                members.append(Members(project_id=project.id, user_id=developer.id))
+            dataset.developers[project.id] = developers
+
+            dataset.tasks[project.id] = []
+            for t in range(tasks_per_project):
+                task = Task(
+                    id=len(tasks) + 1,
+                    title=f"task {t} of project {project.id}",
+                    description=f"description of task {t}",
+                    is_done=t % 3 == 0,
+                    project_id=project.id,
+                    creator_id=manager.id,
+                )
+                tasks.append(task)
+                dataset.tasks[project.id].append(task.id)
+                for a in range(min(assignees_per_task, len(developers))):
+                    assignees.append(
+                        Assignees(task_id=task.id, user_id=developers[(t + a) % len(developers)])
+                    )
+
+    User.objects.bulk_create(users, batch_size=batch_size)
+    Project.objects.bulk_create(projects, batch_size=batch_size)
+    Members.objects.bulk_create(members, batch_size=batch_size)
+    Task.objects.bulk_create(tasks, batch_size=batch_size)
+    Assignees.objects.bulk_create(assignees, batch_size=batch_size)
+    stats.rebuild()
+    membership.index.clear()
+    return dataset
+
+
+class Scenario:
+    """
+    One request against one route of `taskmanager.urls`.
+
+    `request` is called with the client, the dataset, the project id and the
+    iteration number, and returns the response. The optional `setup` is
+    called once, out of the measurements, with the client, the dataset and
+    the project id; what it returns is kept in `dataset.state[name]`.
+    """
+
+    def __init__(self, name, route, request, setup=None):
+        self.name = name
+        self.route = route
+        self.request = request
+        self.setup = setup
+
+
+def _json(client, method, url, data):
+    return getattr(client, method)(url, json.dumps(data), content_type="application/json")
+
+
+def _get_etag(client, dataset, project_id):
+    return client.get(reverse("get_project_tasks", kwargs={"project_id": project_id}))["ETag"]
+
+
+def _not_modified(client, dataset, project_id, i):
+    return client.get(
+        reverse("get_project_tasks", kwargs={"project_id": project_id}),
+        HTTP_IF_NONE_MATCH=dataset.state["list_project_tasks_not_modified"],
+    )
+
+
+def _get_sync_cursor(client, dataset, project_id):
+    return client.get(reverse("get_project_tasks", kwargs={"project_id": project_id}))[
+        "X-Sync-Cursor"
+    ]
+
+
+def _sync(client, dataset, project_id, i):
+    return client.get(
+        reverse("get_project_tasks", kwargs={"project_id": project_id}),
+        {"since": dataset.state["sync_project_tasks"]},
+    )
+
+
+class _ASGIResponse:
+    streaming = False
+
+    def __init__(self, status_code, content):
+        self.status_code = status_code
+        self.content = content
+
+
+async def _open_event_stream(client, project_id):
+    from freshteam.asgi import application
+
+    url = reverse("project_task_events", kwargs={"project_id": project_id})
+    cookies = "; ".join(f"{name}={morsel.value}" for name, morsel in client.cookies.items())
+    stream = ApplicationCommunicator(
+        application,
+        {
+            "type": "http",
+            "method": "GET",
+            "path": url,
+            "root_path": "",
+            "query_string": b"",
+            "headers": [(b"host", b"testserver"), (b"cookie", cookies.encode())],
+        },
+    )
+    await stream.send_input({"type": "http.request", "body": b""})
+    start = await stream.receive_output(5)
+    content = b""
+    if start["status"] != 200:
+        content = (await stream.receive_output(5))["body"]
+    await stream.send_input({"type": "http.disconnect"})
+    await stream.wait(5)
+    return _ASGIResponse(start["status"], content)
+
+
+def _task_events(client, dataset, project_id, i):
+    # Served by the ASGI application only. Connections are kept open like
+    # the test client does, the dataset may live in a test transaction.
+    for signal in (request_started, request_finished):
+        signal.disconnect(close_old_connections)
+    try:
+        return async_to_sync(_open_event_stream)(client, project_id)
+    finally:
+        for signal in (request_started, request_finished):
+            signal.connect(close_old_connections)
+
+
+def _manager(client, dataset, project_id):
+    return User.objects.get(pk=dataset.managers[project_id])
+
+
+def _issue_tokens(client, dataset, project_id):
+    return tokens.issue_tokens(_manager(client, dataset, project_id))
+
+
+def _list_with_token(client, dataset, project_id, i):
+    return client.get(
+        reverse("get_project_tasks", kwargs={"project_id": project_id}),
+        HTTP_AUTHORIZATION="Bearer {}".format(
+            dataset.state["list_project_tasks_with_token"]["access"]
+        ),
+    )
+
+
+def _refresh_token(client, dataset, project_id, i):
+    # Refresh tokens are single use, every iteration uses the last one issued.
+    state = dataset.state["refresh_token"]
+    response = _json(client, "post", reverse("refresh_token"), {"token": state["refresh"]})
+    if response.status_code == 200:
+        state.update(response.json())
+    return response
+
+
+def _staff_client(client, dataset, project_id):
+    staff, _ = User.objects.get_or_create(username="benchmark-staff", defaults={"is_staff": True})
+    staff_client = Client()
+    staff_client.force_login(staff)
+    return staff_client
+
+
+SCENARIOS = [
+    Scenario(
+        "list_user_projects",
+        "get_user_projects",
+        lambda client, dataset, project_id, i: client.get(reverse("get_user_projects")),
+    ),
+    Scenario(
+        "list_project_tasks",
+        "get_project_tasks",
+        lambda client, dataset, project_id, i: client.get(
+            reverse("get_project_tasks", kwargs={"project_id": project_id})
+        ),
+    ),
+    Scenario(
+        "list_project_tasks_filtered",
+        "get_project_tasks",
+        lambda client, dataset, project_id, i: client.get(
+            reverse("get_project_tasks", kwargs={"project_id": project_id}),
+            {"is_done": "false", "ordering": "-title"},
+        ),
+    ),
+    Scenario(
+        "list_project_tasks_sparse",
+        "get_project_tasks",
+        lambda client, dataset, project_id, i: client.get(
+            reverse("get_project_tasks", kwargs={"project_id": project_id}),
+            {"fields": "id,title,is_done,assignee", "page_size": 1000},
+        ),
+    ),
+    Scenario(
+        "list_project_tasks_not_modified", "get_project_tasks", _not_modified, setup=_get_etag
+    ),
+    Scenario("sync_project_tasks", "get_project_tasks", _sync, setup=_get_sync_cursor),
+    Scenario(
+        "list_project_tasks_with_token",
+        "get_project_tasks",
+        _list_with_token,
+        setup=_issue_tokens,
+    ),
+    Scenario(
+        "list_assignee_tasks",
+        "get_project_assignee_tasks",
+        lambda client, dataset, project_id, i: client.get(
+            reverse(
+                "get_project_assignee_tasks",
+                kwargs={
+                    "project_id": project_id,
+                    "assignee_id": dataset.developers[project_id][0],
+                },
+            )
+        ),
+    ),
+    Scenario(
+        "async_list_project_tasks",
+        "async_get_project_tasks",
+        lambda client, dataset, project_id, i: client.get(
+            reverse("async_get_project_tasks", kwargs={"project_id": project_id})
+        ),
+    ),
+    Scenario(
+        "async_list_assignee_tasks",
+        "async_get_project_assignee_tasks",
+        lambda client, dataset, project_id, i: client.get(
+            reverse(
+                "async_get_project_assignee_tasks",
+                kwargs={
+                    "project_id": project_id,
+                    "assignee_id": dataset.developers[project_id][0],
+                },
+            )
+        ),
+    ),
+    Scenario("open_task_events", "project_task_events", _task_events),
+    Scenario(
+        "search_project_tasks",
+        "search_project_tasks",
+        lambda client, dataset, project_id, i: client.get(
+            reverse("search_project_tasks", kwargs={"project_id": project_id}),
+            {"q": f"task {i}"},
+        ),
+    ),
+    Scenario(
+        "export_project_tasks",
+        "export_project_tasks",
+        lambda client, dataset, project_id, i: client.get(
+            reverse("export_project_tasks", kwargs={"project_id": project_id})
+        ),
+    ),
+    Scenario(
+        "project_task_stats",
+        "project_task_stats",
+        lambda client, dataset, project_id, i: client.get(
+            reverse("project_task_stats", kwargs={"project_id": project_id})
+        ),
+    ),
+    Scenario(
+        "create_task",
+        "create_task",
+        lambda client, dataset, project_id, i: _json(
+            client,
+            "post",
+            reverse("create_task", kwargs={"project_id": project_id}),
+            {"title": f"new task {i}", "assignee": dataset.developers[project_id][:2]},
+        ),
+    ),
+    Scenario(
+        "update_task",
+        "update_task",
+        lambda client, dataset, project_id, i: _json(
+            client,
+            "put",
+            reverse(
+                "update_task",
+                kwargs={
+                    "project_id": project_id,
+                    "pk": dataset.tasks[project_id][i % len(dataset.tasks[project_id])],
+                },
+            ),
+            {"title": f"updated task {i}", "assignee": dataset.developers[project_id][-2:]},
+        ),
+    ),
+    Scenario(
+        "patch_task",
+        "update_task",
+        lambda client, dataset, project_id, i: _json(
+            client,
+            "patch",
+            reverse(
+                "update_task",
+                kwargs={
+                    "project_id": project_id,
+                    "pk": dataset.tasks[project_id][i % len(dataset.tasks[project_id])],
+                },
+            ),
+            {"is_done": bool(i % 2)},
+        ),
+    ),
+    Scenario(
+        "bulk_create_tasks",
+        "bulk_tasks",
+        lambda client, dataset, project_id, i: _json(
+            client,
+            "post",
+            reverse("bulk_tasks", kwargs={"project_id": project_id}),
+            {"tasks": [{"title": f"bulk task {i}-{n}"} for n in range(50)]},
+        ),
+    ),
+    Scenario(
+        "bulk_update_tasks",
+        "bulk_tasks",
+        lambda client, dataset, project_id, i: _json(
+            client,
+            "patch",
+            reverse("bulk_tasks", kwargs={"project_id": project_id}),
+            {"filter": {"ids": dataset.tasks[project_id][:100]}, "is_done": bool(i % 2)},
+        ),
+    ),
+    Scenario(
+        "signup",
+        "signup",
+        lambda client, dataset, project_id, i: _json(
+            client,
+            "post",
+            reverse("signup"),
+            {"username": f"signup-{i}", "password": "pass", "user_role": User.DEVELOPER},
+        ),
+    ),
+    Scenario(
+        "obtain_token",
+        "obtain_token",
+        lambda client, dataset, project_id, i: _json(
+            client,
+            "post",
+            reverse("obtain_token"),
+            {"username": dataset.state["obtain_token"].username, "password": "pass"},
+        ),
+        setup=_manager,
+    ),
+    Scenario("refresh_token", "refresh_token", _refresh_token, setup=_issue_tokens),
+    Scenario(
+        "revoke_token",
+        "revoke_token",
+        lambda client, dataset, project_id, i: _json(
+            client,
+            "post",
+            reverse("revoke_token"),
+            {"token": tokens.make_token(dataset.state["revoke_token"], tokens.ACCESS)},
+        ),
+        setup=_manager,
+    ),
+    Scenario(
+        "db_pool_stats",
+        "db_pool_stats",
+        lambda client, dataset, project_id, i: dataset.state["db_pool_stats"].get(
+            reverse("db_pool_stats")
+        ),
+        setup=_staff_client,
+    ),
+]
+
+
+def _percentile(values, percent):
+    ordered = sorted(values)
+    index = max(0, -(-len(ordered) * percent // 100) - 1)
+    return ordered[int(index)]
+
+
+def _response_size(response):
+    if response.streaming:
+        return sum(len(chunk) for chunk in response.streaming_content)
+    return len(response.content)
+
+
+def run(dataset, iterations=20, scenarios=SCENARIOS):
+    """
+    Drive every scenario `iterations` times through the Django test client,
+    as the manager of the first project, and return per scenario the
+    p50/p95/p99 latency in milliseconds, the SQL query count and the
+    response size in bytes.
+    """
+    project_id = dataset.projects[0]
+    client = Client()
+    client.force_login(User.objects.get(pk=dataset.managers[project_id]))
+
+    results = {}
+    for scenario in scenarios:
+        if scenario.setup is not None:
+            dataset.state[scenario.name] = scenario.setup(client, dataset, project_id)
+        timings, queries, sizes = [], [], []
+        for i in range(iterations):
+            with CaptureQueriesContext(connection) as captured:
+                start = time.perf_counter()
+                response = scenario.request(client, dataset, project_id, i)
+                size = _response_size(response)
+                timings.append((time.perf_counter() - start) * 1000)
+            if response.status_code >= 400:
+                raise RuntimeError(
+                    f"{scenario.name} answered {response.status_code}: {response.content[:200]}"
+                )
+            queries.append(len(captured))
+            sizes.append(size)
+
+        results[scenario.name] = {
+            "p50_ms": round(_percentile(timings, 50), 3),
+            "p95_ms": round(_percentile(timings, 95), 3),
+            "p99_ms": round(_percentile(timings, 99), 3),
+            "queries": max(queries),
+            "response_bytes": max(sizes),
+        }
+    return results
+
+
+def serialization_cpu(project_id, repeat=3):
+    """
+    CPU milliseconds per 10k tasks to build the task list body of a project,
+    queries included: with model instances and `TaskSerializer`, and with
+    `.values()` rows (`taskmanager.rows.task_rows`). Best of `repeat` runs.
+    """
+    tasks = Task.objects.filter(project_id=project_id).order_by("id")
+    count = tasks.count()
+
+    def with_serializer():
+        queryset = tasks.prefetch_related(Prefetch("assignee", queryset=User.objects.only("id")))
+        return TaskSerializer(queryset, many=True).data
+
+    def with_rows():
+        return task_rows(list(task_values(tasks)))
+
+    results = {}
+    for name, build in (("serializer", with_serializer), ("rows", with_rows)):
+        timings = []
+        for _ in range(repeat):
+            start = time.process_time()
+            build()
+            timings.append(time.process_time() - start)
+        results[name] = round(min(timings) * 1000 * 10000 / max(count, 1), 1)
+    return results
+
+
+def rendering_cpu(project_id, repeat=3):
+    """
+    CPU milliseconds per 10k tasks to write the task list rows of a project
+    as JSON, with the DRF `JSONRenderer` and with `FastJSONRenderer`. Best of
+    `repeat` runs.
+    """
+    rows = task_rows(list(task_values(Task.objects.filter(project_id=project_id).order_by("id"))))
+    results = {}
+    for name, renderer in (("drf", JSONRenderer()), ("fast", FastJSONRenderer())):
+        timings = []
+        for _ in range(repeat):
+            start = time.process_time()
+            renderer.render(rows)
+            timings.append(time.process_time() - start)
+        results[name] = round(min(timings) * 1000 * 10000 / max(len(rows), 1), 1)
+    return results
+
+
+def connection_setup(iterations=200):
+    """
+    Milliseconds per request to get a database connection, run one query and
+    let it go, on a SQLite file database: connecting for every request
+    (`CONN_MAX_AGE` 0) and taking the connection from `taskmanager.pool`.
+    Medians of `iterations` requests.
+    """
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        settings_dict = dict(
+            connection.settings_dict,
+            NAME=os.path.join(directory, "connections.sqlite3"),
+            CONN_MAX_AGE=0,
+            POOL={"MAX_SIZE": 1},
+        )
+        for name, wrapper_class in (("new", DatabaseWrapper), ("pooled", PooledDatabaseWrapper)):
+            wrapper = wrapper_class(settings_dict, alias="benchmark_connections")
+            timings = []
+            for _ in range(iterations):
+                start = time.perf_counter()
+                with wrapper.cursor() as cursor:
+                    cursor.execute("SELECT 1")
+                wrapper.close()
+                timings.append((time.perf_counter() - start) * 1000)
+            results[f"{name}_ms"] = round(statistics.median(timings), 4)
+        pool.close_pool("benchmark_connections")
+    results["saved_ms"] = round(results["new_ms"] - results["pooled_ms"], 4)
+    return results
+
+
+def compare(results, baseline, max_latency_increase=0.25, max_query_increase=0):
+    """
+    Compare `results` to a `baseline` of the same shape and return the list
+    of regressions: a p95 latency more than `max_latency_increase` (a ratio)
+    above the baseline, or more than `max_query_increase` extra queries.
+    """
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if previous is None:
+            continue
+        if current["p95_ms"] > previous["p95_ms"] * (1 + max_latency_increase):
+            regressions.append(
+                f"{name}: p95 {current['p95_ms']}ms, baseline {previous['p95_ms']}ms"
+            )
+        if current["queries"] > previous["queries"] + max_query_increase:
+            regressions.append(
+                f"{name}: {current['queries']} queries, baseline {previous['queries']}"
+            )
+    return regressions
@@ -0,0 +1,262 @@
+from django.conf import settings
+from django.db import connections, router
+from django.db.models import F
+from django.utils import timezone
+
+from taskmanager import changes, stats
+from taskmanager.models import IdSequence, StaleTask, Task
+from taskmanager.rows import task_to_row
+
+
+def _insert_tasks(tasks, using, batch_size):
+    """
+    Insert `tasks` with `bulk_create` and make sure every one gets its pk.
+
+    Backends returning the rows of a bulk insert (PostgreSQL, and SQLite
+    3.35+ from Django 4.0) set the pks themselves. On the others, and with
+    `PROJECT_SHARDS`, the ids are allocated up front by `IdSequence` and
+    inserted with the tasks.
+    """
+    shards = getattr(settings, "PROJECT_SHARDS", [])
+    if shards or not connections[using].features.can_return_rows_from_bulk_insert:
+        first = IdSequence.allocate("task", len(tasks))
+        for pk, task in enumerate(tasks, first):
+            task.pk = pk
+    return Task.objects.using(using).bulk_create(tasks, batch_size=batch_size)
+
+
+def bulk_create_tasks(project, creator, items, batch_size=500):
+    """
+    Create validated task `items` of `project` in one transaction: the tasks
+    with `bulk_create` and all of their assignee rows with one more batched
+    insert on the `Task.assignee` through table.
+
+    Returns the created tasks as rows shaped like `TaskSerializer` output.
+    """
+    if not items:
+        return []
+
+    using = router.db_for_write(Task)
+    tasks = [
+        Task(
+            project=project,
+            creator=creator,
+            **{key: value for key, value in item.items() if key != "assignee"},
+        )
+        for item in items
+    ]
+    assignees = [list(dict.fromkeys(item.get("assignee", []))) for item in items]
+
+    with changes.recording(using):
+        _insert_tasks(tasks, using, batch_size)
+        Through = Task.assignee.through
+        Through.objects.using(using).bulk_create(
+            [
+                Through(task_id=task.pk, user_id=user_id)
+                for task, user_ids in zip(tasks, assignees)
+                for user_id in user_ids
+            ],
+            batch_size=batch_size,
+        )
+        # `bulk_create` sends no signal, the task counters are updated here.
+        deltas = stats.new_deltas()
+        for task, user_ids in zip(tasks, assignees):
+            stats.add_tasks(deltas, project.pk, task.is_done, user_ids)
+        stats.apply(deltas)
+        changes.record(project.pk, [task.pk for task in tasks], using, op="created")
+
+    return [task_to_row(task, user_ids) for task, user_ids in zip(tasks, assignees)]
+
+
+def _chunks(ids, size):
+    for start in range(0, len(ids), size):
+        yield ids[start : start + size]
+
+
+def bulk_update_tasks(
+    project,
+    filters,
+    is_done=None,
+    replace=None,
+    add=None,
+    remove=None,
+    batch_size=500,
+):
+    """
+    Update every task of `project` matching `filters` (`ids`, `assignee`,
+    `is_done`) with set-based statements in one transaction: an UPDATE for
+    `is_done`, and DELETE/INSERT on the `Task.assignee` through table for
+    the `replace`, `add` and `remove` assignee lists.
+
+    The matching ids are read once up front, so a filter on the current
+    assignee is not re-evaluated after the assignees change.
+    Returns the number of matched tasks, updated tasks and assignee rows
+    added and removed.
+    """
+    using = router.db_for_write(Task)
+    Through = Task.assignee.through
+
+    tasks = Task.objects.using(using).filter(project=project)
+    if "ids" in filters:
+        tasks = tasks.filter(id__in=filters["ids"])
+    if "assignee" in filters:
+        tasks = tasks.filter(assignee=filters["assignee"])
+    if "is_done" in filters:
+        tasks = tasks.filter(is_done=filters["is_done"])
+
+    counts = {"matched": 0, "updated": 0, "assignees_added": 0, "assignees_removed": 0}
+    if replace is not None:
+        add = replace
+
+    with changes.recording(using):
+        task_ids = list(tasks.order_by("id").values_list("id", flat=True))
+        counts["matched"] = len(task_ids)
+        changed_ids = set()
+
+        deltas = stats.new_deltas()
+        kept = None if replace is None else set(replace)
+        remove = set(remove or ())
+        for chunk in _chunks(task_ids, batch_size):
+            # Set-based statements send no signal: the task counters get the
+            # changes of the task states and assignee rows the chunk reads.
+            states = dict(
+                Task.objects.using(using).filter(id__in=chunk).values_list("id", "is_done")
+            )
+            done = {
+                task_id: was_done if is_done is None else is_done
+                for task_id, was_done in states.items()
+            }
+            updated_ids = [task_id for task_id in states if done[task_id] != states[task_id]]
+            if updated_ids:
+                Task.objects.using(using).filter(id__in=updated_ids).update(is_done=is_done)
+                counts["updated"] += len(updated_ids)
+                changed_ids.update(updated_ids)
+                for task_id in updated_ids:
+                    stats.add_tasks(deltas, project.pk, states[task_id], count=-1)
+                    stats.add_tasks(deltas, project.pk, is_done)
+
+            links = []
+            if updated_ids or kept is not None or remove or add:
+                links = Through.objects.using(using).filter(task_id__in=list(states))
+                links = list(links.values_list("id", "task_id", "user_id"))
+            removed_ids, current = [], set()
+            for pk, task_id, user_id in links:
+                if (kept is not None and user_id not in kept) or user_id in remove:
+                    removed_ids.append(pk)
+                    changed_ids.add(task_id)
+                    stats.add_assignees(deltas, project.pk, states[task_id], [user_id], -1)
+                    continue
+                current.add((task_id, user_id))
+                if done[task_id] != states[task_id]:
+                    stats.add_assignees(deltas, project.pk, states[task_id], [user_id], -1)
+                    stats.add_assignees(deltas, project.pk, done[task_id], [user_id])
+            if removed_ids:
+                counts["assignees_removed"] += (
+                    Through.objects.using(using).filter(id__in=removed_ids).delete()[0]
+                )
+            if add:
+                new_links = [
+                    Through(task_id=task_id, user_id=user_id)
+                    for task_id in states
+                    for user_id in dict.fromkeys(add)
+                    if (task_id, user_id) not in current
+                ]
+                Through.objects.using(using).bulk_create(new_links, batch_size=batch_size)
+                counts["assignees_added"] += len(new_links)
+                for link in new_links:
+                    changed_ids.add(link.task_id)
+                    stats.add_assignees(deltas, project.pk, done[link.task_id], [link.user_id])
+
+        stats.apply(deltas)
+        # Only the tasks which really changed get a new change sequence.
+        changes.stamp(project.pk, sorted(changed_ids), using, batch_size)
+
+    return counts
+
+
+def _set_assignees(task, user_ids, using, old_ids=None):
+    """
+    Make `user_ids` the assignees of `task`, whose current ones are read
+    unless given as `old_ids`, with at most one DELETE and one INSERT on the
+    through table, which send no `m2m_changed` signal: the callers count and
+    record the change. Returns the assignee ids before and after.
+    """
+    Through = Task.assignee.through
+    links = Through.objects.using(using).filter(task_id=task.pk)
+    if old_ids is None:
+        old_ids = set(links.values_list("user_id", flat=True))
+    new_ids = set(user_ids)
+    if old_ids - new_ids:
+        links.filter(user_id__in=old_ids - new_ids).delete()
+    Through.objects.using(using).bulk_create(
+        [Through(task_id=task.pk, user_id=user_id) for user_id in new_ids - old_ids]
+    )
+    return old_ids, new_ids
+
+
+def assign_new_task(task, user_ids):
+    """
+    Set the assignees of the task just created, in its creation: the change
+    is the creation itself, the version of the task is not bumped.
+    """
+    using = router.db_for_write(Task, instance=task)
+    with changes.recording(using):
+        _, new_ids = _set_assignees(task, user_ids, using, old_ids=set())
+        deltas = stats.new_deltas()
+        stats.add_assignees(deltas, task.project_id, task.is_done, new_ids)
+        stats.apply(deltas)
+
+
+def update_task(task, values, assignee_ids=None, expected_versions=None):
+    """
+    Update the fields `values` and, unless None, the assignees of the loaded
+    `task`, bumping its version once.
+
+    The fields are written by one UPDATE which, with `expected_versions`,
+    only matches the task while its version is one of them (`... WHERE id =
+    %s AND version IN (...)`), else `StaleTask` is raised: only the task row
+    is locked by the check, and nothing is written.
+    """
+    using = router.db_for_write(Task, instance=task)
+    tasks = Task.objects.using(using).filter(pk=task.pk)
+    if expected_versions is not None:
+        tasks = tasks.filter(version__in=expected_versions)
+    now = timezone.now()
+
+    with changes.recording(using):
+        if not tasks.update(**values, updated_at=now, version=F("version") + 1):
+            raise StaleTask()
+        changes.record(task.project_id, [task.pk], using)
+        was_done = task.is_done
+        for field, value in values.items():
+            setattr(task, field, value)
+        task.updated_at = now
+
+        # The update sends no signal, the task counters are updated here.
+        if assignee_ids is not None or was_done != task.is_done:
+            if assignee_ids is None:
+                old_ids = new_ids = set(
+                    Task.assignee.through.objects.using(using)
+                    .filter(task_id=task.pk)
+                    .values_list("user_id", flat=True)
+                )
+            else:
+                old_ids, new_ids = _set_assignees(task, assignee_ids, using)
+            deltas = stats.new_deltas()
+            stats.add_tasks(deltas, task.project_id, was_done, old_ids, count=-1)
+            stats.add_tasks(deltas, task.project_id, task.is_done, new_ids)
+            stats.apply(deltas)
+            if old_ids != new_ids:
+                changes.record(task.project_id, [task.pk], using, op="reassigned")
+
+        if expected_versions is not None and len(set(expected_versions)) == 1:
+            task.version = expected_versions[0] + 1
+        else:
+            # The row is locked by the UPDATE, this is the version it wrote.
+            task.version = (
+                Task.objects.using(using)
+                .filter(pk=task.pk)
+                .values_list("version", flat=True)
+                .get()
+            )
+    return task
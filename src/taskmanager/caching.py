@@ -0,0 +1,79 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.http import parse_etags
+
+
+def task_list_etag(project, request, media_type):
+    """
+    Strong ETag of a task list page.
+
+    `Project.version` changes whenever a task of the project or its members
+    change, so together with the requested url (project, assignee, page,
+    filters) and the negotiated `media_type` it identifies the exact
+    response body.
+    """
+    raw = "{}:{}:{}:{}".format(
+        project.pk,
+        project.version,
+        request.build_absolute_uri(),
+        media_type,
+    )
+    return '"{}"'.format(hashlib.sha1(raw.encode()).hexdigest())
+
+
+def etag_matches(request, etag):
+    if_none_match = request.META.get("HTTP_IF_NONE_MATCH")
+    if not if_none_match:
+        return False
+    etags = parse_etags(if_none_match)
+    return "*" in etags or etag in etags
+
+
+def task_etag(task):
+    """
+    Strong ETag of a task: its version, which changes on every write.
+    """
+    return '"{}"'.format(task.version)
+
+
+def if_match_versions(request):
+    """
+    The task versions accepted by the `If-Match` header of the request, or
+    None without the header or with `*`. Weak or unknown ETags match no
+    version.
+    """
+    if_match = request.META.get("HTTP_IF_MATCH")
+    if not if_match:
+        return None
+    etags = parse_etags(if_match)
+    if "*" in etags:
+        return None
+    return [int(etag[1:-1]) for etag in etags if etag[1:-1].isdigit() and etag.startswith('"')]
+
+
+def _response_cache():
+    alias = getattr(settings, "TASK_LIST_CACHE", None)
+    return caches[alias] if alias else None
+
+
+def get_cached_task_list(etag):
+    """
+    Return the `(data, headers)` of a task list page cached under `etag`,
+    or None. Always None when `TASK_LIST_CACHE` is not set.
+    """
+    cache = _response_cache()
+    if cache is None:
+        return None
+    return cache.get(f"taskmanager:tasks:{etag}")
+
+
+def set_cached_task_list(etag, data, headers):
+    cache = _response_cache()
+    if cache is not None:
+        cache.set(
+            f"taskmanager:tasks:{etag}",
+            (data, headers),
+            getattr(settings, "TASK_LIST_CACHE_TIMEOUT", 300),
+        )
@@ -0,0 +1,229 @@
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db import router, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+from taskmanager import events
+from taskmanager.models import Project, Task, TaskTombstone
+
+
+# Every change of the tasks of a project is stamped with a change sequence:
+# the version the project is bumped to by the transaction making it. Tasks
+# keep the sequence of their last change in `Task.change_seq`, deleted tasks
+# leave a `TaskTombstone`. A sync cursor is a position `(seq, task id)` in
+# that order, the task id being None when every change of `seq` was seen.
+# Each change is also published as a task event, see `taskmanager.events`.
+#
+# Task writes run in a `recording` block: the sequence is only taken at its
+# end, right before the commit, so the project row is not locked while the
+# tasks are written.
+
+
+class ProjectGone(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = "The project was moved, retry the request."
+    default_code = "project_gone"
+
+
+def next_seq(project_id, using=None):
+    """
+    Bump the version of the project and return it, or None when the project
+    is not in the database.
+
+    The UPDATE keeps the project row locked until the transaction ends, so
+    the sequences of a project are committed in order: a client having seen
+    a version can't miss a change with a lower sequence committed later.
+    """
+    using = using or router.db_for_write(Project)
+    projects = Project.objects.using(using).filter(pk=project_id)
+    projects.update(version=F("version") + 1)
+    return projects.values_list("version", flat=True).first()
+
+
+# The changes recorded by the running `recording` blocks, by database: lists
+# of `(project id, op, task ids)`.
+_journals = ContextVar("task_changes", default={})
+
+
+@contextmanager
+def recording(using=None):
+    """
+    Run a block of task writes in a transaction whose changes are stamped at
+    its end, the last statements before the commit: the project rows are
+    locked by `next_seq` for these few statements only, not for the whole
+    write. A block nested in another one is a savepoint whose changes are
+    stamped with the outer ones, or forgotten when it fails.
+    """
+    using = using or router.db_for_write(Task)
+    journals = _journals.get()
+    if using in journals:
+        journal = journals[using]
+        mark = len(journal)
+        try:
+            with transaction.atomic(using=using):
+                yield
+        except BaseException:
+            del journal[mark:]
+            raise
+        return
+
+    journal = []
+    token = _journals.set({**journals, using: journal})
+    try:
+        with transaction.atomic(using=using):
+            yield
+            _flush(journal, using)
+    finally:
+        _journals.reset(token)
+
+
+def _flush(journal, using):
+    by_project = defaultdict(list)
+    for project_id, op, task_ids in journal:
+        by_project[project_id].append((op, task_ids))
+    # Always in the same order, so two writers can't deadlock on the projects.
+    for project_id in sorted(by_project):
+        _stamp_project(project_id, by_project[project_id], using)
+
+
+def _stamp_project(project_id, entries, using):
+    seq = next_seq(project_id, using)
+    if seq is None:
+        # Moved to another shard (or deleted) while the block ran.
+        raise ProjectGone()
+    ops = {}
+    for op, task_ids in entries:
+        ops.setdefault(op, {}).update(dict.fromkeys(task_ids))
+    buried = ops.get("deleted", {})
+    live = [task_id for op, task_ids in ops.items() if op != "deleted" for task_id in task_ids]
+    tasks = Task.objects.using(using).filter(project_id=project_id)
+    if live:
+        tasks.filter(pk__in=live).update(change_seq=seq)
+    if buried:
+        # Ignore the tasks which came back to the project in the same block.
+        back = set(tasks.filter(pk__in=list(buried)).values_list("id", flat=True))
+        TaskTombstone.objects.using(using).bulk_create(
+            [
+                TaskTombstone(project_id=project_id, task_id=task_id, change_seq=seq)
+                for task_id in buried
+                if task_id not in back
+            ]
+        )
+    for op, task_ids in ops.items():
+        events.publish_on_commit(project_id, op, seq, list(task_ids), using)
+
+
+def record(project_id, task_ids, using=None, op="updated"):
+    """
+    Record a change of the tasks `task_ids` of the project: at the end of
+    the running `recording` block, or at once outside of any.
+    """
+    task_ids = list(task_ids)
+    if not task_ids:
+        return
+    using = using or router.db_for_write(Task)
+    journal = _journals.get().get(using)
+    if journal is None:
+        with recording(using):
+            record(project_id, task_ids, using, op)
+        return
+    journal.append((project_id, op, task_ids))
+
+
+def stamp(project_id, task_ids, using=None, batch_size=500, op="updated"):
+    """
+    Record a change of the tasks `task_ids` of the project, bumping their
+    version.
+    """
+    task_ids = list(task_ids)
+    if not task_ids:
+        return
+    using = using or router.db_for_write(Task)
+    now = timezone.now()
+    for start in range(0, len(task_ids), batch_size):
+        Task.objects.using(using).filter(pk__in=task_ids[start : start + batch_size]).update(
+            updated_at=now, version=F("version") + 1
+        )
+    record(project_id, task_ids, using, op)
+
+
+def stamp_tasks(task_ids, using=None, op="updated"):
+    """
+    Record a change of the tasks `task_ids`, whatever their projects.
+    """
+    using = using or router.db_for_write(Task)
+    by_project = defaultdict(list)
+    tasks = Task.objects.using(using).filter(pk__in=list(task_ids))
+    for task_id, project_id in tasks.values_list("id", "project_id"):
+        by_project[project_id].append(task_id)
+    for project_id, ids in by_project.items():
+        stamp(project_id, ids, using, op=op)
+
+
+def bury(project_id, task_ids, using=None):
+    """
+    Record that the tasks `task_ids` left the project.
+    """
+    record(project_id, task_ids, using or router.db_for_write(TaskTombstone), op="deleted")
+
+
+def parse_cursor(value):
+    """
+    Read a cursor, `<seq>` or `<seq>.<task id>`, as a position. Raises
+    ValueError.
+    """
+    seq, _, task_id = value.partition(".")
+    position = (int(seq), int(task_id) if task_id else None)
+    if position[0] < 0 or (position[1] is not None and position[1] < 0):
+        raise ValueError(value)
+    return position
+
+
+def format_cursor(position):
+    seq, task_id = position
+    return str(seq) if task_id is None else f"{seq}.{task_id}"
+
+
+def _after(position, id_field):
+    seq, task_id = position
+    if task_id is None:
+        return Q(change_seq__gt=seq)
+    return Q(change_seq__gt=seq) | Q(change_seq=seq, **{f"{id_field}__gt": task_id})
+
+
+def read_changes(project, position, limit):
+    """
+    The first `limit` changes of `project` after `position`, in sequence
+    order, as `(changes, cursor, more)`: `changes` is a list of `(task id,
+    deleted)` and `cursor` the position after them. Both reads are range
+    scans of the `(project, change_seq, ...)` indexes.
+    """
+    tasks = (
+        Task.objects.filter(project=project)
+        .filter(_after(position, "id"))
+        .order_by("change_seq", "id")
+        .values_list("change_seq", "id")
+    )
+    tombstones = (
+        TaskTombstone.objects.filter(project=project)
+        .filter(_after(position, "task_id"))
+        .order_by("change_seq", "task_id")
+        .values_list("change_seq", "task_id")
+    )
+    entries = sorted(
+        [(seq, task_id, False) for seq, task_id in tasks[: limit + 1]]
+        + [(seq, task_id, True) for seq, task_id in tombstones[: limit + 1]]
+    )
+    more = len(entries) > limit
+    entries = entries[:limit]
+    if not entries:
+        return [], position, False
+    seq, task_id, _ = entries[-1]
+    # Without more changes, every change of the last sequence was read.
+    cursor = (seq, task_id) if more else (seq, None)
+    return [(task_id, deleted) for _, task_id, deleted in entries], cursor, more
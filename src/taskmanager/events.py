@@ -0,0 +1,222 @@
+import asyncio
+import json
+import logging
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger("taskmanager.events")
+
+
+# Task change events are small dicts, `{"project", "op", "seq", "tasks"}`:
+# the operation ("created", "updated", "reassigned" or "deleted"), the change
+# sequence of the project (a `since` cursor, see `taskmanager.changes`) and
+# the ids of the tasks. They are published once the change is committed and
+# fanned out by the `broker` of each process to the subscribed clients.
+# `{"project", "op": "access"}` tells the subscriptions of a project that its
+# members changed or it was deleted: it is not passed on to the clients, they
+# check their access again (see `taskmanager.push`).
+
+ACCESS_CHANGED = "access"
+
+
+class Subscription:
+    """
+    The events of a project for one client, queued in the event loop of the
+    client's connection. The queue is bounded: a client falling behind by
+    more than `maxsize` events is dropped, `get` then returns None.
+    """
+
+    def __init__(self, broker, project_id, maxsize):
+        self.broker = broker
+        self.project_id = project_id
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize)
+        self.dropped = False
+
+    def offer(self, events):
+        # Called in `self.loop`.
+        for event in events:
+            if self.dropped:
+                return
+            try:
+                self.queue.put_nowait(event)
+            except asyncio.QueueFull:
+                self.drop()
+
+    def drop(self):
+        self.dropped = True
+        self.close()
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.queue.put_nowait(None)
+
+    async def get(self):
+        return await self.queue.get()
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class Broker:
+    """
+    In-process fan-out of task events to the subscriptions of this process.
+
+    Events are published from any thread (the signal handlers run in the
+    request threads) through the backend, `TASK_EVENTS_BACKEND`, which
+    hands them back to `deliver` in every process sharing it.
+    """
+
+    def __init__(self, backend=None):
+        self._backend = backend
+        self._subscriptions = defaultdict(set)
+        self._lock = threading.Lock()
+
+    @property
+    def backend(self):
+        if self._backend is None:
+            path = getattr(settings, "TASK_EVENTS_BACKEND", "taskmanager.events.MemoryBackend")
+            self._backend = import_string(path)(self)
+        return self._backend
+
+    def subscribe(self, project_id, maxsize=None):
+        """
+        Subscribe to the events of the project, from a coroutine.
+        """
+        if maxsize is None:
+            maxsize = getattr(settings, "TASK_EVENTS_QUEUE_SIZE", 100)
+        subscription = Subscription(self, project_id, max(maxsize, 1))
+        self.backend.listen()
+        with self._lock:
+            self._subscriptions[project_id].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.project_id)
+            if subscriptions is not None:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self._subscriptions[subscription.project_id]
+
+    def subscriber_count(self, project_id=None):
+        with self._lock:
+            if project_id is not None:
+                return len(self._subscriptions.get(project_id, ()))
+            return sum(len(subscriptions) for subscriptions in self._subscriptions.values())
+
+    def publish(self, project_id, event):
+        try:
+            self.backend.publish(project_id, event)
+        except Exception:
+            # The change is committed, a lost event must not fail the request.
+            logger.exception("Could not publish the task event %r", event)
+
+    def deliver(self, project_id, event):
+        """
+        Queue `event` for the subscriptions of the project, with one call
+        per event loop whatever the number of subscriptions.
+        """
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(project_id, ()))
+        by_loop = defaultdict(list)
+        for subscription in subscriptions:
+            by_loop[subscription.loop].append(subscription)
+        for loop, subscriptions in by_loop.items():
+            try:
+                loop.call_soon_threadsafe(_offer, subscriptions, [event])
+            except RuntimeError:
+                # The loop is closed, its clients are gone.
+                for subscription in subscriptions:
+                    self.unsubscribe(subscription)
+
+
+def _offer(subscriptions, events):
+    for subscription in subscriptions:
+        subscription.offer(events)
+
+
+class MemoryBackend:
+    """
+    Events are only delivered to the subscriptions of this process.
+    """
+
+    def __init__(self, broker):
+        self.broker = broker
+
+    def listen(self):
+        pass
+
+    def publish(self, project_id, event):
+        self.broker.deliver(project_id, event)
+
+
+class RedisBackend:
+    """
+    Events are shared by every process through the redis pub/sub channel
+    `TASK_EVENTS_CHANNEL` of `TASK_EVENTS_REDIS_URL`. A thread started with
+    the first subscription of the process delivers them, the events of this
+    process included. Needs the `redis` package.
+    """
+
+    def __init__(self, broker):
+        try:
+            import redis
+        except ImportError:
+            raise ImproperlyConfigured(
+                "The redis task events backend needs the redis package: pip install redis"
+            )
+
+        self.broker = broker
+        self.client = redis.Redis.from_url(settings.TASK_EVENTS_REDIS_URL)
+        self.channel = getattr(settings, "TASK_EVENTS_CHANNEL", "taskmanager:task-events")
+        self._listener = None
+        self._lock = threading.Lock()
+
+    def listen(self):
+        with self._lock:
+            if self._listener is None:
+                self._listener = threading.Thread(
+                    target=self._listen, name="task-events", daemon=True
+                )
+                self._listener.start()
+
+    def _listen(self):
+        while True:
+            try:
+                pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(self.channel)
+                for message in pubsub.listen():
+                    project_id, event = json.loads(message["data"])
+                    self.broker.deliver(project_id, event)
+            except Exception:
+                logger.exception("Task events listener failed, reconnecting")
+                time.sleep(1)
+
+    def publish(self, project_id, event):
+        self.client.publish(self.channel, json.dumps([project_id, event]))
+
+
+broker = Broker()
+
+
+def publish_on_commit(project_id, op, seq, task_ids, using=None):
+    """
+    Publish a task event once the current transaction commits.
+    """
+    event = {"project": project_id, "op": op, "seq": seq, "tasks": list(task_ids)}
+    transaction.on_commit(lambda: broker.publish(project_id, event), using=using)
+
+
+def publish_access_change_on_commit(project_id):
+    """
+    Tell the subscribers of the project to check their access again once
+    the current transaction commits.
+    """
+    event = {"project": project_id, "op": ACCESS_CHANGED}
+    transaction.on_commit(lambda: broker.publish(project_id, event))
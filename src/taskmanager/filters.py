@@ -0,0 +1,44 @@
+import sys
+
+from django.db import connections
+
+from taskmanager.models import Task
+
+
+def filter_tasks(queryset, filters):
+    """
+    Apply the validated `TaskListFilterSerializer` query parameters, except
+    the ordering which is applied by the paginator.
+
+    Each filter matches one of the composite indexes of `Task`: the project
+    scoped `is_done` and `creator` filters use `(project, is_done)` and
+    `(project, creator)`, and the assignee filter reads the `(user, task)`
+    index of the assignee through table in a subquery, which also keeps
+    tasks with several matching assignees from being duplicated. The title
+    prefix and the title ordering use `(project, title, id)`.
+    """
+    if "is_done" in filters:
+        # `is_done=False` is rendered as `NOT is_done` on SQLite, which can't
+        # use an index; the IN form can on every backend.
+        queryset = queryset.filter(is_done__in=[filters["is_done"]])
+    if "creator" in filters:
+        queryset = queryset.filter(creator_id=filters["creator"])
+    if "assignee" in filters:
+        queryset = queryset.filter(
+            id__in=Task.assignee.through.objects.filter(
+                user_id__in=filters["assignee"]
+            ).values("task_id")
+        )
+    if "title_prefix" in filters:
+        prefix = filters["title_prefix"]
+        # A case sensitive `LIKE 'prefix%'` with `%` and `_` escaped.
+        queryset = queryset.filter(title__startswith=prefix)
+        if connections[queryset.db].vendor == "sqlite":
+            # SQLite's LIKE ignores the case of ASCII letters and can't use the
+            # index of a column without NOCASE collation: the range of the
+            # titles starting with the prefix keeps the match case sensitive,
+            # as on PostgreSQL, and is read from the index.
+            queryset = queryset.filter(title__gte=prefix)
+            if ord(prefix[-1]) < sys.maxunicode:
+                queryset = queryset.filter(title__lt=prefix[:-1] + chr(ord(prefix[-1]) + 1))
+    return queryset
@@ -0,0 +1,183 @@
+import functools
+import hashlib
+import json
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, router, transaction
+from django.http import HttpResponse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+from taskmanager import changes, sharding
+from taskmanager.models import IdempotencyKey, Task
+from taskmanager.renderers import FastJSONRenderer
+
+
+# A client retrying a write after a timeout sends the `Idempotency-Key` header
+# of its first attempt. The first request with a key claims it by committing an
+# `IdempotencyKey` row, then runs and stores its response in the row in the
+# transaction of its writes: the key records a response exactly when the
+# writes were committed. A request repeating the key gets the stored response
+# back without running the view, or a 409 while the first one is still
+# running. Keys are per user, and reusing one for another request (method,
+# path or data) is refused. The rows live in the database of the writes, the
+# shard of the project with `PROJECT_SHARDS`.
+#
+# A request failing with an exception or a 5xx releases its key, so the retry
+# runs again. Keys expire after `IDEMPOTENCY_KEY_TTL` seconds and are deleted
+# by `manage.py purge_idempotency_keys`.
+
+MAX_KEY_LENGTH = IdempotencyKey._meta.get_field("key").max_length
+
+
+def _entries(using):
+    return IdempotencyKey.objects.using(using)
+
+
+def fingerprint(request):
+    """
+    SHA-256 of the method, path and parsed data of the DRF `request`. The
+    data, not the body: the stream of a multipart request is consumed by its
+    parser.
+    """
+    data = request.data
+    if hasattr(data, "lists"):
+        data = dict(data.lists())
+    digest = hashlib.sha256()
+    for part in (request.method, request.get_full_path()):
+        digest.update(part.encode())
+        digest.update(b"\0")
+    digest.update(json.dumps(data, sort_keys=True, separators=(",", ":"), default=str).encode())
+    return digest.hexdigest()
+
+
+def replay(entry):
+    response = HttpResponse(entry.body, status=entry.status_code, content_type="application/json")
+    for name, value in entry.headers.items():
+        response[name] = value
+    response["Idempotent-Replayed"] = "true"
+    return response
+
+
+def claim(using, user_id, key, request_fingerprint):
+    """
+    Claim `key` for a new request, as `(entry, None)`. When an earlier
+    request holds the key, return `(None, response)`: its stored response,
+    or an error while it is still running.
+    """
+    ttl = timedelta(seconds=getattr(settings, "IDEMPOTENCY_KEY_TTL", 86400))
+    lock_timeout = timedelta(seconds=getattr(settings, "IDEMPOTENCY_KEY_LOCK_TIMEOUT", 60))
+    while True:
+        now = timezone.now()
+        try:
+            with transaction.atomic(using=using):
+                entry = _entries(using).create(
+                    user_id=user_id, key=key, fingerprint=request_fingerprint, created_at=now
+                )
+            return entry, None
+        except IntegrityError:
+            pass
+        entry = _entries(using).filter(user_id=user_id, key=key).first()
+        if entry is None:
+            # Released in the meantime.
+            continue
+
+        if entry.created_at < now - ttl or (
+            entry.status_code is None and entry.created_at < now - lock_timeout
+        ):
+            # Expired, or claimed by a request which died: take it over.
+            taken = (
+                _entries(using)
+                .filter(pk=entry.pk, created_at=entry.created_at)
+                .update(
+                    fingerprint=request_fingerprint,
+                    status_code=None,
+                    body=None,
+                    headers={},
+                    created_at=now,
+                )
+            )
+            if taken:
+                entry.fingerprint, entry.created_at = request_fingerprint, now
+                entry.status_code = None
+                return entry, None
+            continue
+
+        if entry.fingerprint != request_fingerprint:
+            return None, Response(
+                {"detail": "This Idempotency-Key was used for another request."},
+                status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            )
+        if entry.status_code is not None:
+            return None, replay(entry)
+        return None, Response(
+            {"detail": "A request with this Idempotency-Key is in progress, retry later."},
+            status=status.HTTP_409_CONFLICT,
+        )
+
+
+def store(entry, response):
+    """
+    Record the response of the request which claimed `entry`.
+    """
+    headers = {name: value for name, value in response.items() if name.lower() != "content-type"}
+    _entries(entry._state.db).filter(pk=entry.pk).update(
+        status_code=response.status_code,
+        body=FastJSONRenderer().render(response.data),
+        headers=headers,
+    )
+
+
+def release(entry):
+    _entries(entry._state.db).filter(pk=entry.pk, status_code=None).delete()
+
+
+def purge():
+    """
+    Delete the expired keys of every database, returns how many.
+    """
+    cutoff = timezone.now() - timedelta(seconds=getattr(settings, "IDEMPOTENCY_KEY_TTL", 86400))
+    deleted = 0
+    for database in sharding.databases():
+        deleted += _entries(database).filter(created_at__lt=cutoff).delete()[0]
+    return deleted
+
+
+def idempotent(view):
+    """
+    Make a view method honour the `Idempotency-Key` header, see above.
+    Requests without the header run as usual.
+    """
+
+    @functools.wraps(view)
+    def wrapper(self, request, *args, **kwargs):
+        key = request.META.get("HTTP_IDEMPOTENCY_KEY")
+        if not key:
+            return view(self, request, *args, **kwargs)
+        if len(key) > MAX_KEY_LENGTH:
+            return Response(
+                {"detail": f"The Idempotency-Key is longer than {MAX_KEY_LENGTH} characters."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        using = router.db_for_write(Task)
+        entry, response = claim(using, request.user.pk, key, fingerprint(request))
+        if response is not None:
+            return response
+        try:
+            # The changes of the view are stamped after the response is
+            # stored, right before the commit.
+            with changes.recording(using):
+                response = view(self, request, *args, **kwargs)
+                if response.status_code < 500:
+                    store(entry, response)
+        except BaseException:
+            release(entry)
+            raise
+        if response.status_code >= 500:
+            release(entry)
+        return response
+
+    return wrapper
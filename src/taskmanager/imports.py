@@ -0,0 +1,232 @@
+import csv
+import itertools
+import json
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+
+from taskmanager import membership, sharding
+from taskmanager.models import Project, User
+
+
+# Records of an import file, one per line (JSONL) or row (CSV, with a column
+# per key, the ones a record doesn't use left empty):
+#   {"type": "user", "username", "password", "user_role"}
+#   {"type": "project", "name", "manager"}
+#   {"type": "membership", "project", "manager", "developer"}
+# `manager` and `developer` are usernames, `project` a project name. A record
+# may only refer to users and projects of earlier lines. `password` and
+# `user_role` (manager by default) are optional, the other keys required.
+# Bad lines are reported in `ImportStats.errors` and skipped.
+
+REQUIRED_KEYS = {
+    "user": ("username",),
+    "project": ("name", "manager"),
+    "membership": ("project", "manager", "developer"),
+}
+
+
+class ImportStats:
+    def __init__(self):
+        self.lines = 0
+        self.users = 0
+        self.projects = 0
+        self.memberships = 0
+        self.errors = []
+
+
+def read_records(path, format=None):
+    """
+    Stream the records of an import file, as `(line number, record)`.
+    `format` is "csv" or "jsonl", by default taken from the file extension.
+    A JSONL line which can't be decoded is yielded as its `JSONDecodeError`.
+    """
+    format = format or ("csv" if str(path).endswith(".csv") else "jsonl")
+    with open(path, newline="") as file:
+        if format == "csv":
+            for number, row in enumerate(csv.DictReader(file), start=1):
+                yield number, {key: value for key, value in row.items() if value}
+        else:
+            for number, line in enumerate(file, start=1):
+                if line.strip():
+                    try:
+                        yield number, json.loads(line.strip())
+                    except json.JSONDecodeError as exc:
+                        yield number, exc
+
+
+def _hash_passwords(passwords, pool):
+    if pool is None:
+        return [make_password(password) for password in passwords]
+    return list(pool.map(make_password, passwords, chunksize=max(1, len(passwords) // 64)))
+
+
+def password_pool(workers):
+    """
+    A process pool for the password hashing, or None to hash in this process.
+    """
+    if workers <= 1:
+        return None
+    return ProcessPoolExecutor(max_workers=workers, initializer=django.setup)
+
+
+def _project_ids(manager_ids):
+    ids = {}
+    for database in sharding.databases():
+        rows = (
+            Project.objects.using(database)
+            .live()
+            .filter(manager_id__in=manager_ids)
+            .values_list("id", "name", "manager_id")
+        )
+        ids.update({(name, manager_id): pk for pk, name, manager_id in rows})
+    return ids
+
+
+def _add_memberships(rows):
+    """
+    Insert the membership `rows` not there yet, of projects of one database.
+    Returns how many were inserted.
+    """
+    Members = Project.developers.through
+    project_ids = {row.project_id for row in rows}
+    members = set(
+        Members.objects.filter(project_id__in=project_ids).values_list("project_id", "user_id")
+    )
+    rows = {
+        (row.project_id, row.user_id): row
+        for row in rows
+        if (row.project_id, row.user_id) not in members
+    }
+    Members.objects.bulk_create(rows.values(), ignore_conflicts=True)
+
+    # `bulk_create` sends no `m2m_changed` signal.
+    project_ids = {project_id for project_id, _ in rows}
+    if project_ids:
+        Project.bump_version(*project_ids)
+        for project_id in project_ids:
+            transaction.on_commit(
+                lambda project_id=project_id: membership.index.invalidate(project_id)
+            )
+    return len(rows)
+
+
+def _record_error(record):
+    """
+    What is wrong with `record`, or None.
+    """
+    if isinstance(record, json.JSONDecodeError):
+        return f"invalid JSON: {record.msg} at column {record.colno}"
+    if not isinstance(record, dict):
+        return "not a JSON object"
+    if record.get("type") not in REQUIRED_KEYS:
+        return f"unknown record type {record.get('type')!r}"
+    missing = [key for key in REQUIRED_KEYS[record["type"]] if not record.get(key)]
+    if missing:
+        return "missing " + ", ".join(repr(key) for key in missing)
+    if record["type"] == "user" and record.get("user_role", User.MANAGER) not in {
+        role for role, _ in User.USER_ROLE
+    }:
+        return f"unknown user role {record.get('user_role')!r}"
+    return None
+
+
+def _import_batch(records, pool, stats):
+    valid = []
+    for number, record in records:
+        error = _record_error(record)
+        if error is None:
+            valid.append((number, record))
+        else:
+            stats.errors.append(f"line {number}: {error}")
+    users = [(n, r) for n, r in valid if r["type"] == "user"]
+    projects = [(n, r) for n, r in valid if r["type"] == "project"]
+    memberships = [(n, r) for n, r in valid if r["type"] == "membership"]
+
+    # Users. Usernames are unique: users imported before are skipped before
+    # paying for their password hash.
+    new_users = {record["username"]: record for _, record in users}
+    for username in User.objects.filter(username__in=list(new_users)).values_list(
+        "username", flat=True
+    ):
+        del new_users[username]
+    hashes = _hash_passwords([record.get("password") for record in new_users.values()], pool)
+    User.objects.bulk_create(
+        [
+            User(
+                username=username,
+                password=password,
+                user_role=record.get("user_role", User.MANAGER),
+            )
+            for (username, record), password in zip(new_users.items(), hashes)
+        ],
+        ignore_conflicts=True,
+    )
+    stats.users += len(new_users)
+
+    usernames = {r["manager"] for _, r in projects + memberships if r.get("manager")}
+    usernames |= {r["developer"] for _, r in memberships if r.get("developer")}
+    user_ids = dict(User.objects.filter(username__in=usernames).values_list("username", "id"))
+
+    # Projects, known by name and manager so a re-imported one is skipped.
+    wanted = {}
+    for number, record in projects:
+        manager_id = user_ids.get(record.get("manager"))
+        if manager_id is None:
+            stats.errors.append(f"line {number}: unknown manager {record.get('manager')!r}")
+        else:
+            wanted[(record.get("name"), manager_id)] = number
+    manager_ids = {manager_id for _, manager_id in wanted} | {
+        user_ids[r["manager"]] for _, r in memberships if r.get("manager") in user_ids
+    }
+    existing = _project_ids(manager_ids)
+    missing = [key for key in wanted if key not in existing]
+    sharding.create_projects([Project(name=name, manager_id=m) for name, m in missing])
+    stats.projects += len(missing)
+    if missing:
+        existing = _project_ids(manager_ids)
+
+    # Developer memberships, the through table is unique on (project, user).
+    Members = Project.developers.through
+    rows = []
+    for number, record in memberships:
+        project_id = existing.get((record.get("project"), user_ids.get(record.get("manager"))))
+        developer_id = user_ids.get(record.get("developer"))
+        if project_id is None or developer_id is None:
+            stats.errors.append(f"line {number}: unknown project or developer")
+        else:
+            rows.append(Members(project_id=project_id, user_id=developer_id))
+    # Memberships are written to the shard of their project.
+    for database, project_ids in sharding.shards_of({row.project_id for row in rows}).items():
+        project_ids = set(project_ids)
+        token = sharding.use_shard(database)
+        try:
+            stats.memberships += _add_memberships(
+                [row for row in rows if row.project_id in project_ids]
+            )
+        finally:
+            sharding.reset_shard(token)
+
+
+def import_records(records, batch_size=1000, pool=None, start=0, on_batch=None):
+    """
+    Import `(line number, record)` pairs in transactions of `batch_size`
+    lines, skipping the lines up to `start`.
+
+    Every batch is idempotent, so an import stopped at any point can simply
+    be run again; `on_batch` is called with the last line number of every
+    committed batch, to record where to restart from.
+    """
+    stats = ImportStats()
+    records = ((n, r) for n, r in records if n > start)
+    while True:
+        batch = list(itertools.islice(records, batch_size))
+        if not batch:
+            return stats
+        with transaction.atomic():
+            _import_batch(batch, pool, stats)
+        stats.lines += len(batch)
+        if on_batch is not None:
+            on_batch(batch[-1][0])
@@ -0,0 +1,122 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from taskmanager import benchmark
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a synthetic dataset into a throwaway benchmark database, drive every "
+        "task-manager route through the test client and report p50/p95/p99 "
+        "latency, query count and response size per endpoint."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--managers", type=int, default=2)
+        parser.add_argument("--projects-per-manager", type=int, default=2)
+        parser.add_argument("--developers-per-project", type=int, default=10)
+        parser.add_argument("--tasks-per-project", type=int, default=1000)
+        parser.add_argument("--assignees-per-task", type=int, default=2)
+        parser.add_argument("--iterations", type=int, default=20)
+        parser.add_argument("--output", default="benchmark.json")
+        parser.add_argument("--baseline", help="Results file to compare against.")
+        parser.add_argument(
+            "--clobber",
+            action="store_true",
+            help="Drop a benchmark database left by an earlier run without asking.",
+        )
+        parser.add_argument(
+            "--max-latency-increase",
+            type=float,
+            default=0.25,
+            help="Allowed p95 latency increase over the baseline, as a ratio.",
+        )
+        parser.add_argument(
+            "--max-query-increase",
+            type=int,
+            default=0,
+            help="Allowed number of extra queries per request over the baseline.",
+        )
+
+    def handle(self, *args, **options):
+        dataset_options = {
+            "managers": options["managers"],
+            "projects_per_manager": options["projects_per_manager"],
+            "developers_per_project": options["developers_per_project"],
+            "tasks_per_project": options["tasks_per_project"],
+            "assignees_per_task": options["assignees_per_task"],
+        }
+
+        # A database of the configured backend of its own, e.g.
+        # `benchmark_todo` next to the PostgreSQL database of the docker
+        # setup, so the test database of `manage.py test` is left alone. On
+        # SQLite it is an in-memory one.
+        old_name = connection.settings_dict["NAME"]
+        if connection.vendor != "sqlite":
+            connection.settings_dict["TEST"]["NAME"] = f"benchmark_{old_name}"
+        connection.creation.create_test_db(verbosity=0, autoclobber=options["clobber"])
+        database = {
+            "vendor": connection.vendor,
+            "engine": connection.settings_dict["ENGINE"],
+            "name": connection.settings_dict["NAME"],
+        }
+        try:
+            dataset = benchmark.seed(**dataset_options)
+            results = benchmark.run(dataset, iterations=options["iterations"])
+            serialization = benchmark.serialization_cpu(dataset.projects[0])
+            rendering = benchmark.rendering_cpu(dataset.projects[0])
+            connections = benchmark.connection_setup()
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+        report = {
+            "database": database,
+            "dataset": dataset_options,
+            "iterations": options["iterations"],
+            "results": results,
+            "serialization_cpu_ms_per_10k_tasks": serialization,
+            "rendering_cpu_ms_per_10k_tasks": rendering,
+            "connection_setup_ms_per_request": connections,
+        }
+        with open(options["output"], "w") as output:
+            json.dump(report, output, indent=2)
+
+        self.stdout.write(
+            "Database: {vendor} ({engine}), benchmark database {name}".format(**database)
+        )
+        for name, result in results.items():
+            self.stdout.write(
+                "{:<34} p50 {p50_ms:>9.2f}ms  p95 {p95_ms:>9.2f}ms  p99 {p99_ms:>9.2f}ms  "
+                "{queries:>4} queries  {response_bytes:>9} bytes".format(name, **result)
+            )
+
+        self.stdout.write(
+            "Task list body, CPU per 10k tasks: {serializer}ms with TaskSerializer, "
+            "{rows}ms with values() rows".format(**serialization)
+        )
+        self.stdout.write(
+            "Task list JSON, CPU per 10k tasks: {drf}ms with JSONRenderer, "
+            "{fast}ms with FastJSONRenderer".format(**rendering)
+        )
+        self.stdout.write(
+            "Database connection per request: {new_ms}ms connecting, {pooled_ms}ms "
+            "from the pool, {saved_ms}ms saved".format(**connections)
+        )
+
+        if options["baseline"]:
+            with open(options["baseline"]) as baseline:
+                baseline = json.load(baseline)
+            vendor = baseline.get("database", {}).get("vendor")
+            if vendor is not None and vendor != database["vendor"]:
+                raise CommandError(f"The baseline ran on {vendor}, not {database['vendor']}.")
+            regressions = benchmark.compare(
+                results,
+                baseline["results"],
+                max_latency_increase=options["max_latency_increase"],
+                max_query_increase=options["max_query_increase"],
+            )
+            if regressions:
+                raise CommandError("Regressions:\n" + "\n".join(regressions))
+            self.stdout.write(self.style.SUCCESS("No regression against the baseline."))
@@ -0,0 +1,72 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from taskmanager import imports
+
+
+class Command(BaseCommand):
+    help = (
+        "Import users, projects and developer memberships from a CSV or JSONL "
+        "file, see `taskmanager.imports` for its records. Passwords are hashed "
+        "in a process pool and rows inserted in batches. An interrupted import "
+        "restarts after the last committed batch when run again."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path")
+        parser.add_argument("--format", choices=["csv", "jsonl"])
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=os.cpu_count() or 1,
+            help="Password hashing processes, 1 to hash in this process.",
+        )
+        parser.add_argument(
+            "--checkpoint",
+            help="File recording the last imported line, by default <path>.checkpoint.",
+        )
+        parser.add_argument(
+            "--restart", action="store_true", help="Ignore the checkpoint, start from line 1."
+        )
+
+    def handle(self, *args, **options):
+        if not os.path.exists(options["path"]):
+            raise CommandError(f"{options['path']} does not exist.")
+        checkpoint = options["checkpoint"] or options["path"] + ".checkpoint"
+        start = 0
+        if os.path.exists(checkpoint) and not options["restart"]:
+            with open(checkpoint) as file:
+                start = int(file.read() or 0)
+            self.stdout.write(f"Resuming after line {start}.")
+
+        def save_checkpoint(line):
+            with open(checkpoint, "w") as file:
+                file.write(str(line))
+            if options["verbosity"] > 1:
+                self.stdout.write(f"Imported up to line {line}.")
+
+        pool = imports.password_pool(options["workers"])
+        try:
+            stats = imports.import_records(
+                imports.read_records(options["path"], options["format"]),
+                batch_size=options["batch_size"],
+                pool=pool,
+                start=start,
+                on_batch=save_checkpoint,
+            )
+        finally:
+            if pool is not None:
+                pool.shutdown()
+
+        for error in stats.errors:
+            self.stderr.write(error)
+        if os.path.exists(checkpoint):
+            os.remove(checkpoint)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{stats.lines} lines: {stats.users} users, {stats.projects} projects and "
+                f"{stats.memberships} memberships created, {len(stats.errors)} errors."
+            )
+        )
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from taskmanager import sharding
+from taskmanager.models import Project
+
+
+class Command(BaseCommand):
+    help = (
+        "Move a project with its developers, tasks, assignees and counters to "
+        "another shard of PROJECT_SHARDS, while it stays readable."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("project_id", type=int)
+        parser.add_argument("shard", help="Database alias of the target shard.")
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        try:
+            source = sharding.move_project(
+                options["project_id"], options["shard"], batch_size=options["batch_size"]
+            )
+        except (ValueError, Project.DoesNotExist) as exc:
+            raise CommandError(exc)
+        if source == options["shard"]:
+            self.stdout.write(f"Project {options['project_id']} is already in {source}.")
+            return
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Project {options['project_id']} moved from {source} to {options['shard']}."
+            )
+        )
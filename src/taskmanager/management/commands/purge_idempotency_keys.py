@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from taskmanager import idempotency
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete the Idempotency-Key records older than IDEMPOTENCY_KEY_TTL "
+        "seconds, see `taskmanager.idempotency`."
+    )
+
+    def handle(self, *args, **options):
+        deleted = idempotency.purge()
+        self.stdout.write(self.style.SUCCESS(f"{deleted} expired idempotency keys deleted."))
@@ -0,0 +1,45 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from taskmanager import reaper
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete the tasks of the projects deleted from the admin, in small "
+        "batches each in its own transaction, then the projects. With "
+        "--status, only list the projects left to delete and their tasks."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=getattr(settings, "PROJECT_REAPER_BATCH_SIZE", 1000),
+            help="Tasks deleted per transaction.",
+        )
+        parser.add_argument(
+            "--pause",
+            type=float,
+            default=getattr(settings, "PROJECT_REAPER_PAUSE", 0.1),
+            help="Seconds to wait between two batches.",
+        )
+        parser.add_argument(
+            "--status", action="store_true", help="List the projects left to delete and stop."
+        )
+
+    def handle(self, *args, **options):
+        if options["status"]:
+            for row in reaper.pending():
+                self.stdout.write(
+                    "project {id} {name!r} in {database}, deleted at {deleted_at:%Y-%m-%d %H:%M:%S}: "
+                    "{tasks_left} tasks left".format(**row)
+                )
+            return
+
+        def progress(project, deleted):
+            if options["verbosity"] > 1:
+                self.stdout.write(f"project {project.pk}: {deleted} tasks deleted.")
+
+        reaped = reaper.reap(options["batch_size"], options["pause"], on_batch=progress)
+        self.stdout.write(self.style.SUCCESS(f"{reaped} deleted projects reaped."))
@@ -0,0 +1,48 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from taskmanager import sharding, stats
+
+
+class Command(BaseCommand):
+    help = (
+        "Check the per project and per assignee task counters against the task "
+        "tables of every project database, or rebuild them with --rebuild."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--rebuild", action="store_true", help="Recompute every counter from the tasks."
+        )
+        parser.add_argument(
+            "--database",
+            choices=sharding.databases(),
+            help="Only this project database, all of them by default.",
+        )
+
+    def handle(self, *args, **options):
+        databases = [options["database"]] if options["database"] else sharding.databases()
+        if options["rebuild"]:
+            for database in databases:
+                stats.rebuild(database)
+                self.stdout.write(self.style.SUCCESS(f"{database}: task counters rebuilt."))
+            return
+
+        wrong = 0
+        for database in databases:
+            mismatches = stats.verify(database)
+            for (project_id, user_id), (stored, expected) in sorted(
+                mismatches.items(), key=lambda item: (item[0][0], item[0][1] or 0)
+            ):
+                who = f"project {project_id}" + (f" assignee {user_id}" if user_id else "")
+                self.stderr.write(
+                    f"{database}: {who}: open/done {stored[0]}/{stored[1]}, "
+                    f"expected {expected[0]}/{expected[1]}"
+                )
+            if mismatches:
+                self.stderr.write(f"{database}: {len(mismatches)} counters are wrong.")
+            else:
+                self.stdout.write(self.style.SUCCESS(f"{database}: task counters are correct."))
+            wrong += len(mismatches)
+        if wrong:
+            raise CommandError(f"{wrong} counters are wrong, run with --rebuild.")
+        self.stdout.write(self.style.SUCCESS("Task counters are correct."))
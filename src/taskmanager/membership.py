@@ -0,0 +1,178 @@
+import itertools
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import router
+from django.db.models import Q
+
+from taskmanager.models import Project, Task
+
+
+_MISSING = object()
+
+
+class LRUCache:
+    """
+    A small thread-safe LRU cache whose entries expire after `ttl` seconds.
+    """
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is _MISSING:
+                return default
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._data)
+
+
+class MembershipIndex:
+    """
+    Answers "is user X the manager or a developer of project Y" with one
+    indexed existence query, remembered in a process-local LRU cache and,
+    when `MEMBERSHIP_SHARED_CACHE` names a Django cache, in that cache too.
+
+    Entries are never updated in place. Invalidating a project bumps its
+    generation, which is part of every cache key, so stale entries are simply
+    never read again and age out. With a shared cache the generation lives in
+    it and every process sees an invalidation on its next lookup; without
+    one, other processes keep their answer for `MEMBERSHIP_CACHE_TTL` seconds
+    (5 by default then, 30 with a shared cache).
+
+    Local generations are bounded too: they expire with the entries they
+    guard, and are never reused, so a forgotten generation brings no stale
+    entry back.
+    """
+
+    key_prefix = "taskmanager:membership"
+
+    def __init__(self, maxsize, ttl, shared_cache=None):
+        self.local = LRUCache(maxsize, ttl)
+        self.shared_cache = shared_cache
+        self._generations = LRUCache(maxsize, ttl)
+        self._next_generation = itertools.count(1)
+
+    @property
+    def shared(self):
+        return caches[self.shared_cache] if self.shared_cache else None
+
+    def _generation(self, project_id):
+        shared = self.shared
+        if shared is None:
+            return self._generations.get(project_id, 0)
+        return shared.get(f"{self.key_prefix}:{project_id}:gen", 0)
+
+    def is_member(self, user_id, project_id):
+        if user_id is None:
+            return False
+
+        key = f"{self.key_prefix}:{project_id}:{self._generation(project_id)}:{user_id}"
+        value = self.local.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+
+        shared = self.shared
+        if shared is not None:
+            value = shared.get(key, _MISSING)
+        if value is _MISSING:
+            # Permission checks always read the primary, never a replica.
+            value = (
+                Project.objects.using(router.db_for_write(Project))
+                .live()
+                .filter(pk=project_id)
+                .filter(Q(manager_id=user_id) | Q(developers=user_id))
+                .exists()
+            )
+            if shared is not None:
+                shared.set(key, value, self.local.ttl)
+
+        self.local.set(key, value)
+        return value
+
+    def invalidate(self, project_id):
+        generations = self._generations
+        if len(generations) >= generations.maxsize and generations.get(project_id) is None:
+            # Evicting the generation of another project could bring its
+            # entries back: drop them all instead.
+            self.local.clear()
+        generations.set(project_id, next(self._next_generation))
+        shared = self.shared
+        if shared is not None:
+            key = f"{self.key_prefix}:{project_id}:gen"
+            shared.add(key, 0, None)
+            shared.incr(key)
+
+    def clear(self):
+        self._generations.clear()
+        self.local.clear()
+
+
+index = MembershipIndex(
+    maxsize=getattr(settings, "MEMBERSHIP_CACHE_SIZE", 10000),
+    ttl=getattr(
+        settings,
+        "MEMBERSHIP_CACHE_TTL",
+        30 if getattr(settings, "MEMBERSHIP_SHARED_CACHE", None) else 5,
+    ),
+    shared_cache=getattr(settings, "MEMBERSHIP_SHARED_CACHE", None),
+)
+
+
+def is_manager_or_developer(user, project):
+    return index.is_member(user.pk, project.pk)
+
+
+def is_task_assignee(user, task):
+    return (
+        user.pk is not None
+        and Task.assignee.through.objects.using(router.db_for_write(Task))
+        .filter(task_id=task.pk, user_id=user.pk)
+        .exists()
+    )
+
+
+def developer_ids_among(project, user_ids):
+    """
+    Return which of `user_ids` are developers of `project`, without loading
+    the other developers of the project.
+    """
+    return set(
+        Project.developers.through.objects.using(router.db_for_write(Project))
+        .filter(project_id=project.pk, user_id__in=set(user_ids))
+        .values_list("user_id", flat=True)
+    )
+
+
+def are_developers(project, user_ids):
+    return developer_ids_among(project, user_ids) == set(user_ids)
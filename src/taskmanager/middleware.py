@@ -0,0 +1,226 @@
+import json
+import logging
+import time
+from collections import Counter
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+from taskmanager import routers
+
+
+logger = logging.getLogger("taskmanager.timing")
+
+# Timings of the request being served. Context variables follow the request
+# into the threads `sync_to_async` runs the ORM in under ASGI, so queries are
+# counted the same way for WSGI and ASGI.
+_current = ContextVar("request_timings", default=None)
+
+
+class RequestTimings:
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.view_start = None
+        self.render_start = None
+        self.queries = 0
+        self.db_time = 0.0
+        self.worst_query = None
+        self.worst_query_time = 0.0
+        self.statements = Counter()
+
+    def add_query(self, sql, duration):
+        self.queries += 1
+        self.db_time += duration
+        self.statements[sql] += 1
+        if duration >= self.worst_query_time:
+            self.worst_query, self.worst_query_time = sql, duration
+
+
+def time_query(execute, sql, params, many, context):
+    """
+    Database execute wrapper adding every query to the current request timings.
+    """
+    timings = _current.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timings.add_query(sql, time.perf_counter() - start)
+
+
+def install_query_timer(connection):
+    if time_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(time_query)
+
+
+@receiver(connection_created)
+def connection_created_handler(sender, connection, **kwargs):
+    install_query_timer(connection)
+
+
+class RequestTimingMiddleware:
+    """
+    Measures every request: SQL query count and time, view time, response
+    render time and total time, sent back in a `Server-Timing` header.
+
+    Requests slower than `REQUEST_TIMING_SLOW_MS` or running more than
+    `REQUEST_TIMING_MAX_QUERIES` queries are logged on the
+    "taskmanager.timing" logger as one JSON line, with the slowest query and
+    how often the most repeated statement ran, which points at N+1 loops.
+
+    Disabled unless `REQUEST_TIMING_ENABLED` is set.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, "REQUEST_TIMING_ENABLED", False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            # Tells Django this instance must be awaited.
+            markcoroutinefunction(self)
+        # Connections opened before this middleware was loaded.
+        for connection in connections.all():
+            install_query_timer(connection)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        timings = request._timings = RequestTimings()
+        token = _current.set(timings)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, timings)
+
+    async def __acall__(self, request):
+        timings = request._timings = RequestTimings()
+        token = _current.set(timings)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, timings)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request._timings.view_start = time.perf_counter()
+
+    def process_template_response(self, request, response):
+        # DRF responses are rendered right after this hook returns.
+        request._timings.render_start = time.perf_counter()
+        return response
+
+    def finish(self, request, response, timings):
+        end = time.perf_counter()
+        total = (end - timings.start) * 1000
+        db = timings.db_time * 1000
+        metrics = [f'db;dur={db:.2f};desc="{timings.queries} queries"']
+        if timings.view_start is not None:
+            view_end = timings.render_start or end
+            metrics.append(f"view;dur={(view_end - timings.view_start) * 1000:.2f}")
+        if timings.render_start is not None:
+            metrics.append(f"render;dur={(end - timings.render_start) * 1000:.2f}")
+        metrics.append(f"total;dur={total:.2f}")
+        response["Server-Timing"] = ", ".join(metrics)
+
+        if total >= getattr(settings, "REQUEST_TIMING_SLOW_MS", 500) or (
+            timings.queries > getattr(settings, "REQUEST_TIMING_MAX_QUERIES", 50)
+        ):
+            repeated_sql, repeated = (timings.statements.most_common(1) or [(None, 0)])[0]
+            logger.warning(
+                json.dumps(
+                    {
+                        "method": request.method,
+                        "path": request.get_full_path(),
+                        "status": response.status_code,
+                        "total_ms": round(total, 2),
+                        "db_ms": round(db, 2),
+                        "queries": timings.queries,
+                        "worst_query": timings.worst_query,
+                        "worst_query_ms": round(timings.worst_query_time * 1000, 2),
+                        "most_repeated_query": repeated_sql,
+                        "most_repeated_query_count": repeated,
+                    }
+                )
+            )
+        return response
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Sends the reads of safe (GET, HEAD, OPTIONS) requests to one of the
+    `READ_REPLICAS`, see `taskmanager.routers.ReplicaRouter`.
+
+    A successful write pins its client to the primary for
+    `REPLICA_PIN_SECONDS`, so it reads its own writes however far behind the
+    replicas are. The pin is sent back in a cookie and in an `X-Primary-Pin`
+    header (the time it ends, in seconds since the epoch); clients that don't
+    keep cookies echo the header in their next requests.
+
+    Disabled when no replica is configured.
+    """
+
+    sync_capable = True
+    async_capable = True
+    cookie_name = "primary_pin"
+    header_name = "X-Primary-Pin"
+    safe_methods = ("GET", "HEAD", "OPTIONS")
+
+    def __init__(self, get_response):
+        if not getattr(settings, "READ_REPLICAS", []):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            # Tells Django this instance must be awaited.
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        token = routers.read_from(self.read_alias(request))
+        try:
+            response = self.get_response(request)
+        finally:
+            routers.reset_read_alias(token)
+        return self.pin(request, response)
+
+    async def __acall__(self, request):
+        token = routers.read_from(self.read_alias(request))
+        try:
+            response = await self.get_response(request)
+        finally:
+            routers.reset_read_alias(token)
+        return self.pin(request, response)
+
+    def pinned_until(self, request):
+        value = request.COOKIES.get(self.cookie_name) or request.headers.get(self.header_name)
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            return 0
+
+    def read_alias(self, request):
+        if request.method not in self.safe_methods or self.pinned_until(request) > time.time():
+            return None
+        return routers.choose_replica()
+
+    def pin(self, request, response):
+        if request.method in self.safe_methods or response.status_code >= 400:
+            return response
+        seconds = getattr(settings, "REPLICA_PIN_SECONDS", 5)
+        until = str(int(time.time() + seconds) + 1)
+        response.set_cookie(self.cookie_name, until, max_age=seconds + 1, httponly=True)
+        response[self.header_name] = until
+        return response
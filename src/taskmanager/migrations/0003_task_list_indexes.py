@@ -0,0 +1,26 @@
+# Generated by Django 3.2.16 on 2026-10-18 10:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('taskmanager', '0002_project_version'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['project', 'is_done'], name='task_project_is_done_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['project', 'creator'], name='task_project_creator_idx'),
+        ),
+        # The auto-created through table can't declare indexes, hence raw SQL.
+        migrations.RunSQL(
+            sql='CREATE INDEX task_assignee_user_task_idx ON taskmanager_task_assignee (user_id, task_id)',
+            reverse_sql='DROP INDEX task_assignee_user_task_idx',
+        ),
+    ]
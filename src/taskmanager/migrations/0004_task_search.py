@@ -0,0 +1,96 @@
+from django.db import migrations
+
+
+# The full-text index of the task titles and descriptions as it was created
+# by this migration, see `taskmanager.search`. The SQL is copied here so later
+# changes of that module don't change what this migration does.
+
+POSTGRESQL_INSTALL = [
+    """
+    ALTER TABLE taskmanager_task ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(description, '')), 'B')
+    ) STORED
+    """,
+    "CREATE INDEX IF NOT EXISTS task_search_vector_idx "
+    "ON taskmanager_task USING GIN (search_vector)",
+]
+
+POSTGRESQL_UNINSTALL = [
+    "DROP INDEX IF EXISTS task_search_vector_idx",
+    "ALTER TABLE taskmanager_task DROP COLUMN IF EXISTS search_vector",
+]
+
+SQLITE_INSTALL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS taskmanager_task_fts USING fts5(
+        title, description, content='taskmanager_task', content_rowid='id'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS taskmanager_task_fts_insert
+    AFTER INSERT ON taskmanager_task BEGIN
+        INSERT INTO taskmanager_task_fts (rowid, title, description)
+        VALUES (new.id, new.title, new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS taskmanager_task_fts_delete
+    AFTER DELETE ON taskmanager_task BEGIN
+        INSERT INTO taskmanager_task_fts (taskmanager_task_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS taskmanager_task_fts_update
+    AFTER UPDATE OF title, description ON taskmanager_task BEGIN
+        INSERT INTO taskmanager_task_fts (taskmanager_task_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+        INSERT INTO taskmanager_task_fts (rowid, title, description)
+        VALUES (new.id, new.title, new.description);
+    END
+    """,
+    "INSERT INTO taskmanager_task_fts (taskmanager_task_fts) VALUES ('rebuild')",
+]
+
+SQLITE_UNINSTALL = [
+    "DROP TRIGGER IF EXISTS taskmanager_task_fts_insert",
+    "DROP TRIGGER IF EXISTS taskmanager_task_fts_delete",
+    "DROP TRIGGER IF EXISTS taskmanager_task_fts_update",
+    "DROP TABLE IF EXISTS taskmanager_task_fts",
+]
+
+
+class VendorRunSQL(migrations.RunSQL):
+    """
+    `RunSQL` only run on the databases of one vendor.
+    """
+
+    def __init__(self, vendor, *args, **kwargs):
+        self.vendor = vendor
+        super().__init__(*args, **kwargs)
+
+    def deconstruct(self):
+        name, args, kwargs = super().deconstruct()
+        return name, [self.vendor, *args], kwargs
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == self.vendor:
+            super().database_forwards(app_label, schema_editor, from_state, to_state)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == self.vendor:
+            super().database_backwards(app_label, schema_editor, from_state, to_state)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('taskmanager', '0003_task_list_indexes'),
+    ]
+
+    operations = [
+        VendorRunSQL("postgresql", POSTGRESQL_INSTALL, POSTGRESQL_UNINSTALL),
+        VendorRunSQL("sqlite", SQLITE_INSTALL, SQLITE_UNINSTALL),
+    ]
@@ -0,0 +1,72 @@
+# Generated by Django 3.2.16 on 2026-10-18 10:47
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def count_existing_tasks(apps, schema_editor):
+    Task = apps.get_model("taskmanager", "Task")
+    ProjectTaskStats = apps.get_model("taskmanager", "ProjectTaskStats")
+    AssigneeTaskStats = apps.get_model("taskmanager", "AssigneeTaskStats")
+    using = schema_editor.connection.alias
+
+    projects, assignees = {}, {}
+    tasks = Task.objects.using(using).values("project_id", "is_done")
+    for row in tasks.annotate(n=models.Count("id")).order_by():
+        counts = projects.setdefault(row["project_id"], [0, 0])
+        counts[row["is_done"]] += row["n"]
+    links = Task.assignee.through.objects.using(using).values(
+        "task__project_id", "task__is_done", "user_id"
+    )
+    for row in links.annotate(n=models.Count("id")).order_by():
+        counts = assignees.setdefault((row["task__project_id"], row["user_id"]), [0, 0])
+        counts[row["task__is_done"]] += row["n"]
+
+    ProjectTaskStats.objects.using(using).bulk_create(
+        [
+            ProjectTaskStats(project_id=project_id, open_tasks=o, done_tasks=d)
+            for project_id, (o, d) in projects.items()
+        ],
+        batch_size=1000,
+    )
+    AssigneeTaskStats.objects.using(using).bulk_create(
+        [
+            AssigneeTaskStats(project_id=project_id, user_id=user_id, open_tasks=o, done_tasks=d)
+            for (project_id, user_id), (o, d) in assignees.items()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('taskmanager', '0004_task_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProjectTaskStats',
+            fields=[
+                ('project', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='task_stats', serialize=False, to='taskmanager.project')),
+                ('open_tasks', models.IntegerField(default=0)),
+                ('done_tasks', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='AssigneeTaskStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('open_tasks', models.IntegerField(default=0)),
+                ('done_tasks', models.IntegerField(default=0)),
+                ('project', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='assignee_task_stats', to='taskmanager.project')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='assigneetaskstats',
+            constraint=models.UniqueConstraint(fields=('project', 'user'), name='assignee_task_stats_project_user'),
+        ),
+        migrations.RunPython(count_existing_tasks, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 3.2.16 on 2026-10-18 11:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('taskmanager', '0010_task_version'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['project', 'title', 'id'], name='task_project_title_idx'),
+        ),
+    ]
@@ -1,5 +1,8 @@
+from django.conf import settings
 from django.contrib.auth.models import AbstractUser
-from django.db import models
+from django.db import DEFAULT_DB_ALIAS, models, router, transaction
+from django.db.models import F, Max
+from django.utils import timezone
 
 
 
@@ -17,16 +20,70 @@ class User(AbstractUser):
     
 
 
+class ProjectQuerySet(models.QuerySet):
+    def live(self):
+        """
+        The projects not deleted, see `Project.soft_delete`.
+        """
+        return self.filter(deleted_at=None)
+
+
 class Project(models.Model):
     
     name = models.TextField(blank=True, null=True)
+    # Users live in the default database, projects may live in a shard (see
+    # `taskmanager.sharding`): no constraint on the references to users.
     manager = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
         default=None,
         related_name="manager_projects",
+        db_constraint=False,
     )
-    developers = models.ManyToManyField(User,related_name="projects")
+    developers = models.ManyToManyField(User,related_name="projects", db_constraint=False)
+    # Bumped on every change of the project tasks or members, see `bump_version`.
+    version = models.PositiveBigIntegerField(default=0)
+    # Set when the project is deleted, its rows are then deleted in the
+    # background by `taskmanager.reaper`.
+    deleted_at = models.DateTimeField(blank=True, null=True, db_index=True)
+
+    objects = ProjectQuerySet.as_manager()
+
+    @classmethod
+    def bump_version(cls, *project_ids):
+        """
+        Increment the version of the projects in the database, without
+        loading them.
+        """
+        cls.objects.filter(pk__in=project_ids).update(version=F("version") + 1)
+
+    def save(self, *args, **kwargs):
+        """
+        With `PROJECT_SHARDS`, a new project gets an id unique across the
+        shards and is written to the shard the shard map assigns it.
+        """
+        shards = getattr(settings, "PROJECT_SHARDS", [])
+        if self.pk is None and shards:
+            self.pk = IdSequence.allocate("project")
+            database = ProjectShard.place(self.pk)
+            ProjectShard.objects.using(DEFAULT_DB_ALIAS).create(project_id=self.pk, database=database)
+            kwargs.update(using=database, force_insert=True)
+        super().save(*args, **kwargs)
+
+    def soft_delete(self):
+        """
+        Hide the project from every view at once, its tasks are deleted
+        later in small batches by `taskmanager.reaper`.
+        """
+        if self.deleted_at is None:
+            self.deleted_at = timezone.now()
+            self.save(update_fields=["deleted_at"])
+
+
+class StaleTask(Exception):
+    """
+    The task was changed since the version expected by a conditional save.
+    """
 
 
 class Task(models.Model):
@@ -42,8 +99,193 @@ class Task(models.Model):
         on_delete=models.CASCADE,
         default=None,
         related_name="created_tasks",
+        db_constraint=False,
     )    
-    assignee = models.ManyToManyField(User, blank=True)
+    assignee = models.ManyToManyField(User, blank=True, db_constraint=False)
+
+    updated_at = models.DateTimeField(auto_now=True)
+    # The project version of the last change of the task, see `taskmanager.changes`.
+    change_seq = models.PositiveBigIntegerField(default=0)
+    # Bumped once by every write of the task, its ETag (see `Task.save`).
+    version = models.PositiveBigIntegerField(default=1)
+
+    class Meta:
+        # Access paths of the task list filters (see `taskmanager.filters`).
+        # The reverse (user, task) index of the assignee through table is
+        # created by migration 0003.
+        indexes = [
+            models.Index(fields=["project", "is_done"], name="task_project_is_done_idx"),
+            models.Index(fields=["project", "creator"], name="task_project_creator_idx"),
+            # The title prefix filter and the title ordering.
+            models.Index(fields=["project", "title", "id"], name="task_project_title_idx"),
+            # The `since` task list reads the changes of a project in order.
+            models.Index(fields=["project", "change_seq", "id"], name="task_project_change_seq_idx"),
+        ]
+
+    def save(self, *args, **kwargs):
+        """
+        An update of a loaded task bumps its version. The API writes don't
+        save tasks: they update them with one conditional UPDATE, see
+        `taskmanager.bulk.update_task`.
+
+        With `PROJECT_SHARDS`, a new task gets an id unique across the shards
+        and is written to the shard of its project.
+        """
+        if self.pk is None and getattr(settings, "PROJECT_SHARDS", []):
+            self.pk = IdSequence.allocate("task")
+            kwargs.update(using=router.db_for_write(Task, instance=self), force_insert=True)
+        if kwargs.get("update_fields"):
+            kwargs["update_fields"] = {*kwargs["update_fields"], "updated_at", "version"}
+        if self._state.adding:
+            return super().save(*args, **kwargs)
+        self.version = F("version") + 1
+        super().save(*args, **kwargs)
+        self.refresh_from_db(fields=["version"])
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        task = super().from_db(db, field_names, values)
+        # The stored state, to count what a save changes (see `taskmanager.stats`).
+        task._saved_state = (task.__dict__.get("project_id"), task.__dict__.get("is_done"))
+        return task
+
+
+class TaskTombstone(models.Model):
+    """
+    A task deleted from a project (or moved out of it), for the `since`
+    task list, see `taskmanager.changes`.
+    """
+
+    # No constraint: tombstones are written while the tasks of a deleted
+    # project are deleted, they are removed with the project afterwards.
+    project = models.ForeignKey(
+        Project, on_delete=models.DO_NOTHING, db_constraint=False, related_name="+"
+    )
+    task_id = models.BigIntegerField()
+    change_seq = models.PositiveBigIntegerField()
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["project", "change_seq", "task_id"], name="tombstone_project_seq_idx"
+            ),
+        ]
+
+
+class ProjectTaskStats(models.Model):
+    """
+    Number of open and done tasks of a project, kept up to date by
+    `taskmanager.stats`.
+    """
+
+    project = models.OneToOneField(
+        Project, on_delete=models.CASCADE, primary_key=True, related_name="task_stats"
+    )
+    open_tasks = models.IntegerField(default=0)
+    done_tasks = models.IntegerField(default=0)
+
+
+class AssigneeTaskStats(models.Model):
+    """
+    Number of open and done tasks of a project assigned to a user, kept up
+    to date by `taskmanager.stats`.
+    """
+
+    project = models.ForeignKey(
+        Project, on_delete=models.CASCADE, related_name="assignee_task_stats"
+    )
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="+", db_constraint=False)
+    open_tasks = models.IntegerField(default=0)
+    done_tasks = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["project", "user"], name="assignee_task_stats_project_user"
+            ),
+        ]
+
+
+class ProjectShard(models.Model):
+    """
+    The shard map: the database of a project when `PROJECT_SHARDS` is set
+    (see `taskmanager.sharding`). Projects without an entry live in the
+    default database. Kept in the default database.
+    """
+
+    project_id = models.BigIntegerField(primary_key=True)
+    database = models.CharField(max_length=100)
+
+    @staticmethod
+    def place(project_id):
+        """
+        The shard of a new project.
+        """
+        shards = settings.PROJECT_SHARDS
+        return shards[project_id % len(shards)]
+
+
+class IdSequence(models.Model):
+    """
+    The last id allocated to the projects or tasks of every shard, so ids
+    stay unique when projects move between shards. Kept in the default
+    database.
+    """
+
+    MODELS = {"project": Project, "task": Task}
+
+    name = models.CharField(max_length=20, primary_key=True)
+    value = models.BigIntegerField(default=0)
+
+    @classmethod
+    def allocate(cls, name, count=1):
+        """
+        Reserve `count` consecutive ids of `name` ("project" or "task") and
+        return the first one. The sequence starts after the highest id of
+        every shard.
+
+        Without `PROJECT_SHARDS` the rows saved one by one take their ids
+        from the table: the reserved ids also start after the highest one.
+        """
+        model = cls.MODELS[name]
+        with transaction.atomic(using=DEFAULT_DB_ALIAS):
+            sequence = cls.objects.using(DEFAULT_DB_ALIAS).filter(name=name)
+            if not sequence.update(value=F("value") + count):
+                start = max(
+                    model.objects.using(database).aggregate(last=Max("id"))["last"] or 0
+                    for database in getattr(settings, "PROJECT_SHARDS", []) or [DEFAULT_DB_ALIAS]
+                )
+                cls.objects.using(DEFAULT_DB_ALIAS).bulk_create(
+                    [cls(name=name, value=start)], ignore_conflicts=True
+                )
+                sequence.update(value=F("value") + count)
+            last = sequence.values_list("value", flat=True).get()
+            if not getattr(settings, "PROJECT_SHARDS", []):
+                highest = model.objects.using(DEFAULT_DB_ALIAS).aggregate(last=Max("id"))["last"]
+                if highest is not None and last - count < highest:
+                    last = highest + count
+                    sequence.update(value=last)
+            return last - count + 1
+
 
+class IdempotencyKey(models.Model):
+    """
+    A write made with an `Idempotency-Key` header and its response, replayed
+    to the retries of the request (see `taskmanager.idempotency`). Kept in
+    the database of the write.
+    """
 
+    user_id = models.BigIntegerField()
+    key = models.CharField(max_length=255)
+    # SHA-256 of the method, path and data of the request.
+    fingerprint = models.CharField(max_length=64)
+    # Unset while the first request is running.
+    status_code = models.PositiveSmallIntegerField(blank=True, null=True)
+    body = models.BinaryField(blank=True, null=True)
+    headers = models.JSONField(default=dict)
+    created_at = models.DateTimeField(db_index=True)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["user_id", "key"], name="idempotency_key_user_key"),
+        ]
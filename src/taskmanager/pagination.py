@@ -0,0 +1,147 @@
+import base64
+import binascii
+import json
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination:
+    """
+    Cursor (keyset) pagination.
+
+    Every page is fetched with an indexed ``WHERE (ordering) > (cursor)``
+    lookup instead of an OFFSET, so a page costs the same however deep into
+    the list the client is. The response body stays a plain list and the next
+    page is advertised in the ``Link`` header (``rel="next"``).
+
+    `ordering` is a single field name, optionally prefixed with "-"; the
+    primary key is always added as a tie breaker in the same direction. For
+    an ordering on the primary key the cursor is the last id itself, for any
+    other ordering it is an opaque token holding the last (value, id).
+    """
+
+    page_size = 100
+    max_page_size = 1000
+    cursor_query_param = "cursor"
+    page_size_query_param = "page_size"
+    invalid_cursor_message = "Invalid cursor"
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if page_size <= 0:
+            return self.page_size
+        return min(page_size, self.max_page_size)
+
+    @staticmethod
+    def get_fields(ordering):
+        descending = ordering.startswith("-")
+        field = ordering.lstrip("-")
+        fields = (field,) if field in ("id", "pk") else (field, "id")
+        return fields, descending
+
+    def encode_cursor(self, position):
+        if len(position) == 1:
+            return str(position[0])
+        return base64.urlsafe_b64encode(json.dumps(position).encode()).decode()
+
+    def decode_cursor(self, request, fields):
+        cursor = request.query_params.get(self.cursor_query_param)
+        if cursor is None:
+            return None
+        try:
+            if len(fields) == 1:
+                return [int(cursor)]
+            position = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        except (ValueError, binascii.Error):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(position, list) or len(position) != len(fields):
+            raise NotFound(self.invalid_cursor_message)
+        # A crafted cursor must not reach the database as a value of the wrong
+        # type: the ordering value is a JSON string or number, the id an int.
+        *values, pk = position
+        for value in values:
+            if isinstance(value, bool) or not isinstance(value, (str, int, float)):
+                raise NotFound(self.invalid_cursor_message)
+        if isinstance(pk, bool) or not isinstance(pk, (str, int)):
+            raise NotFound(self.invalid_cursor_message)
+        try:
+            return [*values, int(pk)]
+        except ValueError:
+            raise NotFound(self.invalid_cursor_message)
+
+    @staticmethod
+    def after(fields, position, descending):
+        """
+        Build the keyset condition ``(fields) > (position)`` (or ``<``).
+        """
+        lookup = "lt" if descending else "gt"
+        condition = Q()
+        for i, field in enumerate(fields):
+            equal = {f: value for f, value in zip(fields[:i], position[:i])}
+            condition |= Q(**equal, **{f"{field}__{lookup}": position[i]})
+        return condition
+
+    @staticmethod
+    def get_position(row, fields):
+        if isinstance(row, dict):
+            return [row[field] for field in fields]
+        return [getattr(row, field) for field in fields]
+
+    def paginate_queryset(self, queryset, request, ordering="id"):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+
+        fields, descending = self.get_fields(ordering)
+        position = self.decode_cursor(request, fields)
+        if position is not None:
+            queryset = queryset.filter(self.after(fields, position, descending))
+        prefix = "-" if descending else ""
+        queryset = queryset.order_by(*(prefix + field for field in fields))
+
+        # One extra row tells us whether there is a next page without a COUNT.
+        rows = list(queryset[: self.page_size + 1])
+        self.has_next = len(rows) > self.page_size
+        page = rows[: self.page_size]
+        self.next_cursor = (
+            self.encode_cursor(self.get_position(page[-1], fields)) if self.has_next else None
+        )
+        return page
+
+    def paginate_querysets(self, querysets, request, ordering="id"):
+        """
+        Paginate the union of `querysets`, e.g. the same query on several
+        databases: a page is read from each of them and the pages merged.
+        """
+        rows, has_next = [], False
+        for queryset in querysets:
+            rows += self.paginate_queryset(queryset, request, ordering)
+            has_next = has_next or self.has_next
+        fields, descending = self.get_fields(ordering)
+        rows.sort(key=lambda row: self.get_position(row, fields), reverse=descending)
+        self.has_next = has_next or len(rows) > self.page_size
+        page = rows[: self.page_size]
+        self.next_cursor = (
+            self.encode_cursor(self.get_position(page[-1], fields)) if self.has_next else None
+        )
+        return page
+
+    def get_next_link(self):
+        if self.next_cursor is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.next_cursor)
+
+    def get_headers(self):
+        next_link = self.get_next_link()
+        if next_link:
+            return {"Link": f'<{next_link}>; rel="next"'}
+        return {}
+
+    def get_paginated_response(self, data):
+        return Response(data, headers=self.get_headers())
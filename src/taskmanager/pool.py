@@ -0,0 +1,246 @@
+import os
+import threading
+import time
+
+from django.db.utils import OperationalError
+
+
+# Database connections are pooled per process when the database ENGINE is
+# one of the `taskmanager.backends` wrappers of the Django backends. Django
+# keeps one connection per thread and database, and closes it at the end of
+# every request (or after `CONN_MAX_AGE`); the wrappers take it from the
+# pool of the database alias instead of connecting, and give it back instead
+# of closing it. The pool is bounded: a process never has more than
+# `POOL["MAX_SIZE"]` connections to one database, however many threads it
+# runs, a thread waits for a free connection for up to `POOL["TIMEOUT"]`
+# seconds.
+
+
+class PoolTimeout(OperationalError):
+    pass
+
+
+class ConnectionPool:
+    """
+    A bounded pool of DB-API connections shared by the threads of a process.
+
+    Connections are reused most recently released first, and closed once
+    they are older than `max_age` seconds. With `pre_ping`, an idle
+    connection is checked with a `SELECT 1` before being handed out, and
+    replaced by a new one if the server went away.
+    """
+
+    def __init__(self, max_size=10, max_age=None, timeout=10, pre_ping=True):
+        self.max_size = max(max_size, 1)
+        self.max_age = max_age
+        self.timeout = timeout
+        self.pre_ping = pre_ping
+        # (connection, creation time) of the idle connections.
+        self._idle = []
+        # Creation time of the connections in use, by id.
+        self._created = {}
+        self._in_use = 0
+        self._lock = threading.Condition()
+        self.waits = 0
+        self.wait_time = 0.0
+        self.timeouts = 0
+        self.opened = 0
+        self.closed = 0
+        self.ping_failures = 0
+
+    def acquire(self, connect):
+        """
+        Return an idle connection, or a new one made with `connect` while
+        the pool is not full. Raises `PoolTimeout` when no connection was
+        released in time.
+        """
+        connection = created = waited_from = None
+        with self._lock:
+            while True:
+                if self._idle:
+                    connection, created = self._idle.pop()
+                    self._in_use += 1
+                    break
+                if self._in_use < self.max_size:
+                    self._in_use += 1
+                    break
+                now = time.monotonic()
+                if waited_from is None:
+                    waited_from = now
+                    self.waits += 1
+                remaining = waited_from + self.timeout - now
+                if remaining <= 0:
+                    self.timeouts += 1
+                    self.wait_time += now - waited_from
+                    raise PoolTimeout(
+                        f"No database connection released within {self.timeout}s, "
+                        f"{self.max_size} in use."
+                    )
+                self._lock.wait(remaining)
+            if waited_from is not None:
+                self.wait_time += time.monotonic() - waited_from
+
+        if connection is not None and (self._expired(created) or not self._usable(connection)):
+            self._close(connection)
+            connection = None
+        if connection is None:
+            try:
+                connection = connect()
+            except BaseException:
+                with self._lock:
+                    self._in_use -= 1
+                    self._lock.notify()
+                raise
+            created = time.monotonic()
+            with self._lock:
+                self.opened += 1
+        with self._lock:
+            self._created[id(connection)] = created
+        return connection
+
+    def release(self, connection, reusable=True):
+        """
+        Give back a connection taken with `acquire`. Its transaction is rolled
+        back; it is closed instead if it is not `reusable`, too old or broken.
+        """
+        with self._lock:
+            created = self._created.pop(id(connection), None)
+        if created is None or self._expired(created):
+            reusable = False
+        if reusable:
+            try:
+                connection.rollback()
+            except Exception:
+                reusable = False
+        with self._lock:
+            self._in_use -= 1
+            if reusable:
+                self._idle.append((connection, created))
+            expired = [entry for entry in self._idle if self._expired(entry[1])]
+            self._idle = [entry for entry in self._idle if not self._expired(entry[1])]
+            self._lock.notify()
+        if not reusable:
+            self._close(connection)
+        for old, _ in expired:
+            self._close(old)
+
+    def close_idle(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for connection, _ in idle:
+            self._close(connection)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "max_size": self.max_size,
+                "in_use": self._in_use,
+                "idle": len(self._idle),
+                "waits": self.waits,
+                "wait_time_ms": round(self.wait_time * 1000, 3),
+                "timeouts": self.timeouts,
+                "opened": self.opened,
+                "closed": self.closed,
+                "ping_failures": self.ping_failures,
+            }
+
+    def _expired(self, created):
+        return self.max_age is not None and time.monotonic() - created >= self.max_age
+
+    def _usable(self, connection):
+        if not self.pre_ping:
+            return True
+        try:
+            cursor = connection.cursor()
+            try:
+                cursor.execute("SELECT 1")
+            finally:
+                cursor.close()
+            # Don't leave a transaction open on connections not in autocommit.
+            connection.rollback()
+            return True
+        except Exception:
+            with self._lock:
+                self.ping_failures += 1
+            return False
+
+    def _close(self, connection):
+        with self._lock:
+            self.closed += 1
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+_pid = os.getpid()
+
+
+def get_pool(alias, settings_dict):
+    """
+    The pool of the database `alias` in this process, made from the `POOL`
+    options of its settings.
+    """
+    global _pid
+    with _pools_lock:
+        if os.getpid() != _pid:
+            # A forked worker doesn't share the connections of its parent.
+            _pools.clear()
+            _pid = os.getpid()
+        pool = _pools.get(alias)
+        if pool is None:
+            options = settings_dict.get("POOL") or {}
+            pool = _pools[alias] = ConnectionPool(
+                max_size=options.get("MAX_SIZE", 10),
+                max_age=options.get("MAX_AGE"),
+                timeout=options.get("TIMEOUT", 10),
+                pre_ping=options.get("PRE_PING", True),
+            )
+        return pool
+
+
+def pool_stats():
+    """
+    The statistics of the pools of this process, by database alias.
+    """
+    with _pools_lock:
+        pools = dict(_pools) if os.getpid() == _pid else {}
+    return {alias: pool.stats() for alias, pool in pools.items()}
+
+
+def close_pool(alias):
+    """
+    Close the idle connections of the database `alias` and forget its pool.
+    """
+    with _pools_lock:
+        pool = _pools.pop(alias, None)
+    if pool is not None:
+        pool.close_idle()
+
+
+class PooledDatabaseWrapperMixin:
+    """
+    Mixed into the `DatabaseWrapper` of a Django backend, takes connections
+    from the pool of the database alias and gives them back on close.
+    """
+
+    def use_pool(self):
+        return True
+
+    def get_new_connection(self, conn_params):
+        connect = super().get_new_connection
+        if not self.use_pool():
+            return connect(conn_params)
+        return get_pool(self.alias, self.settings_dict).acquire(lambda: connect(conn_params))
+
+    def _close(self):
+        if self.connection is None or not self.use_pool():
+            return super()._close()
+        # A connection closed in an atomic block stays referenced by this
+        # wrapper (see `BaseDatabaseWrapper.close`), it can't be shared.
+        with self.wrap_database_errors:
+            get_pool(self.alias, self.settings_dict).release(
+                self.connection, reusable=not self.in_atomic_block
+            )
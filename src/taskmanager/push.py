@@ -0,0 +1,239 @@
+import asyncio
+import io
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.middleware import AuthenticationMiddleware
+from django.contrib.sessions.middleware import SessionMiddleware
+from django.core import signals
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse
+from django.urls import Resolver404, resolve
+from rest_framework import status
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+from taskmanager import events, sharding
+from taskmanager.async_views import _authenticate
+from taskmanager.events import broker
+from taskmanager.models import Project
+from taskmanager.renderers import FastJSONRenderer
+from taskmanager.utils import JSONResponse
+from taskmanager.views import TaskView
+
+
+# Task events (see `taskmanager.events`) are pushed to the clients of the
+# ASGI application, as server-sent events for plain GET requests and as
+# JSON text messages on WebSocket connections, on the url of `task_events`.
+
+
+def task_events(request, project_id):
+    """
+    The url of the task events, served by `router` in ASGI mode only.
+    """
+    return JsonResponse(
+        {"detail": "Task events are only served by the ASGI application."},
+        status=status.HTTP_501_NOT_IMPLEMENTED,
+    )
+
+
+def router(application):
+    """
+    Wrap the Django ASGI `application`, serving the task events itself.
+    """
+
+    async def app(scope, receive, send):
+        if scope["type"] in ("http", "websocket"):
+            try:
+                match = resolve(scope["path"])
+            except Resolver404:
+                match = None
+            if match is not None and match.func is task_events:
+                project_id = match.kwargs["project_id"]
+                if scope["type"] == "websocket":
+                    return await _websocket(scope, receive, send, project_id)
+                if scope["method"] == "GET":
+                    return await _event_stream(scope, receive, send, project_id)
+        if scope["type"] == "websocket":
+            # No other WebSocket endpoint.
+            await receive()
+            return await send({"type": "websocket.close"})
+        return await application(scope, receive, send)
+
+    return app
+
+
+def _no_response(request):
+    return None
+
+
+def _check_access(scope, project_id):
+    """
+    Authenticate the client like the API views do and apply the permission
+    rule of `TaskView`. Returns None or the `(detail, status, headers)` error.
+    """
+    signals.request_started.send(sender=__name__, scope=scope)
+    token = sharding.use_shard(sharding.database_for(project_id))
+    try:
+        # WebSocket scopes have no method.
+        request = ASGIRequest(dict(scope, method="GET"), io.BytesIO())
+        SessionMiddleware(_no_response).process_request(request)
+        AuthenticationMiddleware(_no_response).process_request(request)
+        request = Request(
+            request,
+            authenticators=[auth() for auth in api_settings.DEFAULT_AUTHENTICATION_CLASSES],
+        )
+        error = _authenticate(request)
+        if error is not None:
+            return error
+        project = Project.objects.live().filter(pk=project_id).first()
+        if project is None:
+            return "Not found.", status.HTTP_404_NOT_FOUND, {}
+        if not TaskView.is_user_manager_or_developer(request.user, project):
+            return JSONResponse.PERMISSION_DENIED, status.HTTP_401_UNAUTHORIZED, {}
+        return None
+    finally:
+        sharding.reset_shard(token)
+        # Nothing is read from the database once the stream is open.
+        signals.request_finished.send(sender=__name__)
+
+
+async def _disconnected(receive):
+    while True:
+        message = await receive()
+        if message["type"] in ("http.disconnect", "websocket.disconnect"):
+            return
+
+
+async def _pump(subscription, receive, emit, heartbeat, has_access):
+    """
+    Pass the events of `subscription` to `emit` until the client goes away.
+    `emit` is called with None every `heartbeat` seconds without events, and
+    after the subscription is dropped for falling behind.
+
+    The access of the client is checked again with `has_access()` when the
+    members of the project change, and every `TASK_EVENTS_ACCESS_CHECK`
+    seconds for the other changes (e.g. of the user). Returns True when the
+    access is gone.
+    """
+    loop = asyncio.get_running_loop()
+    interval = getattr(settings, "TASK_EVENTS_ACCESS_CHECK", 60)
+    next_check = loop.time() + interval
+    next_ping = None if heartbeat is None else loop.time() + heartbeat
+    disconnect = asyncio.ensure_future(_disconnected(receive))
+    try:
+        while True:
+            wake = next_check if next_ping is None else min(next_check, next_ping)
+            get = asyncio.ensure_future(subscription.get())
+            done, _ = await asyncio.wait(
+                {get, disconnect},
+                timeout=max(wake - loop.time(), 0),
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+            if disconnect in done:
+                get.cancel()
+                return False
+            if get not in done:
+                get.cancel()
+            event = get.result() if get in done else None
+            access_changed = event is not None and event["op"] == events.ACCESS_CHANGED
+            if access_changed or loop.time() >= next_check:
+                if not await has_access():
+                    return True
+                next_check = loop.time() + interval
+            if access_changed:
+                continue
+            if get not in done:
+                if next_ping is not None and loop.time() >= next_ping:
+                    await emit(None)
+                    next_ping = loop.time() + heartbeat
+                continue
+            # A slow `emit` holds the queue back, until the client is dropped.
+            await emit(event)
+            if event is None:
+                return False
+            if next_ping is not None:
+                next_ping = loop.time() + heartbeat
+    finally:
+        disconnect.cancel()
+        subscription.close()
+
+
+def _access_checker(scope, project_id):
+    async def has_access():
+        return await sync_to_async(_check_access)(scope, project_id) is None
+
+    return has_access
+
+
+async def _event_stream(scope, receive, send, project_id):
+    error = await sync_to_async(_check_access)(scope, project_id)
+    if error is not None:
+        detail, code, headers = error
+        body = detail if isinstance(detail, dict) else {"detail": detail}
+        headers = [(name.lower().encode(), value.encode()) for name, value in headers.items()]
+        await send(
+            {
+                "type": "http.response.start",
+                "status": code,
+                "headers": [(b"content-type", b"application/json")] + headers,
+            }
+        )
+        return await send({"type": "http.response.body", "body": FastJSONRenderer().render(body)})
+
+    subscription = broker.subscribe(project_id)
+    await send(
+        {
+            "type": "http.response.start",
+            "status": status.HTTP_200_OK,
+            "headers": [
+                (b"content-type", b"text/event-stream"),
+                (b"cache-control", b"no-cache"),
+                (b"x-accel-buffering", b"no"),
+            ],
+        }
+    )
+
+    async def emit(event):
+        if event is None and subscription.dropped:
+            chunk = b"event: overflow\ndata: {}\n\n"
+        elif event is None:
+            chunk = b": ping\n\n"
+        else:
+            data = FastJSONRenderer().render(event)
+            chunk = b"event: task\nid: %d\ndata: %s\n\n" % (event["seq"], data)
+        await send({"type": "http.response.body", "body": chunk, "more_body": True})
+
+    # Once the access is gone the stream ends, a reconnecting client gets the error.
+    await _pump(
+        subscription,
+        receive,
+        emit,
+        getattr(settings, "TASK_EVENTS_HEARTBEAT", 15),
+        _access_checker(scope, project_id),
+    )
+    await send({"type": "http.response.body", "body": b""})
+
+
+async def _websocket(scope, receive, send, project_id):
+    message = await receive()
+    if message["type"] != "websocket.connect":
+        return
+    if await sync_to_async(_check_access)(scope, project_id) is not None:
+        # Closing before accepting refuses the handshake with a 403.
+        return await send({"type": "websocket.close"})
+
+    subscription = broker.subscribe(project_id)
+    await send({"type": "websocket.accept"})
+
+    async def emit(event):
+        if event is None and subscription.dropped:
+            # Try again later: the client resyncs with the `since` task list.
+            await send({"type": "websocket.close", "code": 1013})
+        elif event is not None:
+            await send({"type": "websocket.send", "text": FastJSONRenderer().render(event).decode()})
+
+    # WebSocket servers keep the connection alive with pings themselves.
+    if await _pump(subscription, receive, emit, None, _access_checker(scope, project_id)):
+        # Policy violation: the client lost its access to the project.
+        await send({"type": "websocket.close", "code": 1008})
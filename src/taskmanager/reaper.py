@@ -0,0 +1,115 @@
+import logging
+import time
+
+from django.db import transaction
+from django.db.models import Count
+
+from taskmanager import sharding, stats
+from taskmanager.models import Project, Task, TaskTombstone
+
+
+logger = logging.getLogger(__name__)
+
+# `Project.delete()` collects every task and assignee row of the project in
+# memory and deletes them in one transaction, holding its locks all along.
+# Projects are soft deleted instead (`Project.soft_delete`, used by the
+# admin): every view ignores them at once, and `reap` (`manage.py
+# reap_projects`) deletes their rows afterwards, `batch_size` tasks per short
+# transaction with a pause between two, before deleting the project itself.
+
+Assignees = Task.assignee.through
+
+
+def pending():
+    """
+    The deleted projects not reaped yet, oldest first, as dicts with their
+    database and the number of tasks left.
+    """
+    rows = []
+    for database in sharding.databases():
+        projects = list(
+            Project.objects.using(database)
+            .filter(deleted_at__isnull=False)
+            .order_by("deleted_at", "pk")
+            .values("id", "name", "deleted_at")
+        )
+        counts = dict(
+            Task.objects.using(database)
+            .filter(project_id__in=[project["id"] for project in projects])
+            .values("project_id")
+            .annotate(n=Count("id"))
+            .values_list("project_id", "n")
+            .order_by()
+        )
+        for project in projects:
+            rows.append(dict(project, database=database, tasks_left=counts.get(project["id"], 0)))
+    return sorted(rows, key=lambda row: (row["deleted_at"], row["id"]))
+
+
+def _delete_in_batches(queryset, batch_size, pause, before_delete=None):
+    """
+    Delete the rows of `queryset` `batch_size` at a time in primary key
+    order, each batch in its own transaction, sleeping `pause` seconds
+    between two. `before_delete(ids)` runs in the transaction of each batch.
+    Yields the number of rows deleted by each batch.
+    """
+    using = queryset.db
+    while True:
+        with transaction.atomic(using=using):
+            ids = list(queryset.order_by("pk").values_list("pk", flat=True)[:batch_size])
+            if not ids:
+                return
+            if before_delete is not None:
+                before_delete(ids)
+            # Raw deletes: no signal, the project is gone for its clients.
+            queryset.model.objects.using(using).filter(pk__in=ids)._raw_delete(using)
+        yield len(ids)
+        if pause:
+            time.sleep(pause)
+
+
+def reap_project(project, batch_size=1000, pause=0.0, on_batch=None):
+    """
+    Delete the tasks, assignee rows and tombstones of the soft deleted
+    `project`, then the project. `on_batch(project, deleted)` is called after
+    each batch with the number of tasks deleted so far. Returns that number.
+    """
+    using, project_id = project._state.db, project.pk
+    tasks = Task.objects.using(using).filter(project_id=project_id)
+
+    def delete_assignees(ids):
+        # The task counters follow, so they stay right while the project is
+        # reaped (see `stats.apply`).
+        stats.apply(stats.difference({}, stats.compute(tasks.filter(pk__in=ids))))
+        Assignees.objects.using(using).filter(task_id__in=ids)._raw_delete(using)
+
+    token = sharding.use_shard(using)
+    try:
+        deleted = 0
+        for count in _delete_in_batches(tasks, batch_size, pause, delete_assignees):
+            deleted += count
+            if on_batch is not None:
+                on_batch(project, deleted)
+        tombstones = TaskTombstone.objects.using(using).filter(project_id=project_id)
+        for _ in _delete_in_batches(tombstones, batch_size, pause):
+            pass
+        # Only the members and counters are left to cascade.
+        project.delete()
+    finally:
+        sharding.reset_shard(token)
+    logger.info("Reaped project %s: %s tasks deleted.", project_id, deleted)
+    return deleted
+
+
+def reap(batch_size=1000, pause=0.0, on_batch=None):
+    """
+    Reap every soft deleted project, oldest first. Returns the number of
+    projects deleted.
+    """
+    reaped = 0
+    for row in pending():
+        project = Project.objects.using(row["database"]).filter(pk=row["id"]).first()
+        if project is not None:
+            reap_project(project, batch_size, pause, on_batch)
+            reaped += 1
+    return reaped
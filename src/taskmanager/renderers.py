@@ -0,0 +1,78 @@
+import codecs
+
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from taskmanager.utils import RawJSON
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - the stdlib json module is used
+    orjson = None
+
+
+# Datetimes are handed to the DRF encoder so they keep its format (ISO 8601
+# with the microseconds, "Z" for UTC), keys which aren't strings are converted
+# like json.dumps does.
+ORJSON_OPTIONS = (orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS) if orjson else 0
+LINE_SEPARATOR = "\u2028".encode()
+PARAGRAPH_SEPARATOR = "\u2029".encode()
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    `JSONRenderer` encoding with orjson when it is installed, else with the
+    stdlib like its parent, for the same bytes: types orjson doesn't know
+    (decimals, lazy strings, querysets...) and datetimes go through the DRF
+    encoder, and U+2028 and U+2029 are escaped like the parent does. Floats,
+    which no task field holds, keep their value but are written the orjson
+    way, e.g. `1e16` for `1e+16`.
+
+    Indented output (`Accept: application/json; indent=4`) and the non
+    default UNICODE_JSON, COMPACT_JSON and STRICT_JSON settings are left to
+    the parent. `RawJSON` payloads are written as they are.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (
+            self.ensure_ascii
+            or not self.compact
+            or not self.strict
+            or self.get_indent(accepted_media_type, renderer_context or {}) is not None
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+        if data is None:
+            return b""
+        if isinstance(data, RawJSON):
+            return data.encoded
+        if orjson is None:
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            rendered = orjson.dumps(
+                data, default=self.encoder_class().default, option=ORJSON_OPTIONS
+            )
+        except orjson.JSONEncodeError:
+            # E.g. integers over 64 bits, which the stdlib handles.
+            return super().render(data, accepted_media_type, renderer_context)
+        # Valid JSON but not valid javascript, the parent escapes them too.
+        return rendered.replace(LINE_SEPARATOR, b"\\u2028").replace(
+            PARAGRAPH_SEPARATOR, b"\\u2029"
+        )
+
+
+class FastJSONParser(JSONParser):
+    """
+    `JSONParser` decoding UTF-8 bodies with orjson when it is installed.
+    """
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get("encoding", settings.DEFAULT_CHARSET)
+        if orjson is None or codecs.lookup(encoding).name != "utf-8":
+            return super().parse(stream, media_type, parser_context)
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError("JSON parse error - %s" % str(exc))
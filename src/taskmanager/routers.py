@@ -0,0 +1,55 @@
+import random
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+
+# Alias of the replica reads of the current request go to, set by
+# `taskmanager.middleware.ReplicaRoutingMiddleware`. None means the primary,
+# so management commands, signals and tests read the primary unless asked.
+_read_alias = ContextVar("read_alias", default=None)
+
+# Sessions, users, permissions and the database caches (the token deny-list)
+# are read to authenticate and authorize a request, a lagging replica could
+# let a logged out or removed user in.
+PRIMARY_APPS = {"admin", "auth", "contenttypes", "sessions", "django_cache"}
+
+
+def choose_replica():
+    replicas = getattr(settings, "READ_REPLICAS", [])
+    return random.choice(replicas) if replicas else None
+
+
+def read_from(alias):
+    """
+    Send the reads of the current context to `alias` (None for the primary).
+    Returns a token for `reset_read_alias`.
+    """
+    return _read_alias.set(alias)
+
+
+def reset_read_alias(token):
+    _read_alias.reset(token)
+
+
+class ReplicaRouter:
+    """
+    Writes go to the primary ("default"), reads to the replica chosen for the
+    current request, if any. See `READ_REPLICAS` in the settings.
+    """
+
+    def db_for_read(self, model, **hints):
+        if (
+            model._meta.app_label in PRIMARY_APPS
+            or model._meta.label == settings.AUTH_USER_MODEL
+        ):
+            return DEFAULT_DB_ALIAS
+        return _read_alias.get() or DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary.
+        return True
@@ -0,0 +1,81 @@
+from taskmanager.models import Task
+
+
+# Same keys, in the same order, as `TaskSerializer` renders them.
+TASK_FIELDS = ("id", "title", "description", "is_done", "project", "creator", "version")
+TASK_LIST_FIELDS = TASK_FIELDS + ("assignee",)
+
+
+def task_values(queryset, names=TASK_FIELDS):
+    """
+    `queryset.values()` of the task keys `names`.
+    """
+    return queryset.values(*names)
+
+
+def attach_assignees(rows):
+    """
+    Set the `assignee` id list on every task row with a single query on the
+    `Task.assignee` through table.
+    """
+    rows_by_id = {}
+    for row in rows:
+        row["assignee"] = []
+        rows_by_id[row["id"]] = row
+
+    links = (
+        Task.assignee.through.objects.filter(task_id__in=rows_by_id)
+        .order_by("id")
+        .values_list("task_id", "user_id")
+    )
+    for task_id, user_id in links:
+        rows_by_id[task_id]["assignee"].append(user_id)
+    return rows
+
+
+def iter_task_rows(queryset, chunk_size=1000):
+    """
+    Yield the tasks of `queryset` as plain dicts, walking the table in
+    keyset chunks of `chunk_size` so only one chunk is held in memory.
+    Each chunk costs two queries: one for the tasks, one for their assignees.
+    """
+    queryset = task_values(queryset.order_by("id"))
+    last_id = None
+    while True:
+        chunk = queryset if last_id is None else queryset.filter(id__gt=last_id)
+        rows = list(chunk[:chunk_size])
+        if not rows:
+            return
+        yield from attach_assignees(rows)
+        if len(rows) < chunk_size:
+            return
+        last_id = rows[-1]["id"]
+
+
+def task_to_row(task, assignee_ids):
+    """
+    Build the row of a `Task` instance without going through `TaskSerializer`.
+    """
+    row = {name: getattr(task, Task._meta.get_field(name).attname) for name in TASK_FIELDS}
+    row["assignee"] = list(assignee_ids)
+    return row
+
+
+def value_fields(fields, ordering="id"):
+    """
+    The `task_values()` keys needed to render `fields` of a page in
+    `ordering`: the pagination also needs the id and the ordering field.
+    """
+    needed = set(fields) | {"id", ordering.lstrip("-")}
+    return [name for name in TASK_FIELDS if name in needed]
+
+
+def task_rows(rows, fields=TASK_LIST_FIELDS):
+    """
+    Turn rows read with `task_values(queryset, value_fields(fields))` into
+    the output of `TaskSerializer` restricted to `fields`, without model
+    instances. The assignees of all the rows are read with one query.
+    """
+    if "assignee" in fields:
+        attach_assignees(rows)
+    return [{name: row[name] for name in fields} for row in rows]
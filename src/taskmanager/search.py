@@ -0,0 +1,127 @@
+import re
+
+from django.db import connections
+from django.db.models import Q
+
+from taskmanager.models import Task
+
+
+# Full-text index of `Task.title` and `Task.description`:
+#   - PostgreSQL: a generated `search_vector` tsvector column with a GIN index.
+#   - SQLite: an external content FTS5 table kept in sync by triggers.
+# Neither is part of the Django model: migration 0004 creates them and
+# `install` recreates what is missing after each `migrate`.
+
+SEARCH_CONFIG = "english"
+
+POSTGRESQL_INSTALL = [
+    f"""
+    ALTER TABLE taskmanager_task ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(description, '')), 'B')
+    ) STORED
+    """,
+    "CREATE INDEX IF NOT EXISTS task_search_vector_idx "
+    "ON taskmanager_task USING GIN (search_vector)",
+]
+
+SQLITE_TABLE = """
+    CREATE VIRTUAL TABLE IF NOT EXISTS taskmanager_task_fts USING fts5(
+        title, description, content='taskmanager_task', content_rowid='id'
+    )
+"""
+
+SQLITE_TRIGGERS = {
+    "taskmanager_task_fts_insert": """
+        CREATE TRIGGER taskmanager_task_fts_insert AFTER INSERT ON taskmanager_task BEGIN
+            INSERT INTO taskmanager_task_fts (rowid, title, description)
+            VALUES (new.id, new.title, new.description);
+        END
+    """,
+    "taskmanager_task_fts_delete": """
+        CREATE TRIGGER taskmanager_task_fts_delete AFTER DELETE ON taskmanager_task BEGIN
+            INSERT INTO taskmanager_task_fts (taskmanager_task_fts, rowid, title, description)
+            VALUES ('delete', old.id, old.title, old.description);
+        END
+    """,
+    "taskmanager_task_fts_update": """
+        CREATE TRIGGER taskmanager_task_fts_update
+        AFTER UPDATE OF title, description ON taskmanager_task BEGIN
+            INSERT INTO taskmanager_task_fts (taskmanager_task_fts, rowid, title, description)
+            VALUES ('delete', old.id, old.title, old.description);
+            INSERT INTO taskmanager_task_fts (rowid, title, description)
+            VALUES (new.id, new.title, new.description);
+        END
+    """,
+}
+
+
+def install(connection):
+    """
+    Create the full-text index of the database behind `connection`, if it is
+    missing. Safe to call repeatedly.
+
+    On SQLite, migrations that rebuild the task table drop its triggers, so
+    this also runs after every `migrate` and re-indexes the table when a
+    trigger had to be recreated.
+    """
+    with connection.cursor() as cursor:
+        if connection.vendor == "postgresql":
+            for statement in POSTGRESQL_INSTALL:
+                cursor.execute(statement)
+        elif connection.vendor == "sqlite":
+            cursor.execute(SQLITE_TABLE)
+            cursor.execute("SELECT name FROM sqlite_master WHERE type = 'trigger'")
+            existing = {row[0] for row in cursor.fetchall()}
+            missing = [name for name in SQLITE_TRIGGERS if name not in existing]
+            for name in missing:
+                cursor.execute(SQLITE_TRIGGERS[name])
+            if missing:
+                cursor.execute(
+                    "INSERT INTO taskmanager_task_fts (taskmanager_task_fts) VALUES ('rebuild')"
+                )
+
+
+def _fts5_query(text):
+    # Quote every word so user input can't be read as FTS5 query syntax.
+    return " ".join('"{}"'.format(word) for word in re.findall(r"\w+", text))
+
+
+def search_task_ids(project, text, limit, offset=0):
+    """
+    Return the ids of the tasks of `project` matching `text`, best match first.
+    Title matches rank above description matches.
+    """
+    connection = connections[Task.objects.db]
+
+    if connection.vendor == "postgresql":
+        sql = f"""
+            SELECT id FROM taskmanager_task, websearch_to_tsquery('{SEARCH_CONFIG}', %s) query
+            WHERE project_id = %s AND search_vector @@ query
+            ORDER BY ts_rank(search_vector, query) DESC, id
+            LIMIT %s OFFSET %s
+        """
+        params = [text, project.pk, limit, offset]
+    elif connection.vendor == "sqlite":
+        query = _fts5_query(text)
+        if not query:
+            return []
+        sql = """
+            SELECT task.id FROM taskmanager_task_fts
+            JOIN taskmanager_task task ON task.id = taskmanager_task_fts.rowid
+            WHERE taskmanager_task_fts MATCH %s AND task.project_id = %s
+            ORDER BY bm25(taskmanager_task_fts, 4.0, 1.0), task.id
+            LIMIT %s OFFSET %s
+        """
+        params = [query, project.pk, limit, offset]
+    else:
+        # No full-text index on this backend: unranked substring match.
+        matches = project.tasks.filter(
+            Q(title__icontains=text) | Q(description__icontains=text)
+        )
+        return list(matches.order_by("id").values_list("id", flat=True)[offset : offset + limit])
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return [row[0] for row in cursor.fetchall()]
@@ -1,5 +1,9 @@
+from django.contrib.auth import authenticate
 from rest_framework import serializers
+from taskmanager import changes
+from taskmanager.bulk import assign_new_task, update_task
 from taskmanager.models import Project, Task, User
+from taskmanager.rows import TASK_LIST_FIELDS
 
 
 class UserSignupSerializer(serializers.ModelSerializer):
@@ -11,9 +15,8 @@ class UserSignupSerializer(serializers.ModelSerializer):
         user = User.objects.create_user(
             username=validated_data['username'],
             password=validated_data['password'],
+            user_role=validated_data.get('user_role', User.MANAGER),
         )
-        user.user_role =validated_data['user_role']
-        user.save()
         return user
 
     class Meta:
@@ -21,6 +24,32 @@ class UserSignupSerializer(serializers.ModelSerializer):
         fields = ( "id", "username", "password", "user_role" )
 
 
+class TokenObtainSerializer(serializers.Serializer):
+    username = serializers.CharField()
+    password = serializers.CharField(write_only=True)
+
+    def validate(self, attrs):
+        user = authenticate(
+            request=self.context.get("request"),
+            username=attrs["username"],
+            password=attrs["password"],
+        )
+        if user is None:
+            raise serializers.ValidationError(
+                "Unable to log in with provided credentials.", code="authorization"
+            )
+        attrs["user"] = user
+        return attrs
+
+
+class TokenSerializer(serializers.Serializer):
+    """
+    A refresh token to exchange, or any token to revoke.
+    """
+
+    token = serializers.CharField()
+
+
 class ProjectSerializer(serializers.ModelSerializer):
     manager_name = serializers.ReadOnlyField(source='manager.username')
     class Meta:
@@ -29,12 +58,137 @@ class ProjectSerializer(serializers.ModelSerializer):
 
 
 class TaskSerializer(serializers.ModelSerializer):
+    # Bumped by every write of the task, sent back in `If-Match` to update
+    # the task only if it didn't change since (see `bulk.update_task`).
+    version = serializers.IntegerField(read_only=True)
+
     class Meta:
         model = Task
-        fields = '__all__'
+        fields = TASK_LIST_FIELDS
+
+    def create(self, validated_data):
+        assignee = validated_data.pop('assignee', [])
+        task = Task.objects.create(**validated_data)
+        if assignee:
+            assign_new_task(task, [user.pk for user in assignee])
+        return task
 
 class TaskUpdateSerializer(serializers.ModelSerializer):
+    """
+    Full (PUT) or partial (PATCH) update of a task. With `expected_versions`
+    in the context, the task is only updated if its version is one of them
+    (see `taskmanager.bulk.update_task`).
+    """
+    version = serializers.IntegerField(read_only=True)
+
     class Meta:
         model = Task
-        fields = '__all__'
-        read_only_fields = ('id', 'project', 'creator')
\ No newline at end of file
+        fields = TASK_LIST_FIELDS
+        read_only_fields = ('id', 'project', 'creator')
+
+    def update(self, instance, validated_data):
+        assignee = validated_data.pop('assignee', None)
+        return update_task(
+            instance,
+            validated_data,
+            None if assignee is None else [user.pk for user in assignee],
+            self.context.get('expected_versions'),
+        )
+
+
+class TaskBulkItemSerializer(serializers.ModelSerializer):
+    """
+    Validates one task of a bulk create. Assignees are plain ids here; the
+    view checks them against the project developers once for the whole batch.
+    """
+    assignee = serializers.ListField(child=serializers.IntegerField(), required=False)
+
+    class Meta:
+        model = Task
+        fields = ("title", "description", "is_done", "assignee")
+
+
+class TaskBulkCreateSerializer(serializers.Serializer):
+    MAX_TASKS = 1000
+
+    tasks = serializers.ListField(allow_empty=False, max_length=MAX_TASKS)
+    atomic = serializers.BooleanField(default=False)
+
+
+
+class TaskBulkFilterSerializer(serializers.Serializer):
+    ids = serializers.ListField(child=serializers.IntegerField(), required=False)
+    assignee = serializers.IntegerField(required=False)
+    is_done = serializers.BooleanField(required=False)
+
+
+class TaskBulkAssigneeSerializer(serializers.Serializer):
+    replace = serializers.ListField(child=serializers.IntegerField(), required=False)
+    add = serializers.ListField(child=serializers.IntegerField(), required=False)
+    remove = serializers.ListField(child=serializers.IntegerField(), required=False)
+
+    def validate(self, attrs):
+        if "replace" in attrs and ("add" in attrs or "remove" in attrs):
+            raise serializers.ValidationError(
+                "`replace` can not be combined with `add` or `remove`."
+            )
+        return attrs
+
+
+class TaskBulkUpdateSerializer(serializers.Serializer):
+    filter = TaskBulkFilterSerializer(required=False)
+    is_done = serializers.BooleanField(required=False)
+    assignee = TaskBulkAssigneeSerializer(required=False)
+
+    def validate(self, attrs):
+        if "is_done" not in attrs and "assignee" not in attrs:
+            raise serializers.ValidationError("Nothing to update.")
+        return attrs
+
+
+class TaskListFilterSerializer(serializers.Serializer):
+    """
+    Query parameters of the task list endpoints.
+    `assignee` is a comma separated list of user ids, `fields` a comma
+    separated list of the task fields to return (all by default) and
+    `since` a sync cursor (see `taskmanager.changes`).
+    """
+    ORDERINGS = ("id", "-id", "title", "-title")
+
+    is_done = serializers.BooleanField(required=False)
+    creator = serializers.IntegerField(required=False)
+    assignee = serializers.CharField(required=False)
+    title_prefix = serializers.CharField(required=False, max_length=200)
+    ordering = serializers.ChoiceField(choices=ORDERINGS, default="id")
+    fields = serializers.CharField(required=False)
+    since = serializers.CharField(required=False)
+
+    def validate_assignee(self, value):
+        try:
+            return [int(user_id) for user_id in value.split(",")]
+        except ValueError:
+            raise serializers.ValidationError("A comma separated list of ids is required.")
+
+    def validate_fields(self, value):
+        names = set(value.split(","))
+        unknown = names - set(TASK_LIST_FIELDS)
+        if unknown:
+            raise serializers.ValidationError(
+                "Unknown fields: {}. Allowed: {}.".format(
+                    ", ".join(sorted(unknown)), ", ".join(TASK_LIST_FIELDS)
+                )
+            )
+        # Always in the order of `TaskSerializer`.
+        return tuple(name for name in TASK_LIST_FIELDS if name in names)
+
+    def validate_since(self, value):
+        try:
+            return changes.parse_cursor(value)
+        except ValueError:
+            raise serializers.ValidationError("Invalid cursor.")
+
+
+class TaskSearchSerializer(serializers.Serializer):
+    q = serializers.CharField(max_length=200)
+    page = serializers.IntegerField(min_value=1, default=1)
+    page_size = serializers.IntegerField(min_value=1, max_value=100, default=20)
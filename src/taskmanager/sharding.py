@@ -0,0 +1,259 @@
+from collections import defaultdict
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models import F
+
+from taskmanager.models import (
+    AssigneeTaskStats,
+    IdSequence,
+    Project,
+    ProjectShard,
+    ProjectTaskStats,
+    Task,
+    TaskTombstone,
+    User,
+)
+
+
+# With `PROJECT_SHARDS`, projects are spread over several databases: a
+# project, its developers, tasks, assignees, tombstones and task counters
+# live in one of them, the shard the shard map (`ProjectShard`) assigns it.
+# Users, sessions and the shard map stay in the default database, which is a
+# shard too. Project and task ids are allocated by `IdSequence`, unique across
+# the shards, so a project can be moved with `manage.py move_project`.
+#
+# Queries of the sharded models go to the shard of the instance they start
+# from, else to the shard selected for the current context with `use_shard`
+# (`TaskView` selects the shard of the project of the url).
+
+# Alias of the shard of the current context, None when none is selected.
+_shard = ContextVar("shard", default=None)
+
+Members = Project.developers.through
+Assignees = Task.assignee.through
+
+SHARDED_MODELS = {
+    model._meta.label_lower
+    for model in (
+        Project,
+        Members,
+        Task,
+        Assignees,
+        TaskTombstone,
+        ProjectTaskStats,
+        AssigneeTaskStats,
+    )
+}
+
+
+def databases():
+    """
+    The databases holding projects.
+    """
+    return getattr(settings, "PROJECT_SHARDS", []) or [DEFAULT_DB_ALIAS]
+
+
+def database_for(project_id):
+    """
+    The shard of the project, None when projects are not sharded.
+    """
+    if not getattr(settings, "PROJECT_SHARDS", []):
+        return None
+    database = (
+        ProjectShard.objects.using(DEFAULT_DB_ALIAS)
+        .filter(project_id=project_id)
+        .values_list("database", flat=True)
+        .first()
+    )
+    return database or DEFAULT_DB_ALIAS
+
+
+def shards_of(project_ids):
+    """
+    The ids of `project_ids` grouped by shard, as `{database: [ids]}`.
+    """
+    project_ids = list(project_ids)
+    if not getattr(settings, "PROJECT_SHARDS", []):
+        return {DEFAULT_DB_ALIAS: project_ids} if project_ids else {}
+    databases = dict(
+        ProjectShard.objects.using(DEFAULT_DB_ALIAS)
+        .filter(project_id__in=project_ids)
+        .values_list("project_id", "database")
+    )
+    groups = defaultdict(list)
+    for project_id in project_ids:
+        groups[databases.get(project_id, DEFAULT_DB_ALIAS)].append(project_id)
+    return groups
+
+
+def create_projects(projects):
+    """
+    Insert new `projects` with `bulk_create`, each in the shard the shard map
+    assigns it when projects are sharded.
+    """
+    if not getattr(settings, "PROJECT_SHARDS", []):
+        return Project.objects.bulk_create(projects)
+    by_shard = defaultdict(list)
+    for pk, project in enumerate(projects, IdSequence.allocate("project", len(projects))):
+        project.pk = pk
+        by_shard[ProjectShard.place(pk)].append(project)
+    ProjectShard.objects.using(DEFAULT_DB_ALIAS).bulk_create(
+        [
+            ProjectShard(project_id=project.pk, database=database)
+            for database, rows in by_shard.items()
+            for project in rows
+        ]
+    )
+    for database, rows in by_shard.items():
+        Project.objects.using(database).bulk_create(rows)
+    return projects
+
+
+def use_shard(alias):
+    """
+    Send the queries of the sharded models of the current context to
+    `alias` (None to select no shard). Returns a token for `reset_shard`.
+    """
+    return _shard.set(alias)
+
+
+def reset_shard(token):
+    _shard.reset(token)
+
+
+def iterate_in_shard(alias, iterable):
+    """
+    Iterate `iterable` with `alias` selected, for the streamed responses
+    read after the view returned.
+    """
+    iterator = iter(iterable)
+    while True:
+        token = use_shard(alias)
+        try:
+            item = next(iterator)
+        except StopIteration:
+            return
+        finally:
+            reset_shard(token)
+        yield item
+
+
+def _is_sharded(model):
+    return model._meta.label_lower in SHARDED_MODELS
+
+
+class ShardRouter:
+    """
+    Routes the sharded models when `PROJECT_SHARDS` is set, see above. Other
+    models and unrouted queries fall through to the next router.
+    """
+
+    def _db(self, model, **hints):
+        if not getattr(settings, "PROJECT_SHARDS", []) or not _is_sharded(model):
+            return None
+        instance = hints.get("instance")
+        if instance is not None and _is_sharded(type(instance)) and instance._state.db:
+            return instance._state.db
+        alias = _shard.get()
+        if alias is not None:
+            return alias
+        # A new task or counter outside of a request: the shard of its project.
+        project_id = getattr(instance, "project_id", None)
+        if project_id is not None and _is_sharded(type(instance)):
+            return database_for(project_id)
+        return None
+
+    db_for_read = _db
+    db_for_write = _db
+
+    def allow_relation(self, obj1, obj2, **hints):
+        if not getattr(settings, "PROJECT_SHARDS", []):
+            return None
+        if isinstance(obj1, User) or isinstance(obj2, User):
+            # Users are shared by every shard.
+            return True
+        if _is_sharded(type(obj1)) and _is_sharded(type(obj2)):
+            if obj1._state.db and obj2._state.db:
+                return obj1._state.db == obj2._state.db
+        return None
+
+
+def _copy(queryset, target, batch_size, keep_pk=True):
+    """
+    Insert the rows of `queryset` into `target`, `batch_size` at a time in
+    primary key order. Rows nobody refers to get new ids in `target`.
+    """
+    queryset = queryset.order_by("pk")
+    last_pk = None
+    while True:
+        chunk = queryset if last_pk is None else queryset.filter(pk__gt=last_pk)
+        rows = list(chunk[:batch_size])
+        if not rows:
+            return
+        last_pk = rows[-1].pk
+        if not keep_pk:
+            for row in rows:
+                row.pk = None
+        type(rows[0]).objects.using(target).bulk_create(rows, batch_size=batch_size)
+
+
+def _project_rows(project_id, using):
+    """
+    Every row of the project in the database `using`, as querysets in
+    insertion order (the referenced rows first).
+    """
+    return [
+        (Project.objects.using(using).filter(pk=project_id), True),
+        (Members.objects.using(using).filter(project_id=project_id), False),
+        (Task.objects.using(using).filter(project_id=project_id), True),
+        (Assignees.objects.using(using).filter(task__project_id=project_id), False),
+        (TaskTombstone.objects.using(using).filter(project_id=project_id), False),
+        (ProjectTaskStats.objects.using(using).filter(project_id=project_id), True),
+        (AssigneeTaskStats.objects.using(using).filter(project_id=project_id), False),
+    ]
+
+
+def _delete_project_rows(project_id, using):
+    # Raw deletes: no signal, no tombstone nor task event, the project still
+    # exists in its new shard.
+    for queryset, _ in reversed(_project_rows(project_id, using)):
+        queryset._raw_delete(using)
+
+
+def move_project(project_id, target, batch_size=1000):
+    """
+    Move the project and all of its rows to the shard `target`, while the
+    project stays readable. Returns the shard it was moved from.
+
+    The task rows then the project row are locked, in the order writers
+    lock them (see `changes.recording`), by the source shard transaction
+    until the rows are copied, the shard map is switched and the source rows
+    are deleted. A write that was waiting finds the project gone when it
+    stamps its changes and gets a 409 (`changes.ProjectGone`): the client
+    retries and is routed to the new shard. Ids, versions and change
+    sequences are kept, so task ids, ETags and sync cursors stay valid.
+    """
+    source = database_for(project_id) or DEFAULT_DB_ALIAS
+    if target not in databases():
+        raise ValueError(f"{target!r} is not one of the project shards.")
+    if source == target:
+        return source
+
+    with transaction.atomic(using=source):
+        tasks = Task.objects.using(source).filter(project_id=project_id)
+        list(tasks.select_for_update().order_by("pk").values_list("pk", flat=True))
+        projects = Project.objects.using(source).filter(pk=project_id)
+        if not projects.update(version=F("version")):
+            raise Project.DoesNotExist(f"No project {project_id} in {source!r}.")
+        with transaction.atomic(using=target):
+            # What an interrupted move left behind.
+            _delete_project_rows(project_id, target)
+            for queryset, keep_pk in _project_rows(project_id, source):
+                _copy(queryset, target, batch_size, keep_pk)
+        ProjectShard.objects.using(DEFAULT_DB_ALIAS).update_or_create(
+            project_id=project_id, defaults={"database": target}
+        )
+        _delete_project_rows(project_id, source)
+    return source
@@ -0,0 +1,210 @@
+import functools
+
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_migrate,
+    post_save,
+    pre_delete,
+    pre_save,
+)
+from django.dispatch import receiver
+
+from taskmanager import authentication, changes, events, membership, search, sharding, stats
+from taskmanager.models import Project, ProjectShard, Task, TaskTombstone, User
+
+
+def _in_shard(handler):
+    """
+    Run a handler of a sharded model with the database of the signal selected
+    (see `taskmanager.sharding`), for the queries it makes without `using`.
+    """
+
+    @functools.wraps(handler)
+    def wrapper(sender, **kwargs):
+        token = sharding.use_shard(kwargs.get("using"))
+        try:
+            return handler(sender, **kwargs)
+        finally:
+            sharding.reset_shard(token)
+
+    return wrapper
+
+
+def _invalidate_membership(project_id):
+    membership.index.invalidate(project_id)
+    # Lookups made inside the transaction may have cached uncommitted rows.
+    transaction.on_commit(lambda: membership.index.invalidate(project_id))
+    events.publish_access_change_on_commit(project_id)
+
+
+@receiver(m2m_changed, sender=Project.developers.through)
+@_in_shard
+def project_developers_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if reverse and action == "pre_clear":
+        # `user.projects.clear()` does not tell which projects it touched.
+        instance._cleared_project_ids = list(instance.projects.values_list("id", flat=True))
+        return
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+
+    if not reverse:
+        project_ids = [instance.pk]
+    elif action == "post_clear":
+        project_ids = instance.__dict__.pop("_cleared_project_ids", [])
+    else:
+        project_ids = pk_set
+    for project_id in project_ids:
+        _invalidate_membership(project_id)
+    Project.bump_version(*project_ids)
+
+
+@receiver(post_save, sender=Project)
+@receiver(post_delete, sender=Project)
+def project_saved_or_deleted(sender, instance, **kwargs):
+    _invalidate_membership(instance.pk)
+
+
+@receiver(post_delete, sender=Project)
+@_in_shard
+def project_deleted(sender, instance, using, **kwargs):
+    # Left by the deletion of the project tasks, see `TaskTombstone.project`.
+    TaskTombstone.objects.using(using).filter(project_id=instance.pk).delete()
+    ProjectShard.objects.using(DEFAULT_DB_ALIAS).filter(project_id=instance.pk).delete()
+
+
+@receiver(post_save, sender=Task)
+def task_change_saved(sender, instance, created, raw, using, **kwargs):
+    if raw:
+        return
+    changes.record(instance.project_id, [instance.pk], using, "created" if created else "updated")
+    # Runs before `task_stats_saved` replaces the stored state.
+    state = instance.__dict__.get("_saved_state")
+    if created or not state or state[0] == instance.project_id:
+        return
+    changes.bury(state[0], [instance.pk], using)
+    TaskTombstone.objects.using(using).filter(
+        project_id=instance.project_id, task_id=instance.pk
+    ).delete()
+
+
+@receiver(post_delete, sender=Task)
+def task_change_deleted(sender, instance, using, **kwargs):
+    changes.bury(instance.project_id, [instance.pk], using)
+
+
+@receiver(m2m_changed, sender=Task.assignee.through)
+@_in_shard
+def task_assignee_changed(sender, instance, action, reverse, pk_set, using, **kwargs):
+    if reverse and action == "pre_clear":
+        instance._cleared_task_ids = list(instance.task_set.values_list("id", flat=True))
+        return
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+
+    if not reverse:
+        if pk_set or action == "post_clear":
+            changes.stamp(instance.project_id, [instance.pk], using, op="reassigned")
+    elif action == "post_clear":
+        changes.stamp_tasks(
+            instance.__dict__.pop("_cleared_task_ids", []), using, op="reassigned"
+        )
+    else:
+        changes.stamp_tasks(pk_set, using, op="reassigned")
+
+
+def _assignee_ids(task):
+    return list(
+        Task.assignee.through.objects.filter(task_id=task.pk).values_list("user_id", flat=True)
+    )
+
+
+@receiver(pre_save, sender=Task)
+@_in_shard
+def task_stats_before_save(sender, instance, **kwargs):
+    # Tasks loaded from the database know their stored state, see `Task.from_db`.
+    state = instance.__dict__.get("_saved_state")
+    if instance.pk is not None and (state is None or None in state):
+        instance._saved_state = stats.task_states([instance.pk]).get(instance.pk)
+
+
+@receiver(post_save, sender=Task)
+@_in_shard
+def task_stats_saved(sender, instance, created, **kwargs):
+    old = None if created else instance.__dict__.get("_saved_state")
+    new = (instance.project_id, instance.is_done)
+    if old != new:
+        # The assignees of a task are counted in its project and state.
+        user_ids = _assignee_ids(instance) if old else []
+        deltas = stats.new_deltas()
+        if old:
+            stats.add_tasks(deltas, *old, user_ids, count=-1)
+        stats.add_tasks(deltas, *new, user_ids)
+        stats.apply(deltas)
+    instance._saved_state = new
+
+
+@receiver(pre_delete, sender=Task)
+@_in_shard
+def task_stats_before_delete(sender, instance, **kwargs):
+    instance._deleted_assignee_ids = _assignee_ids(instance)
+
+
+@receiver(post_delete, sender=Task)
+@_in_shard
+def task_stats_deleted(sender, instance, **kwargs):
+    state = instance.__dict__.get("_saved_state") or (instance.project_id, instance.is_done)
+    deltas = stats.new_deltas()
+    stats.add_tasks(deltas, *state, instance.__dict__.pop("_deleted_assignee_ids", []), count=-1)
+    stats.apply(deltas)
+
+
+@receiver(m2m_changed, sender=Task.assignee.through)
+@_in_shard
+def task_assignee_stats(sender, instance, action, reverse, pk_set, **kwargs):
+    if action in ("pre_remove", "pre_clear"):
+        # Only rows that exist are removed, `pk_set` may hold others.
+        links = sender.objects.filter(**{"user_id" if reverse else "task_id": instance.pk})
+        if action == "pre_remove":
+            links = links.filter(**{"task_id__in" if reverse else "user_id__in": pk_set})
+        instance._removed_assignee_links = list(links.values_list("task_id", "user_id"))
+        return
+    if action == "post_add":
+        links = [(pk, instance.pk) if reverse else (instance.pk, pk) for pk in pk_set]
+        count = 1
+    elif action in ("post_remove", "post_clear"):
+        links = instance.__dict__.pop("_removed_assignee_links", [])
+        count = -1
+    else:
+        return
+    if not links:
+        return
+
+    if reverse:
+        states = stats.task_states({task_id for task_id, _ in links})
+    else:
+        states = {instance.pk: (instance.project_id, instance.is_done)}
+    deltas = stats.new_deltas()
+    for task_id, user_id in links:
+        if task_id in states:
+            stats.add_assignees(deltas, *states[task_id], [user_id], count)
+    stats.apply(deltas)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def user_saved_or_deleted(sender, instance, **kwargs):
+    authentication.users.delete(instance.pk)
+
+
+@receiver(post_migrate)
+def reinstall_search_index(sender, app_config, using, **kwargs):
+    # SQLite drops the full-text triggers whenever a migration rebuilds the
+    # task table, see `search.install`. Only an index created by migration
+    # 0004 is repaired, not one migrated back out.
+    connection = connections[using]
+    if app_config.label == "taskmanager" and "taskmanager_task_fts" in (
+        connection.introspection.table_names()
+    ):
+        search.install(connection)
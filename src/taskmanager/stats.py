@@ -0,0 +1,178 @@
+from collections import defaultdict
+
+from django.db import router, transaction
+from django.db.models import Count, F
+
+from taskmanager import sharding
+from taskmanager.models import AssigneeTaskStats, ProjectTaskStats, Task
+
+
+# Task counters are changed by deltas keyed by (project id, user id), the user
+# id being None for the project totals. A delta is an [open, done] pair.
+
+
+def new_deltas():
+    return defaultdict(lambda: [0, 0])
+
+
+def add_tasks(deltas, project_id, is_done, user_ids=(), count=1):
+    """
+    Count `count` tasks (negative to uncount them) of `project_id` in the
+    state `is_done` for the project and each of `user_ids`.
+    """
+    column = 1 if is_done else 0
+    deltas[(project_id, None)][column] += count
+    for user_id in user_ids:
+        deltas[(project_id, user_id)][column] += count
+
+
+def add_assignees(deltas, project_id, is_done, user_ids, count=1):
+    column = 1 if is_done else 0
+    for user_id in user_ids:
+        deltas[(project_id, user_id)][column] += count
+
+
+def apply(deltas):
+    """
+    Add `deltas` to the counters with one UPDATE per project and distinct
+    delta. Counters are created as needed, but only for positive deltas, so
+    uncounting the tasks of a project being deleted doesn't recreate its
+    counters.
+    """
+    using = router.db_for_write(ProjectTaskStats)
+    groups = defaultdict(list)
+    for (project_id, user_id), (open_delta, done_delta) in deltas.items():
+        if open_delta or done_delta:
+            groups[(project_id, user_id is None, open_delta, done_delta)].append(user_id)
+
+    with transaction.atomic(using=using):
+        for (project_id, is_project, open_delta, done_delta), user_ids in groups.items():
+            model = ProjectTaskStats if is_project else AssigneeTaskStats
+            if open_delta > 0 or done_delta > 0:
+                if is_project:
+                    rows = [ProjectTaskStats(project_id=project_id)]
+                else:
+                    rows = [AssigneeTaskStats(project_id=project_id, user_id=u) for u in user_ids]
+                model.objects.using(using).bulk_create(rows, ignore_conflicts=True)
+            counters = model.objects.using(using).filter(project_id=project_id)
+            if not is_project:
+                counters = counters.filter(user_id__in=user_ids)
+            counters.update(
+                open_tasks=F("open_tasks") + open_delta, done_tasks=F("done_tasks") + done_delta
+            )
+
+
+def difference(after, before, deltas=None):
+    """
+    Add the change from the counts `before` to the counts `after` to
+    `deltas` (new ones by default) and return them.
+    """
+    deltas = new_deltas() if deltas is None else deltas
+    for key, (open_tasks, done_tasks) in after.items():
+        deltas[key][0] += open_tasks
+        deltas[key][1] += done_tasks
+    for key, (open_tasks, done_tasks) in before.items():
+        deltas[key][0] -= open_tasks
+        deltas[key][1] -= done_tasks
+    return deltas
+
+
+def task_states(task_ids):
+    """
+    Return `{task id: (project id, is_done)}` of the tasks `task_ids`.
+    """
+    rows = Task.objects.filter(pk__in=task_ids).values_list("id", "project_id", "is_done")
+    return {pk: (project_id, is_done) for pk, project_id, is_done in rows}
+
+
+def compute(tasks):
+    """
+    Count the tasks of the `tasks` queryset from the source tables, as deltas.
+    """
+    deltas = new_deltas()
+    for row in tasks.values("project_id", "is_done").annotate(n=Count("id")).order_by():
+        add_tasks(deltas, row["project_id"], row["is_done"], count=row["n"])
+    links = (
+        Task.assignee.through.objects.using(tasks.db)
+        .filter(task__in=tasks)
+        .values("task__project_id", "task__is_done", "user_id")
+        .annotate(n=Count("id"))
+        .order_by()
+    )
+    for row in links:
+        add_assignees(
+            deltas, row["task__project_id"], row["task__is_done"], [row["user_id"]], row["n"]
+        )
+    return deltas
+
+
+def stored(using=None):
+    """
+    The current counters of the database `using`, every project database by
+    default, in the shape returned by `compute`.
+    """
+    deltas = new_deltas()
+    for database in [using] if using else sharding.databases():
+        for project_id, open_tasks, done_tasks in ProjectTaskStats.objects.using(
+            database
+        ).values_list("project_id", "open_tasks", "done_tasks"):
+            deltas[(project_id, None)] = [open_tasks, done_tasks]
+        for project_id, user_id, open_tasks, done_tasks in AssigneeTaskStats.objects.using(
+            database
+        ).values_list("project_id", "user_id", "open_tasks", "done_tasks"):
+            deltas[(project_id, user_id)] = [open_tasks, done_tasks]
+    return deltas
+
+
+def verify(using=None):
+    """
+    Compare the counters of the database `using`, every project database by
+    default, to the source tables and return the mismatches as
+    `{(project id, user id): (stored, expected)}`.
+    """
+    mismatches = {}
+    for database in [using] if using else sharding.databases():
+        expected = compute(Task.objects.using(database).all())
+        current = stored(database)
+        for key in set(expected) | set(current):
+            have, want = current.get(key, [0, 0]), expected.get(key, [0, 0])
+            if list(have) != list(want):
+                mismatches[key] = (tuple(have), tuple(want))
+    return mismatches
+
+
+def rebuild(using=None):
+    """
+    Recompute every counter of the database `using`, every project database
+    by default, from the source tables, in one transaction per database.
+    """
+    for database in [using] if using else sharding.databases():
+        _rebuild(database)
+
+
+def _rebuild(using):
+    with transaction.atomic(using=using):
+        ProjectTaskStats.objects.using(using).all().delete()
+        AssigneeTaskStats.objects.using(using).all().delete()
+        counters = compute(Task.objects.using(using).all())
+        ProjectTaskStats.objects.using(using).bulk_create(
+            [
+                ProjectTaskStats(project_id=project_id, open_tasks=open_tasks, done_tasks=done_tasks)
+                for (project_id, user_id), (open_tasks, done_tasks) in counters.items()
+                if user_id is None
+            ],
+            batch_size=1000,
+        )
+        AssigneeTaskStats.objects.using(using).bulk_create(
+            [
+                AssigneeTaskStats(
+                    project_id=project_id,
+                    user_id=user_id,
+                    open_tasks=open_tasks,
+                    done_tasks=done_tasks,
+                )
+                for (project_id, user_id), (open_tasks, done_tasks) in counters.items()
+                if user_id is not None
+            ],
+            batch_size=1000,
+        )
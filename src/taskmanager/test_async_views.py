@@ -0,0 +1,84 @@
+import time
+
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from taskmanager import membership
+from taskmanager.models import User
+from taskmanager.utils import JSONResponse
+from taskmanager.test_views import print_test_data
+
+
+class AsyncTaskListTests(APITestCase):
+    """
+    Test cases about the async task list views.
+    """
+
+    def setUp(self):
+        membership.index.clear()
+        self.manager = User.objects.create(username="manager", user_role=User.MANAGER)
+        self.developer = User.objects.create(username="developer", user_role=User.DEVELOPER)
+        self.stranger = User.objects.create(username="stranger", user_role=User.MANAGER)
+        self.project = self.manager.manager_projects.create(name="proj")
+        self.project.developers.add(self.developer)
+        for i in range(3):
+            task = self.project.tasks.create(title=f"task {i}", creator=self.manager)
+            if i % 2 == 0:
+                task.assignee.add(self.developer)
+        self.url = reverse("async_get_project_tasks", kwargs={"project_id": self.project.pk})
+
+    @print_test_data
+    def test_async_list_matches_sync_list(self):
+        """
+        Test the async view answers the same body and Link header as the sync one.
+        """
+        self.client.force_login(self.developer)
+        sync_url = reverse("get_project_tasks", kwargs={"project_id": self.project.pk})
+        expected = self.client.get(sync_url, {"page_size": 2})
+        response = self.client.get(self.url, {"page_size": 2})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json(), expected.json())
+        self.assertIn("cursor=", response["Link"])
+        self.assertIn("ETag", response)
+
+        url = reverse(
+            "async_get_project_assignee_tasks",
+            kwargs={"project_id": self.project.pk, "assignee_id": self.developer.pk},
+        )
+        response = self.client.get(url)
+        self.assertEqual([task["title"] for task in response.json()], ["task 0", "task 2"])
+
+    @print_test_data
+    def test_prevent_async_list_by_stranger_and_anonymous(self):
+        """
+        Test the async view checks authentication and project membership.
+        """
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(response["WWW-Authenticate"], "Bearer")
+
+        self.client.force_login(self.stranger)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(response.json(), JSONResponse.PERMISSION_DENIED)
+
+        response = self.client.get(
+            reverse("async_get_project_tasks", kwargs={"project_id": self.project.pk + 1})
+        )
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    @print_test_data
+    @override_settings(TASK_LIST_POLL_INTERVAL=0.05)
+    def test_async_list_long_poll_until_timeout(self):
+        """
+        Test a poll with an up to date ETag waits `wait` seconds, then answers 304.
+        """
+        self.client.force_login(self.manager)
+        etag = self.client.get(self.url)["ETag"]
+        start = time.monotonic()
+        response = self.client.get(self.url, {"wait": "0.2"}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertGreaterEqual(time.monotonic() - start, 0.2)
+        self.assertEqual(response["ETag"], etag)
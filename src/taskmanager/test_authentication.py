@@ -0,0 +1,154 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from taskmanager import authentication, membership, tokens
+from taskmanager.models import User
+from taskmanager.test_views import print_test_data
+
+
+class SignedTokenTests(APITestCase):
+    """
+    Test cases about the signed access and refresh tokens.
+    """
+
+    def setUp(self):
+        membership.index.clear()
+        authentication.users.clear()
+        tokens.revocations.clear()
+        cache.clear()
+        self.manager = User.objects.create_user(
+            username="manager", password="pass", user_role=User.MANAGER
+        )
+        self.project = self.manager.manager_projects.create(name="proj")
+        self.url = reverse("get_project_tasks", kwargs={"project_id": self.project.pk})
+
+    def obtain(self):
+        response = self.client.post(
+            reverse("obtain_token"), {"username": "manager", "password": "pass"}, format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.json()
+
+    @print_test_data
+    def test_access_token_without_auth_queries(self):
+        """
+        Test a request with a token reads neither the session nor the user table.
+        """
+        access = self.obtain()["access"]
+        self.client.get(self.url, HTTP_AUTHORIZATION=f"Bearer {access}")
+
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get(self.url, HTTP_AUTHORIZATION=f"Bearer {access}")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        tables = " ".join(query["sql"] for query in captured)
+        self.assertNotIn("django_session", tables)
+        self.assertNotIn("taskmanager_user", tables)
+
+    @print_test_data
+    def test_invalid_credentials_and_tokens(self):
+        """
+        Test wrong passwords, forged and expired tokens are refused.
+        """
+        response = self.client.post(
+            reverse("obtain_token"), {"username": "manager", "password": "nope"}, format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        access = self.obtain()["access"]
+        response = self.client.get(self.url, HTTP_AUTHORIZATION=f"Bearer {access}x")
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(response["WWW-Authenticate"], "Bearer")
+
+        with override_settings(ACCESS_TOKEN_TTL=-1):
+            access = self.obtain()["access"]
+        response = self.client.get(self.url, HTTP_AUTHORIZATION=f"Bearer {access}")
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(response.json(), {"detail": "Token expired."})
+
+    @print_test_data
+    def test_refresh_token_is_single_use(self):
+        """
+        Test a refresh token gives new tokens once.
+        """
+        refresh = self.obtain()["refresh"]
+        response = self.client.post(reverse("refresh_token"), {"token": refresh}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        access = response.json()["access"]
+        response = self.client.get(self.url, HTTP_AUTHORIZATION=f"Bearer {access}")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        response = self.client.post(reverse("refresh_token"), {"token": refresh}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+        # An access token is not a refresh token.
+        response = self.client.post(reverse("refresh_token"), {"token": access}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    @print_test_data
+    def test_revoked_token_and_changed_role_are_refused(self):
+        """
+        Test revoking a token, or changing the role of its user, invalidates it.
+        """
+        access = self.obtain()["access"]
+        response = self.client.post(reverse("revoke_token"), {"token": access}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        response = self.client.get(self.url, HTTP_AUTHORIZATION=f"Bearer {access}")
+        self.assertEqual(response.json(), {"detail": "Token revoked."})
+
+        # Checked against the deny-list once per `TOKEN_DENY_LIST_CHECK_TTL`.
+        access = tokens.make_token(self.manager, tokens.ACCESS)
+        claims = tokens.read_token(access, tokens.ACCESS)
+        with CaptureQueriesContext(connection) as captured:
+            tokens.read_token(access, tokens.ACCESS)
+        self.assertEqual(len(captured), 0)
+        # Revoked by another worker: refused once the remembered answer expires.
+        tokens._deny_list().add(f"taskmanager:denied:{claims['jti']}", 1, 60)
+        tokens.read_token(access, tokens.ACCESS)
+        tokens.revocations.delete(claims["jti"])
+        with self.assertRaises(tokens.InvalidToken):
+            tokens.read_token(access, tokens.ACCESS)
+
+        access = tokens.make_token(self.manager, tokens.ACCESS)
+        self.client.get(self.url, HTTP_AUTHORIZATION=f"Bearer {access}")
+        self.manager.user_role = User.DEVELOPER
+        self.manager.save()
+        response = self.client.get(self.url, HTTP_AUTHORIZATION=f"Bearer {access}")
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    @print_test_data
+    def test_refresh_is_claimed_once_and_users_are_not_shared(self):
+        """
+        Test two exchanges of one refresh token racing past the deny-list
+        check give new tokens once, the deny-list must be shared by the
+        workers, and every request gets its own user instance.
+        """
+        refresh = self.obtain()["refresh"]
+        claims = tokens.read_token(refresh, tokens.REFRESH)
+        self.assertTrue(tokens.revoke(claims))
+        with mock.patch.object(tokens, "read_token", return_value=claims):
+            response = self.client.post(reverse("refresh_token"), {"token": refresh}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(response.json(), {"detail": "Token revoked."})
+
+        self.assertEqual(tokens.check_deny_list(None), [])
+        with override_settings(
+            CACHES={"tokens": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+        ):
+            self.assertEqual(
+                [error.id for error in tokens.check_deny_list(None)], ["taskmanager.E002"]
+            )
+
+        first = authentication.get_user(self.manager.pk)
+        first.user_role = User.DEVELOPER
+        with CaptureQueriesContext(connection) as captured:
+            second = authentication.get_user(self.manager.pk)
+        self.assertEqual(len(captured), 0)
+        self.assertIsNot(first, second)
+        self.assertEqual((second.pk, second.user_role), (self.manager.pk, User.MANAGER))
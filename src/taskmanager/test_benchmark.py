@@ -0,0 +1,80 @@
+from unittest import skipIf
+
+from django.test import TestCase
+from django.urls import get_resolver
+
+from taskmanager import benchmark, renderers, urls
+from taskmanager.test_views import print_test_data
+
+
+class BenchmarkTests(TestCase):
+    """
+    Test cases about the API benchmark suite.
+    """
+
+    @print_test_data
+    def test_benchmark_covers_every_route(self):
+        """
+        Test there is a benchmark scenario for every task-manager route.
+        """
+        routes = {pattern.name for pattern in urls.urlpatterns}
+        self.assertEqual({scenario.route for scenario in benchmark.SCENARIOS}, routes)
+
+    @print_test_data
+    def test_benchmark_run_on_seeded_dataset(self):
+        """
+        Test seeding a small dataset and recording every scenario.
+        """
+        dataset = benchmark.seed(
+            managers=1,
+            projects_per_manager=2,
+            developers_per_project=3,
+            tasks_per_project=20,
+            assignees_per_task=2,
+        )
+        self.assertEqual(len(dataset.tasks[dataset.projects[0]]), 20)
+
+        results = benchmark.run(dataset, iterations=2)
+        self.assertEqual(set(results), {scenario.name for scenario in benchmark.SCENARIOS})
+        for result in results.values():
+            self.assertLessEqual(result["p50_ms"], result["p99_ms"])
+        self.assertEqual(results["list_project_tasks_not_modified"]["response_bytes"], 0)
+        self.assertEqual(
+            set(benchmark.serialization_cpu(dataset.projects[0], repeat=1)), {"serializer", "rows"}
+        )
+        self.assertEqual(
+            set(benchmark.rendering_cpu(dataset.projects[0], repeat=1)), {"drf", "fast"}
+        )
+        self.assertEqual(
+            set(benchmark.connection_setup(iterations=5)), {"new_ms", "pooled_ms", "saved_ms"}
+        )
+
+    @skipIf(renderers.orjson is None, "orjson is not installed.")
+    @print_test_data
+    def test_fast_renderer_beats_the_drf_renderer(self):
+        """
+        Test `FastJSONRenderer` writes a task list faster than `JSONRenderer`.
+        """
+        dataset = benchmark.seed(
+            managers=1,
+            projects_per_manager=1,
+            developers_per_project=3,
+            tasks_per_project=2000,
+            assignees_per_task=2,
+        )
+        rendering = benchmark.rendering_cpu(dataset.projects[0], repeat=5)
+        self.assertLess(rendering["fast"], rendering["drf"])
+
+    @print_test_data
+    def test_benchmark_compare_to_baseline(self):
+        """
+        Test latency and query count regressions are reported.
+        """
+        baseline = {"list": {"p95_ms": 10.0, "queries": 5}}
+        self.assertEqual(
+            benchmark.compare({"list": {"p95_ms": 12.0, "queries": 5}}, baseline), []
+        )
+        regressions = benchmark.compare(
+            {"list": {"p95_ms": 20.0, "queries": 6}}, baseline, max_latency_increase=0.5
+        )
+        self.assertEqual(len(regressions), 2)
@@ -0,0 +1,246 @@
+import json
+import threading
+
+from django.db import connection
+from django.test import TransactionTestCase, skipUnlessDBFeature
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from taskmanager import changes, membership
+from taskmanager.models import Project, Task, TaskTombstone, User
+from taskmanager.test_views import print_test_data
+
+
+class TaskChangesTests(APITestCase):
+    """
+    Test cases about the `since` mode of the task lists.
+    """
+
+    def setUp(self):
+        membership.index.clear()
+        self.manager = User.objects.create(username="manager", user_role=User.MANAGER)
+        self.dev_1 = User.objects.create(username="dev-1", user_role=User.DEVELOPER)
+        self.dev_2 = User.objects.create(username="dev-2", user_role=User.DEVELOPER)
+        self.project = self.manager.manager_projects.create(name="proj")
+        self.project.developers.add(self.dev_1, self.dev_2)
+        self.url = reverse("get_project_tasks", kwargs={"project_id": self.project.pk})
+        self.client.force_login(self.manager)
+
+    def send(self, method, url, data):
+        return getattr(self.client, method)(url, json.dumps(data), content_type="application/json")
+
+    def create_task(self, title, assignee=()):
+        response = self.send(
+            "post",
+            reverse("create_task", kwargs={"project_id": self.project.pk}),
+            {"title": title, "assignee": list(assignee)},
+        )
+        return response.json()["id"]
+
+    def sync_cursor(self, url=None):
+        response = self.client.get(url or self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response["X-Sync-Cursor"]
+
+    def changes(self, cursor, url=None, **params):
+        response = self.client.get(url or self.url, {"since": cursor, **params})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response
+
+    @print_test_data
+    def test_changes_since_cursor(self):
+        """
+        Test only the tasks created, changed or deleted after the cursor are
+        returned, then nothing with the new cursor.
+        """
+        kept = self.create_task("kept")
+        changed = self.create_task("changed")
+        deleted = self.create_task("deleted")
+        cursor = self.sync_cursor()
+
+        self.send(
+            "put",
+            reverse("update_task", kwargs={"project_id": self.project.pk, "pk": changed}),
+            {"title": "changed", "is_done": True, "assignee": [self.dev_1.pk]},
+        )
+        self.project.tasks.filter(pk=deleted).delete()
+        created = self.create_task("created")
+
+        body = self.changes(cursor).json()
+        self.assertEqual([task["id"] for task in body["tasks"]], [changed, created])
+        self.assertEqual(body["tasks"][0]["assignee"], [self.dev_1.pk])
+        self.assertTrue(body["tasks"][0]["is_done"])
+        self.assertEqual(body["deleted"], [deleted])
+        self.assertNotIn(kept, [task["id"] for task in body["tasks"]])
+
+        response = self.changes(body["cursor"])
+        self.assertEqual(response.json(), {"tasks": [], "deleted": [], "cursor": body["cursor"]})
+        self.assertNotIn("Link", response)
+
+    @print_test_data
+    def test_changes_of_filtered_lists(self):
+        """
+        Test a task unassigned from a developer, or no longer matching the
+        filters, is reported as deleted from the list.
+        """
+        task_id = self.create_task("task", [self.dev_1.pk, self.dev_2.pk])
+        assignee_url = reverse(
+            "get_project_assignee_tasks",
+            kwargs={"project_id": self.project.pk, "assignee_id": self.dev_1.pk},
+        )
+        cursor = self.sync_cursor(assignee_url)
+        open_cursor = self.sync_cursor(self.url + "?is_done=false")
+
+        self.send(
+            "patch",
+            reverse("bulk_tasks", kwargs={"project_id": self.project.pk}),
+            {"filter": {"ids": [task_id]}, "is_done": True, "assignee": {"remove": [self.dev_1.pk]}},
+        )
+        body = self.changes(cursor, assignee_url).json()
+        self.assertEqual((body["tasks"], body["deleted"]), ([], [task_id]))
+        body = self.changes(open_cursor, is_done="false").json()
+        self.assertEqual((body["tasks"], body["deleted"]), ([], [task_id]))
+        body = self.changes(cursor, fields="id,assignee").json()
+        self.assertEqual(body["tasks"], [{"id": task_id, "assignee": [self.dev_2.pk]}])
+
+        # Changes made through the other side of the relation too.
+        cursor = body["cursor"]
+        self.dev_2.task_set.clear()
+        body = self.changes(cursor, fields="id,assignee").json()
+        self.assertEqual(body["tasks"], [{"id": task_id, "assignee": []}])
+
+    @print_test_data
+    def test_changes_in_pages(self):
+        """
+        Test more changes than a page are read page by page, following the
+        `Link` header, without losing the tasks of a bulk change.
+        """
+        cursor = self.sync_cursor()
+        self.send(
+            "post",
+            reverse("bulk_tasks", kwargs={"project_id": self.project.pk}),
+            {"tasks": [{"title": f"task {i}"} for i in range(5)]},
+        )
+        first = self.project.tasks.order_by("id").first()
+        first_id = first.pk
+        first.delete()
+
+        seen, deleted = [], []
+        url = f"{self.url}?since={cursor}&page_size=2"
+        pages = 0
+        while url:
+            response = self.client.get(url)
+            seen += [task["id"] for task in response.json()["tasks"]]
+            deleted += response.json()["deleted"]
+            url = response.get("Link", "").partition(">")[0][1:] or None
+            pages += 1
+        self.assertEqual(pages, 3)
+        self.assertEqual(seen, list(self.project.tasks.order_by("id").values_list("id", flat=True)))
+        self.assertEqual(deleted, [first_id])
+
+    @print_test_data
+    def test_invalid_cursor_and_project_deletion(self):
+        """
+        Test an invalid cursor is refused, and the tombstones of a deleted
+        project are removed with it.
+        """
+        response = self.client.get(self.url, {"since": "abc"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        self.create_task("task")
+        self.project.tasks.all().delete()
+        self.create_task("other")
+        self.assertEqual(TaskTombstone.objects.filter(project=self.project).count(), 1)
+        Project.objects.filter(pk=self.project.pk).delete()
+        self.assertFalse(TaskTombstone.objects.exists())
+
+    @print_test_data
+    def test_changes_are_stamped_before_the_commit(self):
+        """
+        Test the project version is bumped by the last statements of a write,
+        after the tasks are written, and a failed nested block stamps
+        nothing.
+        """
+        task_id = self.create_task("task")
+        url = reverse("update_task", kwargs={"project_id": self.project.pk, "pk": task_id})
+        with CaptureQueriesContext(connection) as captured:
+            response = self.send("patch", url, {"is_done": True, "assignee": [self.dev_1.pk]})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        writes = [
+            query["sql"]
+            for query in captured
+            if query["sql"].startswith(("INSERT", "UPDATE", "DELETE"))
+        ]
+        bumps = [
+            i for i, sql in enumerate(writes) if sql.startswith('UPDATE "taskmanager_project"')
+        ]
+        self.assertEqual(len(bumps), 1)
+        self.assertGreater(bumps[0], 2)
+        for sql in writes[bumps[0] + 1 :]:
+            self.assertIn('"change_seq"', sql)
+        version = Project.objects.get(pk=self.project.pk).version
+        self.assertEqual(Task.objects.get(pk=task_id).change_seq, version)
+
+        with changes.recording():
+            try:
+                with changes.recording():
+                    Task.objects.get(pk=task_id).delete()
+                    raise ValueError
+            except ValueError:
+                pass
+        self.assertEqual(Project.objects.get(pk=self.project.pk).version, version)
+        self.assertFalse(TaskTombstone.objects.filter(task_id=task_id).exists())
+
+
+class ConcurrentWritersTests(TransactionTestCase):
+    """
+    Test cases about task writes running at the same time.
+    """
+
+    def setUp(self):
+        membership.index.clear()
+        self.manager = User.objects.create(username="manager", user_role=User.MANAGER)
+        self.project = self.manager.manager_projects.create(name="proj")
+        self.tasks = [
+            Task.objects.create(project=self.project, creator=self.manager, title=f"task {i}")
+            for i in range(2)
+        ]
+
+    @skipUnlessDBFeature("has_select_for_update")
+    @print_test_data
+    def test_writers_of_a_project_do_not_wait_for_each_other(self):
+        """
+        Test a writer of a task commits while another writer of the same
+        project is still in its transaction, and each change gets its own
+        sequence in commit order.
+        """
+        first_written, second_done = threading.Event(), threading.Event()
+        errors = []
+
+        def first_writer():
+            try:
+                with changes.recording():
+                    Task.objects.filter(pk=self.tasks[0].pk).get().save()
+                    first_written.set()
+                    # The second writer can't commit if the project is locked.
+                    second_done.wait(10)
+            except Exception as e:
+                errors.append(e)
+            finally:
+                first_written.set()
+                connection.close()
+
+        thread = threading.Thread(target=first_writer)
+        thread.start()
+        self.assertTrue(first_written.wait(10))
+        with changes.recording():
+            Task.objects.filter(pk=self.tasks[1].pk).get().save()
+        second_done.set()
+        thread.join(10)
+        self.assertEqual(errors, [])
+
+        first, second = (Task.objects.get(pk=task.pk).change_seq for task in self.tasks)
+        self.assertLess(second, first)
+        self.assertEqual(Project.objects.get(pk=self.project.pk).version, first)
@@ -0,0 +1,158 @@
+import base64
+import json
+from urllib.parse import parse_qs, urlparse
+
+from django.db import connection
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from taskmanager import membership
+from taskmanager.filters import filter_tasks
+from taskmanager.models import Task, User
+from taskmanager.test_views import print_test_data
+
+
+class TaskListFilterTests(APITestCase):
+    """
+    Test cases about filtering and ordering the project task list.
+    """
+
+    def setUp(self):
+        membership.index.clear()
+        self.manager = User.objects.create(username="manager", user_role=User.MANAGER)
+        self.developer_1 = User.objects.create(username="developer-1", user_role=User.DEVELOPER)
+        self.developer_2 = User.objects.create(username="developer-2", user_role=User.DEVELOPER)
+        self.project = self.manager.manager_projects.create(name="proj")
+        self.project.developers.add(self.developer_1, self.developer_2)
+
+        self.task_a = self.project.tasks.create(title="b-task", creator=self.manager)
+        self.task_b = self.project.tasks.create(
+            title="a-task", creator=self.developer_1, is_done=True
+        )
+        self.task_c = self.project.tasks.create(title="a-other", creator=self.developer_1)
+        self.task_a.assignee.add(self.developer_1, self.developer_2)
+        self.task_b.assignee.add(self.developer_2)
+
+        self.client.force_login(self.manager)
+        self.url = reverse("get_project_tasks", kwargs={"project_id": self.project.pk})
+
+    def get_ids(self, params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [task["id"] for task in response.data]
+
+    @print_test_data
+    def test_filter_project_tasks(self):
+        """
+        Test the is_done, creator, assignee and title prefix filters.
+        """
+        self.assertEqual(self.get_ids({"is_done": "true"}), [self.task_b.id])
+        self.assertEqual(self.get_ids({"is_done": "false"}), [self.task_a.id, self.task_c.id])
+        self.assertEqual(
+            self.get_ids({"creator": self.developer_1.id}), [self.task_b.id, self.task_c.id]
+        )
+        self.assertEqual(
+            self.get_ids({"assignee": f"{self.developer_1.id},{self.developer_2.id}"}),
+            [self.task_a.id, self.task_b.id],
+        )
+        self.assertEqual(self.get_ids({"title_prefix": "a-"}), [self.task_b.id, self.task_c.id])
+
+        response = self.client.get(self.url, {"assignee": "one,two"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @print_test_data
+    def test_title_prefix_is_literal_and_case_sensitive(self):
+        """
+        Test the title prefix matches the same tasks on every backend: with
+        the case of every letter, and `%` and `_` as plain characters.
+        """
+        titles = ["Report", "report", "rÉsumé", "résumé", "50% off", "50_off", "500 off"]
+        tasks = {
+            title: self.project.tasks.create(title=title, creator=self.manager).id
+            for title in titles
+        }
+        for prefix, expected in [
+            ("Rep", ["Report"]),
+            ("rep", ["report"]),
+            ("rÉ", ["rÉsumé"]),
+            ("ré", ["résumé"]),
+            ("50%", ["50% off"]),
+            ("50_", ["50_off"]),
+            ("50", ["50% off", "50_off", "500 off"]),
+        ]:
+            self.assertEqual(
+                self.get_ids({"title_prefix": prefix}), [tasks[title] for title in expected], prefix
+            )
+
+    @print_test_data
+    def test_order_project_tasks_in_pages(self):
+        """
+        Test ordering by title walks every page with the keyset cursor, and
+        crafted cursors are refused.
+        """
+        self.project.tasks.create(title="a-task", creator=self.manager)
+        expected = list(
+            self.project.tasks.order_by("-title", "-id").values_list("id", flat=True)
+        )
+
+        ids, params = [], {"ordering": "-title", "page_size": 1}
+        while True:
+            response = self.client.get(self.url, params)
+            ids += [task["id"] for task in response.data]
+            if not response.has_header("Link"):
+                break
+            next_url = response["Link"][1 : response["Link"].index(">")]
+            params["cursor"] = parse_qs(urlparse(next_url).query)["cursor"][0]
+        self.assertEqual(ids, expected)
+
+        for position in (["a", "x"], [["a"], 1], [None, 1], ["a", True], ["a", 1, 2], {"a": 1}):
+            cursor = base64.urlsafe_b64encode(json.dumps(position).encode()).decode()
+            response = self.client.get(self.url, {"ordering": "title", "cursor": cursor})
+            self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND, position)
+        cursor = base64.urlsafe_b64encode(json.dumps(["a-task", "1"]).encode()).decode()
+        response = self.client.get(self.url, {"ordering": "title", "cursor": cursor})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+
+class TaskListIndexTests(TestCase):
+    """
+    Test cases making sure the task list filters are served by their indexes.
+    """
+
+    def query_plan(self, queryset):
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute("EXPLAIN QUERY PLAN " + sql, params)
+            return " ".join(str(row[-1]) for row in cursor.fetchall())
+
+    def setUp(self):
+        if connection.vendor != "sqlite":
+            self.skipTest("Query plans are checked on SQLite only.")
+        self.manager = User.objects.create(username="manager", user_role=User.MANAGER)
+        self.project = self.manager.manager_projects.create(name="proj")
+
+    @print_test_data
+    def test_task_list_filters_use_indexes(self):
+        """
+        Test the done, creator, assignee and title filters use the composite
+        indexes.
+        """
+        tasks = self.project.tasks.all()
+        self.assertIn(
+            "task_project_is_done_idx",
+            self.query_plan(filter_tasks(tasks, {"is_done": False})),
+        )
+        self.assertIn(
+            "task_project_creator_idx",
+            self.query_plan(filter_tasks(tasks, {"creator": self.manager.id})),
+        )
+        self.assertIn(
+            "task_assignee_user_task_idx",
+            self.query_plan(filter_tasks(tasks, {"assignee": [self.manager.id]})),
+        )
+        self.assertIn(
+            "task_project_title_idx",
+            self.query_plan(filter_tasks(tasks, {"title_prefix": "a-"})),
+        )
@@ -0,0 +1,170 @@
+import io
+import json
+from datetime import timedelta
+from unittest import mock
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.parsers import FormParser, MultiPartParser
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.test import APITestCase
+
+from taskmanager import changes, idempotency, membership
+from taskmanager.models import IdempotencyKey, Task, User
+from taskmanager.renderers import FastJSONParser
+from taskmanager.test_views import print_test_data
+
+
+class IdempotencyKeyTests(APITestCase):
+    """
+    Test cases about the `Idempotency-Key` header of the task writes.
+    """
+
+    def setUp(self):
+        membership.index.clear()
+        self.manager = User.objects.create(username="manager", user_role=User.MANAGER)
+        self.developer = User.objects.create(username="developer", user_role=User.DEVELOPER)
+        self.project = self.manager.manager_projects.create(name="proj")
+        self.project.developers.add(self.developer)
+        self.url = reverse("create_task", kwargs={"project_id": self.project.pk})
+        self.body = json.dumps({"title": "once", "assignee": [self.developer.pk]})
+        self.client.force_login(self.manager)
+
+    def post(self, body=None, key="retry-1"):
+        return self.client.post(
+            self.url,
+            body or self.body,
+            content_type="application/json",
+            HTTP_IDEMPOTENCY_KEY=key,
+        )
+
+    def fingerprint(self):
+        request = RequestFactory().post(self.url, self.body, content_type="application/json")
+        return idempotency.fingerprint(Request(request, parsers=[FastJSONParser()]))
+
+    @print_test_data
+    def test_retries_replay_the_first_response(self):
+        """
+        Test a retried create or update returns the stored response without
+        checking the membership again nor writing, while another request
+        with the same key is refused.
+        """
+        first = self.post()
+        self.assertEqual(first.status_code, status.HTTP_201_CREATED)
+        with CaptureQueriesContext(connection) as captured:
+            retry = self.post()
+        self.assertEqual(retry.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(retry.json(), first.json())
+        self.assertEqual(retry["ETag"], first["ETag"])
+        self.assertEqual(retry["Idempotent-Replayed"], "true")
+        self.assertFalse([query for query in captured if "taskmanager_project" in query["sql"]])
+        self.assertEqual(Task.objects.filter(project=self.project).count(), 1)
+
+        other = self.post(json.dumps({"title": "twice"}))
+        self.assertEqual(other.status_code, status.HTTP_422_UNPROCESSABLE_ENTITY)
+        self.assertEqual(self.post(key="retry-2").status_code, status.HTTP_201_CREATED)
+        self.client.force_login(self.developer)
+        self.assertEqual(self.post().status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Task.objects.filter(project=self.project).count(), 3)
+
+        task_id = first.json()["id"]
+        url = reverse("update_task", kwargs={"project_id": self.project.pk, "pk": task_id})
+        etags = set()
+        for _ in range(2):
+            response = self.client.patch(
+                url, '{"is_done": true}', content_type="application/json", HTTP_IDEMPOTENCY_KEY="u1"
+            )
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+            etags.add(response["ETag"])
+        self.assertEqual(etags, {'"{}"'.format(Task.objects.get(pk=task_id).version)})
+
+    @print_test_data
+    def test_concurrent_duplicate_is_refused_at_once(self):
+        """
+        Test a request whose key is held by a running request gets a 409 at
+        once, and the response of the first one when it is done.
+        """
+        entry = IdempotencyKey.objects.create(
+            user_id=self.manager.pk,
+            key="retry-1",
+            fingerprint=self.fingerprint(),
+            created_at=timezone.now(),
+        )
+        response = self.post()
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertIn("in progress", response.json()["detail"])
+
+        IdempotencyKey.objects.filter(pk=entry.pk).update(
+            status_code=201, body=b'{"id":7}', headers={"ETag": '"3"'}
+        )
+        response = self.post()
+        self.assertEqual((response.status_code, response.json()), (201, {"id": 7}))
+        self.assertEqual(response["ETag"], '"3"')
+        self.assertFalse(Task.objects.exists())
+
+    @print_test_data
+    def test_response_is_stored_with_the_writes(self):
+        """
+        Test the response is only kept when the writes of the request are
+        committed, and form requests are fingerprinted from their data.
+        """
+        with mock.patch.object(changes, "next_seq", return_value=None):
+            response = self.post()
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertFalse(IdempotencyKey.objects.exists())
+        self.assertFalse(Task.objects.exists())
+        self.assertEqual(self.post().status_code, status.HTTP_201_CREATED)
+        self.assertEqual(IdempotencyKey.objects.get().status_code, status.HTTP_201_CREATED)
+
+        def form_fingerprint(form):
+            request = Request(
+                RequestFactory().post(self.url, form), parsers=[MultiPartParser(), FormParser()]
+            )
+            request.data  # The parser consumes the stream.
+            return idempotency.fingerprint(request)
+
+        form = {"title": "form", "assignee": [self.developer.pk]}
+        self.assertEqual(form_fingerprint(form), form_fingerprint(dict(form)))
+        self.assertNotEqual(form_fingerprint(form), form_fingerprint({"title": "other"}))
+
+    @print_test_data
+    def test_failed_stale_and_expired_keys(self):
+        """
+        Test a failed request releases its key, a key held too long by a
+        request which died is taken over, and expired keys are purged.
+        """
+
+        class View:
+            @idempotency.idempotent
+            def post(self, request):
+                return Response({"detail": "down"}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+
+        request = RequestFactory().post("/", "{}", content_type="application/json")
+        request = Request(request, parsers=[FastJSONParser()])
+        request.user = self.manager
+        request.META["HTTP_IDEMPOTENCY_KEY"] = "failing"
+        self.assertEqual(View().post(request).status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertFalse(IdempotencyKey.objects.filter(key="failing").exists())
+
+        IdempotencyKey.objects.create(
+            user_id=self.manager.pk,
+            key="retry-1",
+            fingerprint=self.fingerprint(),
+            created_at=timezone.now() - timedelta(minutes=5),
+        )
+        self.assertEqual(self.post().status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Task.objects.count(), 1)
+
+        IdempotencyKey.objects.filter(key="retry-1").update(
+            created_at=timezone.now() - timedelta(days=2)
+        )
+        output = io.StringIO()
+        call_command("purge_idempotency_keys", stdout=output)
+        self.assertIn("1 expired idempotency keys deleted.", output.getvalue())
+        self.assertFalse(IdempotencyKey.objects.exists())
@@ -0,0 +1,154 @@
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from taskmanager import imports, membership
+from taskmanager.models import Project, User
+from taskmanager.test_views import print_test_data
+
+
+RECORDS = [
+    {"type": "user", "username": "manager", "password": "pass", "user_role": User.MANAGER},
+    {"type": "user", "username": "dev-1", "password": "pass", "user_role": User.DEVELOPER},
+    {"type": "user", "username": "dev-2", "password": "pass", "user_role": User.DEVELOPER},
+    {"type": "project", "name": "proj", "manager": "manager"},
+    {"type": "membership", "project": "proj", "manager": "manager", "developer": "dev-1"},
+    {"type": "membership", "project": "proj", "manager": "manager", "developer": "dev-2"},
+]
+
+
+class ImportOrgTests(TestCase):
+    """
+    Test cases about the bulk user, project and membership import.
+    """
+
+    def setUp(self):
+        membership.index.clear()
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir)
+
+    def write_jsonl(self, records):
+        path = os.path.join(self.dir, "org.jsonl")
+        with open(path, "w") as file:
+            file.writelines(json.dumps(record) + "\n" for record in records)
+        return path
+
+    def assert_imported(self):
+        project = Project.objects.get(name="proj")
+        self.assertEqual(project.manager.username, "manager")
+        self.assertEqual(
+            sorted(project.developers.values_list("username", flat=True)), ["dev-1", "dev-2"]
+        )
+        self.assertTrue(User.objects.get(username="dev-1").check_password("pass"))
+        self.assertEqual(User.objects.get(username="dev-1").user_role, User.DEVELOPER)
+
+    @print_test_data
+    def test_import_csv(self):
+        """
+        Test importing a CSV file in batches smaller than the file.
+        """
+        path = os.path.join(self.dir, "org.csv")
+        columns = [
+            "type", "username", "password", "user_role", "name", "manager", "project", "developer"
+        ]
+        with open(path, "w") as file:
+            file.write(",".join(columns) + "\n")
+            for record in RECORDS:
+                file.write(",".join(record.get(column, "") for column in columns) + "\n")
+
+        out = StringIO()
+        call_command("import_org", path, batch_size=2, workers=1, stdout=out)
+        self.assert_imported()
+        self.assertIn("3 users, 1 projects and 2 memberships created, 0 errors", out.getvalue())
+        self.assertFalse(os.path.exists(path + ".checkpoint"))
+
+    @print_test_data
+    def test_resume_after_crash(self):
+        """
+        Test an import interrupted after a batch restarts from its checkpoint
+        and creates nothing twice.
+        """
+        path = self.write_jsonl(RECORDS + [{"type": "group"}])
+        original = imports._import_batch
+        calls = []
+
+        def crash_on_third_batch(records, pool, stats):
+            calls.append(records[0][0])
+            if len(calls) == 3:
+                raise RuntimeError("crash")
+            original(records, pool, stats)
+
+        with mock.patch.object(imports, "_import_batch", crash_on_third_batch):
+            with self.assertRaises(RuntimeError):
+                call_command("import_org", path, batch_size=2, workers=1, stdout=StringIO())
+        with open(path + ".checkpoint") as file:
+            self.assertEqual(file.read(), "4")
+        self.assertEqual(Project.objects.count(), 1)
+
+        out, err = StringIO(), StringIO()
+        call_command("import_org", path, batch_size=2, workers=1, stdout=out, stderr=err)
+        self.assertIn("Resuming after line 4", out.getvalue())
+        self.assertIn("line 7: unknown record type 'group'", err.getvalue())
+        self.assert_imported()
+
+        # Importing everything again is harmless.
+        call_command("import_org", path, workers=1, stdout=out, stderr=err)
+        self.assertEqual(User.objects.count(), 3)
+        self.assertEqual(Project.objects.count(), 1)
+        self.assertEqual(Project.developers.through.objects.count(), 2)
+
+    @print_test_data
+    def test_hash_passwords_in_process_pool(self):
+        """
+        Test passwords hashed by the pool workers are checked by this process.
+        """
+        path = self.write_jsonl(RECORDS)
+        call_command("import_org", path, workers=2, stdout=StringIO())
+        self.assert_imported()
+
+    @print_test_data
+    def test_unknown_user_role_is_a_row_error(self):
+        """
+        Test a user with a role other than developer or manager is reported
+        as a bad line and not created, while the other lines are imported.
+        """
+        records = RECORDS + [
+            {"type": "user", "username": "root", "password": "pass", "user_role": "admin"},
+            {"type": "membership", "project": "proj", "manager": "manager", "developer": "root"},
+        ]
+        out, err = StringIO(), StringIO()
+        call_command("import_org", self.write_jsonl(records), workers=1, stdout=out, stderr=err)
+        self.assertIn("line 7: unknown user role 'admin'", err.getvalue())
+        self.assertIn("line 8: unknown project or developer", err.getvalue())
+        self.assertIn("3 users, 1 projects and 2 memberships created, 2 errors", out.getvalue())
+        self.assertFalse(User.objects.filter(username="root").exists())
+        self.assert_imported()
+
+    @print_test_data
+    def test_malformed_lines_are_row_errors(self):
+        """
+        Test lines which aren't JSON objects or miss a required key are
+        reported with their line number, while the other lines are imported.
+        """
+        path = self.write_jsonl(RECORDS)
+        with open(path, "a") as file:
+            file.write('{"type": "user", "username": \n')
+            file.write("[1, 2]\n")
+            file.write(json.dumps({"type": "user", "password": "pass"}) + "\n")
+            file.write(json.dumps({"type": "project", "manager": "manager"}) + "\n")
+            file.write(json.dumps({"type": "membership", "project": "proj"}) + "\n")
+        out, err = StringIO(), StringIO()
+        call_command("import_org", path, workers=1, stdout=out, stderr=err)
+        self.assertIn("line 7: invalid JSON: Expecting value at column 29", err.getvalue())
+        self.assertIn("line 8: not a JSON object", err.getvalue())
+        self.assertIn("line 9: missing 'username'", err.getvalue())
+        self.assertIn("line 10: missing 'name'", err.getvalue())
+        self.assertIn("line 11: missing 'manager', 'developer'", err.getvalue())
+        self.assertIn("3 users, 1 projects and 2 memberships created, 5 errors", out.getvalue())
+        self.assert_imported()
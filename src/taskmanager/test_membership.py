@@ -0,0 +1,105 @@
+import time
+from unittest import mock
+
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+
+from taskmanager import membership
+from taskmanager.models import User
+from taskmanager.test_views import print_test_data
+
+
+class MembershipIndexTests(TestCase):
+    """
+    Test cases about the cached project membership lookups.
+    """
+
+    def setUp(self):
+        membership.index.clear()
+        self.manager = User.objects.create(username="manager", user_role=User.MANAGER)
+        self.developer = User.objects.create(username="developer", user_role=User.DEVELOPER)
+        self.stranger = User.objects.create(username="stranger", user_role=User.DEVELOPER)
+        self.project = self.manager.manager_projects.create(name="proj")
+        self.project.developers.add(self.developer)
+
+    @print_test_data
+    def test_membership_is_cached(self):
+        """
+        Test a repeated membership check does not hit the database.
+        """
+        with self.assertNumQueries(1):
+            self.assertTrue(membership.is_manager_or_developer(self.developer, self.project))
+        with self.assertNumQueries(0):
+            self.assertTrue(membership.is_manager_or_developer(self.developer, self.project))
+            self.assertTrue(membership.is_manager_or_developer(self.developer, self.project))
+
+    @print_test_data
+    def test_membership_invalidated_on_developers_change(self):
+        """
+        Test adding, removing and clearing developers invalidates the cache.
+        """
+        self.assertFalse(membership.is_manager_or_developer(self.stranger, self.project))
+        self.project.developers.add(self.stranger)
+        self.assertTrue(membership.is_manager_or_developer(self.stranger, self.project))
+
+        self.project.developers.remove(self.stranger)
+        self.assertFalse(membership.is_manager_or_developer(self.stranger, self.project))
+
+        self.assertTrue(membership.is_manager_or_developer(self.developer, self.project))
+        self.developer.projects.clear()
+        self.assertFalse(membership.is_manager_or_developer(self.developer, self.project))
+
+    @print_test_data
+    def test_membership_invalidated_on_manager_change(self):
+        """
+        Test changing the project manager invalidates the cache.
+        """
+        self.assertTrue(membership.is_manager_or_developer(self.manager, self.project))
+        self.project.manager = self.stranger
+        self.project.save()
+        self.assertFalse(membership.is_manager_or_developer(self.manager, self.project))
+        self.assertTrue(membership.is_manager_or_developer(self.stranger, self.project))
+
+    @print_test_data
+    @override_settings(
+        CACHES={"shared": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+    )
+    def test_membership_shared_cache(self):
+        """
+        Test an invalidation is seen through the shared cache by other processes.
+        """
+        other_process = membership.MembershipIndex(maxsize=10, ttl=30, shared_cache="shared")
+        index = membership.MembershipIndex(maxsize=10, ttl=30, shared_cache="shared")
+        try:
+            self.assertFalse(other_process.is_member(self.stranger.pk, self.project.pk))
+            with self.assertNumQueries(0):
+                self.assertFalse(index.is_member(self.stranger.pk, self.project.pk))
+
+            self.project.developers.add(self.stranger)
+            index.invalidate(self.project.pk)
+            self.assertTrue(other_process.is_member(self.stranger.pk, self.project.pk))
+        finally:
+            caches["shared"].clear()
+
+    @print_test_data
+    def test_generations_are_bounded(self):
+        """
+        Test the local generations of the projects are bounded, and
+        forgetting one brings no stale entry back.
+        """
+        index = membership.MembershipIndex(maxsize=2, ttl=30)
+        other = self.manager.manager_projects.create(name="other")
+        self.assertTrue(index.is_member(self.developer.pk, self.project.pk))
+        self.project.developers.remove(self.developer)
+        for project_id in range(1000, 1010):
+            index.invalidate(project_id)
+        self.assertEqual(len(index._generations), 2)
+        self.assertFalse(index.is_member(self.developer.pk, self.project.pk))
+
+        index.invalidate(other.pk)
+        self.assertTrue(index.is_member(self.manager.pk, other.pk))
+        with mock.patch.object(membership.time, "monotonic", return_value=time.monotonic() + 31):
+            self.assertIsNone(index._generations.get(other.pk))
+            other.manager = self.stranger
+            other.save()
+            self.assertFalse(index.is_member(self.manager.pk, other.pk))
@@ -0,0 +1,72 @@
+import json
+
+from asgiref.sync import async_to_sync, iscoroutinefunction
+
+from django.test import AsyncClient, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from taskmanager import membership
+from taskmanager.middleware import RequestTimingMiddleware
+from taskmanager.models import User
+from taskmanager.test_views import print_test_data
+
+
+@override_settings(REQUEST_TIMING_ENABLED=True)
+class RequestTimingMiddlewareTests(APITestCase):
+    """
+    Test cases about the per-request SQL and timing instrumentation.
+    """
+
+    def setUp(self):
+        membership.index.clear()
+        self.manager = User.objects.create(username="manager", user_role=User.MANAGER)
+        self.project = self.manager.manager_projects.create(name="proj")
+        self.project.tasks.create(title="task", creator=self.manager)
+        self.url = reverse("get_project_tasks", kwargs={"project_id": self.project.pk})
+
+    @print_test_data
+    def test_server_timing_header(self):
+        """
+        Test a response carries its db, view, render and total timings.
+        """
+        self.client.force_login(self.manager)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        metrics = [metric.split(";")[0] for metric in response["Server-Timing"].split(", ")]
+        self.assertEqual(metrics, ["db", "view", "render", "total"])
+        self.assertRegex(response["Server-Timing"], r'desc="[1-9]\d* queries"')
+
+    @print_test_data
+    @override_settings(REQUEST_TIMING_MAX_QUERIES=2)
+    def test_log_requests_above_query_threshold(self):
+        """
+        Test a request running too many queries is logged with its worst query.
+        """
+        self.client.force_login(self.manager)
+        with self.assertLogs("taskmanager.timing", level="WARNING") as logs:
+            self.client.get(self.url)
+        line = json.loads(logs.records[0].getMessage())
+        self.assertEqual(line["path"], self.url)
+        self.assertGreater(line["queries"], 2)
+        self.assertTrue(line["worst_query"].startswith("SELECT"))
+
+    @print_test_data
+    def test_server_timing_header_under_asgi(self):
+        """
+        Test queries are counted when the request goes through the ASGI handler.
+        """
+        client = AsyncClient()
+        client.force_login(self.manager)
+
+        async def get():
+            return await client.get(self.url)
+
+        response = async_to_sync(get)()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertRegex(response["Server-Timing"], r'desc="[1-9]\d* queries"')
+
+        # Django awaits the middleware only in front of an async handler.
+        self.assertTrue(iscoroutinefunction(RequestTimingMiddleware(get)))
+        self.assertFalse(iscoroutinefunction(RequestTimingMiddleware(lambda request: None)))
@@ -0,0 +1,151 @@
+import os
+import tempfile
+import threading
+
+from django.db import connection
+from django.test import SimpleTestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from taskmanager import membership, pool
+from taskmanager.backends.sqlite3.base import DatabaseWrapper
+from taskmanager.models import User
+from taskmanager.test_views import print_test_data
+
+
+class FakeConnection:
+    def __init__(self):
+        self.closed = False
+        self.broken = False
+        self.rollbacks = 0
+
+    def cursor(self):
+        if self.broken:
+            raise OSError("server closed the connection")
+        return FakeCursor()
+
+    def rollback(self):
+        self.rollbacks += 1
+
+    def close(self):
+        self.closed = True
+
+
+class FakeCursor:
+    def execute(self, sql):
+        pass
+
+    def close(self):
+        pass
+
+
+class ConnectionPoolTests(SimpleTestCase):
+    """
+    Test cases about the per-process database connection pool.
+    """
+
+    @print_test_data
+    def test_connections_are_reused_and_bounded(self):
+        """
+        Test released connections are handed out again, and a thread waits
+        for one when the pool is full until it times out.
+        """
+        connections = pool.ConnectionPool(max_size=2, timeout=0.05)
+        first = connections.acquire(FakeConnection)
+        second = connections.acquire(FakeConnection)
+        with self.assertRaises(pool.PoolTimeout):
+            connections.acquire(FakeConnection)
+        stats = connections.stats()
+        self.assertEqual((stats["in_use"], stats["waits"], stats["timeouts"]), (2, 1, 1))
+        self.assertGreater(stats["wait_time_ms"], 0)
+
+        connections.release(first)
+        self.assertEqual(first.rollbacks, 1)
+        self.assertIs(connections.acquire(FakeConnection), first)
+
+        waiter = threading.Thread(target=lambda: connections.release(second))
+        threading.Timer(0.01, waiter.start).start()
+        connections.timeout = 5
+        self.assertIs(connections.acquire(FakeConnection), second)
+        stats = connections.stats()
+        self.assertEqual((stats["opened"], stats["in_use"], stats["waits"]), (2, 2, 2))
+
+    @print_test_data
+    def test_broken_and_old_connections_are_replaced(self):
+        """
+        Test the pre-ping replaces a connection the server closed, and
+        connections older than the max age are closed.
+        """
+        connections = pool.ConnectionPool(max_size=1)
+        broken = connections.acquire(FakeConnection)
+        connections.release(broken)
+        broken.broken = True
+        replacement = connections.acquire(FakeConnection)
+        self.assertIsNot(replacement, broken)
+        self.assertTrue(broken.closed)
+        self.assertEqual(connections.stats()["ping_failures"], 1)
+
+        connections.release(replacement, reusable=False)
+        self.assertTrue(replacement.closed)
+
+        connections = pool.ConnectionPool(max_size=1, max_age=0)
+        old = connections.acquire(FakeConnection)
+        connections.release(old)
+        self.assertTrue(old.closed)
+        self.assertEqual(connections.stats()["idle"], 0)
+
+
+class PooledBackendTests(APITestCase):
+    """
+    Test cases about the pooled database backends and the pool statistics.
+    """
+
+    def setUp(self):
+        membership.index.clear()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.addCleanup(pool.close_pool, "pooled")
+        self.settings_dict = dict(
+            connection.settings_dict,
+            NAME=os.path.join(directory.name, "pooled.sqlite3"),
+            POOL={"MAX_SIZE": 1},
+        )
+
+    @print_test_data
+    def test_threads_share_pooled_connections(self):
+        """
+        Test two wrappers of the pooled SQLite backend, like two request
+        threads, reuse one connection.
+        """
+        first = DatabaseWrapper(self.settings_dict, alias="pooled")
+        second = DatabaseWrapper(self.settings_dict, alias="pooled")
+        with first.cursor() as cursor:
+            cursor.execute("CREATE TABLE item (id integer)")
+        raw = first.connection
+        first.close()
+        with second.cursor() as cursor:
+            cursor.execute("SELECT count(*) FROM item")
+        self.assertIs(second.connection, raw)
+        second.close()
+        stats = pool.pool_stats()["pooled"]
+        self.assertEqual((stats["opened"], stats["in_use"], stats["idle"]), (1, 0, 1))
+
+        memory = DatabaseWrapper(dict(self.settings_dict, NAME=":memory:"), alias="memory")
+        memory.ensure_connection()
+        self.assertNotIn("memory", pool.pool_stats())
+        memory.connection.close()
+
+    @print_test_data
+    def test_pool_stats_are_staff_only(self):
+        """
+        Test the pool statistics are served to staff users only.
+        """
+        DatabaseWrapper(self.settings_dict, alias="pooled").ensure_connection()
+        url = reverse("db_pool_stats")
+        self.client.force_login(User.objects.create(username="manager"))
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_403_FORBIDDEN)
+        self.client.force_login(User.objects.create(username="staff", is_staff=True))
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()["pooled"]["in_use"], 1)
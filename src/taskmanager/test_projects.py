@@ -0,0 +1,112 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from taskmanager import membership
+from taskmanager.models import Task, User
+from taskmanager.test_views import print_test_data
+
+
+class UserProjectsTests(APITestCase):
+    """
+    Test cases about the list of the projects of a user.
+    """
+
+    def setUp(self):
+        membership.index.clear()
+        self.manager = User.objects.create(username="manager", user_role=User.MANAGER)
+        self.other_manager = User.objects.create(username="other", user_role=User.MANAGER)
+        self.developer = User.objects.create(username="developer", user_role=User.DEVELOPER)
+        self.managed = self.manager.manager_projects.create(name="managed")
+        self.joined = self.other_manager.manager_projects.create(name="joined")
+        self.other_manager.manager_projects.create(name="stranger")
+        self.empty = self.manager.manager_projects.create(name="empty")
+        self.managed.developers.add(self.developer)
+        self.joined.developers.add(self.developer, self.manager)
+
+        for project, is_done, assignees in (
+            (self.managed, False, [self.developer]),
+            (self.managed, False, []),
+            (self.managed, True, [self.developer]),
+            (self.joined, False, [self.manager]),
+            (self.joined, True, [self.manager]),
+        ):
+            task = Task.objects.create(project=project, creator=project.manager, is_done=is_done)
+            task.assignee.add(*assignees)
+        self.url = reverse("get_user_projects")
+
+    @print_test_data
+    def test_list_managed_and_joined_projects_with_counts(self):
+        """
+        Test the projects of the user come with their task counts and the
+        user's own open tasks, read in one query.
+        """
+        self.client.force_login(self.manager)
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            len([query for query in captured if "taskmanager_project" in query["sql"]]), 1
+        )
+        self.assertEqual(
+            response.json(),
+            [
+                {
+                    "id": self.managed.pk,
+                    "name": "managed",
+                    "manager": self.manager.pk,
+                    "manager_name": "manager",
+                    "role": User.MANAGER,
+                    "open": 2,
+                    "done": 1,
+                    "my_open": 0,
+                    "total": 3,
+                },
+                {
+                    "id": self.joined.pk,
+                    "name": "joined",
+                    "manager": self.other_manager.pk,
+                    "manager_name": "other",
+                    "role": User.DEVELOPER,
+                    "open": 1,
+                    "done": 1,
+                    "my_open": 1,
+                    "total": 2,
+                },
+                {
+                    "id": self.empty.pk,
+                    "name": "empty",
+                    "manager": self.manager.pk,
+                    "manager_name": "manager",
+                    "role": User.MANAGER,
+                    "open": 0,
+                    "done": 0,
+                    "my_open": 0,
+                    "total": 0,
+                },
+            ],
+        )
+
+        self.client.force_login(self.developer)
+        rows = self.client.get(self.url).json()
+        self.assertEqual(
+            [(row["name"], row["my_open"]) for row in rows], [("managed", 1), ("joined", 0)]
+        )
+
+    @print_test_data
+    def test_projects_are_paginated(self):
+        """
+        Test the projects are returned in pages linked by the `Link` header,
+        and anonymous users are refused.
+        """
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_401_UNAUTHORIZED)
+
+        self.client.force_login(self.manager)
+        response = self.client.get(self.url, {"page_size": 2})
+        self.assertEqual([row["id"] for row in response.json()], [self.managed.pk, self.joined.pk])
+        next_url = response["Link"].split(";")[0].strip("<>")
+        response = self.client.get(next_url)
+        self.assertEqual([row["id"] for row in response.json()], [self.empty.pk])
+        self.assertNotIn("Link", response)
@@ -0,0 +1,275 @@
+import asyncio
+import json
+from unittest import mock, skipIf
+
+from asgiref.sync import async_to_sync, sync_to_async
+from asgiref.testing import ApplicationCommunicator
+from django.core.exceptions import ImproperlyConfigured
+from django.core.signals import request_finished, request_started
+from django.db import close_old_connections
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from django.test import SimpleTestCase
+from rest_framework.test import APITestCase
+
+from freshteam.asgi import application
+from taskmanager import membership, tokens
+from taskmanager.events import Broker, MemoryBackend, RedisBackend, broker
+from taskmanager.models import Project, User
+from taskmanager.test_views import print_test_data
+from taskmanager.utils import JSONResponse
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+
+class TaskEventsTests(APITestCase):
+    """
+    Test cases about the task events pushed by the ASGI application, with
+    the in-memory backend.
+    """
+
+    def setUp(self):
+        membership.index.clear()
+        # Like the test client, keep the connection of the test transaction.
+        for signal in (request_started, request_finished):
+            signal.disconnect(close_old_connections)
+            self.addCleanup(signal.connect, close_old_connections)
+
+        self.manager = User.objects.create(username="manager", user_role=User.MANAGER)
+        self.developer = User.objects.create(username="developer", user_role=User.DEVELOPER)
+        self.stranger = User.objects.create(username="stranger", user_role=User.MANAGER)
+        self.project = self.manager.manager_projects.create(name="proj")
+        self.project.developers.add(self.developer)
+        self.url = reverse("project_task_events", kwargs={"project_id": self.project.pk})
+        self.client.force_login(self.manager)
+
+    def scope(self, user=None, kind="http", url=None):
+        headers = [(b"host", b"testserver")]
+        if user is not None:
+            access = tokens.issue_tokens(user)["access"]
+            headers.append((b"authorization", f"Bearer {access}".encode()))
+        url = url or self.url
+        return {
+            "type": kind,
+            "method": "GET",
+            "scheme": "http" if kind == "http" else "ws",
+            "path": url,
+            "raw_path": url.encode(),
+            "root_path": "",
+            "query_string": b"",
+            "headers": headers,
+            "client": ("127.0.0.1", 50000),
+            "server": ("testserver", 80),
+        }
+
+    def create_task(self, title):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                reverse("create_task", kwargs={"project_id": self.project.pk}),
+                json.dumps({"title": title, "assignee": []}),
+                content_type="application/json",
+            )
+        return response.json()["id"]
+
+    def reassign(self, task_id):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.project.tasks.get(pk=task_id).assignee.add(self.developer)
+
+    @print_test_data
+    def test_server_sent_events(self):
+        """
+        Test a developer of the project receives the events of the tasks
+        created through the API, until they disconnect.
+        """
+
+        async def scenario():
+            stream = ApplicationCommunicator(application, self.scope(self.developer))
+            await stream.send_input({"type": "http.request", "body": b""})
+            start = await stream.receive_output(5)
+            self.assertEqual(start["status"], status.HTTP_200_OK)
+            self.assertIn((b"content-type", b"text/event-stream"), start["headers"])
+            self.assertEqual(broker.subscriber_count(self.project.pk), 1)
+
+            task_id = await sync_to_async(self.create_task)("task")
+            chunk = (await stream.receive_output(5))["body"].decode()
+            lines = dict(line.split(": ", 1) for line in chunk.strip().split("\n"))
+            event = json.loads(lines["data"])
+            self.assertEqual(lines["event"], "task")
+            self.assertEqual(int(lines["id"]), event["seq"])
+            self.assertEqual(
+                (event["project"], event["op"], event["tasks"]), (self.project.pk, "created", [task_id])
+            )
+
+            await stream.send_input({"type": "http.disconnect"})
+            self.assertEqual((await stream.receive_output(5))["body"], b"")
+            await stream.wait(5)
+            self.assertEqual(broker.subscriber_count(self.project.pk), 0)
+
+        async_to_sync(scenario)()
+
+    @print_test_data
+    def test_websocket_events(self):
+        """
+        Test WebSocket clients receive the reassignments, and strangers are
+        refused.
+        """
+        task_id = self.create_task("task")
+
+        async def scenario():
+            socket = ApplicationCommunicator(application, self.scope(self.manager, "websocket"))
+            await socket.send_input({"type": "websocket.connect"})
+            self.assertEqual((await socket.receive_output(5))["type"], "websocket.accept")
+            await sync_to_async(self.reassign)(task_id)
+            event = json.loads((await socket.receive_output(5))["text"])
+            self.assertEqual((event["op"], event["tasks"]), ("reassigned", [task_id]))
+            await socket.send_input({"type": "websocket.disconnect", "code": 1000})
+            await socket.wait(5)
+            self.assertEqual(broker.subscriber_count(self.project.pk), 0)
+
+            socket = ApplicationCommunicator(application, self.scope(self.stranger, "websocket"))
+            await socket.send_input({"type": "websocket.connect"})
+            self.assertEqual((await socket.receive_output(5))["type"], "websocket.close")
+
+        async_to_sync(scenario)()
+
+    @print_test_data
+    def test_prevent_events_by_stranger_and_anonymous(self):
+        """
+        Test the event stream applies the permission rule of the task views.
+        """
+
+        async def response(scope):
+            stream = ApplicationCommunicator(application, scope)
+            await stream.send_input({"type": "http.request", "body": b""})
+            start = await stream.receive_output(5)
+            body = json.loads((await stream.receive_output(5))["body"])
+            return start["status"], dict(start["headers"]), body
+
+        code, headers, body = async_to_sync(response)(self.scope(self.stranger))
+        self.assertEqual((code, body), (status.HTTP_401_UNAUTHORIZED, JSONResponse.PERMISSION_DENIED))
+        code, headers, body = async_to_sync(response)(self.scope())
+        self.assertEqual(code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(headers[b"www-authenticate"], b"Bearer")
+        url = reverse("project_task_events", kwargs={"project_id": 0})
+        code, headers, body = async_to_sync(response)(self.scope(self.manager, url=url))
+        self.assertEqual(code, status.HTTP_404_NOT_FOUND)
+
+        # Only served by the ASGI application.
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_501_NOT_IMPLEMENTED)
+
+    @print_test_data
+    def test_slow_consumer_is_dropped(self):
+        """
+        Test a subscription more events behind than its queue size is
+        dropped instead of buffering without bound.
+        """
+
+        async def scenario():
+            slow = broker.subscribe(self.project.pk, maxsize=2)
+            fast = broker.subscribe(self.project.pk, maxsize=2)
+            for seq in range(3):
+                broker.deliver(self.project.pk, {"seq": seq})
+                await asyncio.sleep(0)
+                if seq < 2:
+                    self.assertEqual((await fast.get())["seq"], seq)
+            await asyncio.sleep(0)
+            self.assertTrue(slow.dropped)
+            self.assertIsNone(await slow.get())
+            self.assertFalse(fast.dropped)
+            self.assertEqual(broker.subscriber_count(self.project.pk), 1)
+            fast.close()
+
+        async_to_sync(scenario)()
+
+    @print_test_data
+    def test_streams_end_when_the_access_is_gone(self):
+        """
+        Test a client removed from the project is disconnected at once, and
+        one losing its access otherwise at the next periodic check.
+        """
+
+        async def scenario():
+            stream = ApplicationCommunicator(application, self.scope(self.developer))
+            await stream.send_input({"type": "http.request", "body": b""})
+            self.assertEqual((await stream.receive_output(5))["status"], status.HTTP_200_OK)
+            socket = ApplicationCommunicator(application, self.scope(self.developer, "websocket"))
+            await socket.send_input({"type": "websocket.connect"})
+            self.assertEqual((await socket.receive_output(5))["type"], "websocket.accept")
+            manager = ApplicationCommunicator(application, self.scope(self.manager, "websocket"))
+            await manager.send_input({"type": "websocket.connect"})
+            self.assertEqual((await manager.receive_output(5))["type"], "websocket.accept")
+
+            await sync_to_async(self.remove_developer)()
+            self.assertEqual((await stream.receive_output(5))["body"], b"")
+            await stream.wait(5)
+            self.assertEqual(await socket.receive_output(5), {"type": "websocket.close", "code": 1008})
+            await socket.wait(5)
+            # The manager stays connected, without seeing the access change.
+            self.assertTrue(await manager.receive_nothing(0.1))
+            self.assertEqual(broker.subscriber_count(self.project.pk), 1)
+            await manager.send_input({"type": "websocket.disconnect", "code": 1000})
+            await manager.wait(5)
+
+            with self.settings(TASK_EVENTS_ACCESS_CHECK=0.05):
+                manager = ApplicationCommunicator(
+                    application, self.scope(self.manager, "websocket")
+                )
+                await manager.send_input({"type": "websocket.connect"})
+                self.assertEqual((await manager.receive_output(5))["type"], "websocket.accept")
+                await sync_to_async(Project.objects.filter(pk=self.project.pk).update)(
+                    deleted_at=timezone.now()
+                )
+                self.assertEqual(
+                    await manager.receive_output(5), {"type": "websocket.close", "code": 1008}
+                )
+                await manager.wait(5)
+            self.assertEqual(broker.subscriber_count(self.project.pk), 0)
+
+        async_to_sync(scenario)()
+
+    def remove_developer(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.project.developers.remove(self.developer)
+
+
+class EventsBackendTests(SimpleTestCase):
+    """
+    Test cases about the selection of the task events backend.
+    """
+
+    @print_test_data
+    def test_memory_backend_by_default(self):
+        """
+        Test the task events stay in the process by default.
+        """
+        with self.settings(TASK_EVENTS_BACKEND="taskmanager.events.MemoryBackend"):
+            self.assertIsInstance(Broker().backend, MemoryBackend)
+
+    @skipIf(redis is None, "redis is not installed.")
+    @print_test_data
+    def test_redis_backend(self):
+        """
+        Test `TASK_EVENTS_BACKEND` selects the redis backend.
+        """
+        with self.settings(
+            TASK_EVENTS_BACKEND="taskmanager.events.RedisBackend",
+            TASK_EVENTS_REDIS_URL="redis://localhost:6379/0",
+        ):
+            backend = Broker().backend
+        self.assertIsInstance(backend, RedisBackend)
+        self.assertEqual(backend.channel, "taskmanager:task-events")
+
+    @print_test_data
+    def test_redis_backend_without_redis(self):
+        """
+        Test the redis backend tells how to install redis when it is missing.
+        """
+        with self.settings(TASK_EVENTS_BACKEND="taskmanager.events.RedisBackend"):
+            with mock.patch.dict("sys.modules", {"redis": None}):
+                with self.assertRaisesMessage(ImproperlyConfigured, "pip install redis"):
+                    Broker().backend
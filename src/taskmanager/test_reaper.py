@@ -0,0 +1,186 @@
+import io
+
+from django.contrib.auth.models import Permission
+from django.core.management import call_command
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from taskmanager import membership, reaper, stats
+from taskmanager.models import (
+    AssigneeTaskStats,
+    Project,
+    ProjectTaskStats,
+    Task,
+    TaskTombstone,
+    User,
+)
+from taskmanager.test_views import print_test_data
+
+
+class ProjectReaperTests(APITestCase):
+    """
+    Test cases about soft deleting projects and reaping them in batches.
+    """
+
+    def setUp(self):
+        membership.index.clear()
+        self.manager = User.objects.create(username="manager", user_role=User.MANAGER)
+        self.developer = User.objects.create(username="developer", user_role=User.DEVELOPER)
+        self.project = self.manager.manager_projects.create(name="doomed")
+        self.other = self.manager.manager_projects.create(name="kept")
+        for project in (self.project, self.other):
+            project.developers.add(self.developer)
+            for i in range(5):
+                task = Task.objects.create(project=project, creator=self.manager, is_done=i % 2)
+                task.assignee.add(self.developer)
+
+    def assert_reaped(self):
+        self.assertFalse(Project.objects.filter(pk=self.project.pk).exists())
+        self.assertFalse(Task.objects.filter(project_id=self.project.pk).exists())
+        self.assertFalse(
+            Task.assignee.through.objects.filter(task__project_id=self.project.pk).exists()
+        )
+        self.assertFalse(
+            Project.developers.through.objects.filter(project_id=self.project.pk).exists()
+        )
+        self.assertFalse(ProjectTaskStats.objects.filter(project_id=self.project.pk).exists())
+        self.assertFalse(AssigneeTaskStats.objects.filter(project_id=self.project.pk).exists())
+        self.assertFalse(TaskTombstone.objects.filter(project_id=self.project.pk).exists())
+        self.assertEqual(Task.objects.filter(project=self.other).count(), 5)
+        self.assertEqual(stats.verify(), {})
+
+    @print_test_data
+    def test_deleted_project_is_hidden_at_once(self):
+        """
+        Test a soft deleted project is gone from the task views and the
+        user's projects, while its tasks are still stored.
+        """
+        self.client.force_login(self.developer)
+        url = reverse("get_project_tasks", kwargs={"project_id": self.project.pk})
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_200_OK)
+
+        self.project.soft_delete()
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_404_NOT_FOUND)
+        for name in ("create_task", "project_task_stats", "export_project_tasks"):
+            response = self.client.generic(
+                "POST" if name == "create_task" else "GET",
+                reverse(name, kwargs={"project_id": self.project.pk}),
+                '{"title": "late"}',
+                content_type="application/json",
+            )
+            self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND, name)
+        self.assertFalse(membership.index.is_member(self.developer.pk, self.project.pk))
+        projects = self.client.get(reverse("get_user_projects")).json()
+        self.assertEqual([row["id"] for row in projects], [self.other.pk])
+        self.assertEqual(Task.objects.filter(project=self.project).count(), 5)
+
+        # Nor through the url of another project.
+        task = Task.objects.filter(project=self.project, is_done=False).first()
+        for project in (self.project, self.other):
+            response = self.client.patch(
+                reverse("update_task", kwargs={"project_id": project.pk, "pk": task.pk}),
+                '{"is_done": true}',
+                content_type="application/json",
+            )
+            self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        task.refresh_from_db()
+        self.assertFalse(task.is_done)
+
+    @print_test_data
+    def test_reaper_deletes_in_batches(self):
+        """
+        Test the reaper deletes the tasks of deleted projects in batches,
+        keeping the task counters right, then the project, and leaves the
+        other projects alone.
+        """
+        self.project.soft_delete()
+        progress = []
+
+        def on_batch(project, deleted):
+            progress.append(deleted)
+            self.assertEqual(stats.verify(), {})
+
+        self.assertEqual(reaper.reap(batch_size=2, on_batch=on_batch), 1)
+        self.assertEqual(progress, [2, 4, 5])
+        self.assert_reaped()
+        self.assertEqual(reaper.reap(), 0)
+
+    @print_test_data
+    def test_admin_delete_defers_to_the_reaper(self):
+        """
+        Test deleting a project from the admin only soft deletes it, and the
+        reaper command reports and deletes it.
+        """
+        admin = User.objects.create(username="admin", is_staff=True, is_superuser=True)
+        self.client.force_login(admin)
+        changelist = reverse("admin:taskmanager_project_changelist")
+        response = self.client.post(
+            changelist, {"action": "delete_selected", "_selected_action": [self.project.pk]}
+        )
+        self.assertContains(response, str(self.project))
+        response = self.client.post(
+            changelist,
+            {"action": "delete_selected", "_selected_action": [self.project.pk], "post": "yes"},
+        )
+        self.assertEqual(response.status_code, status.HTTP_302_FOUND)
+        self.project.refresh_from_db()
+        self.assertIsNotNone(self.project.deleted_at)
+        self.assertEqual(Task.objects.filter(project=self.project).count(), 5)
+
+        response = self.client.post(
+            reverse("admin:taskmanager_project_delete", args=[self.other.pk]), {"post": "yes"}
+        )
+        self.assertEqual(response.status_code, status.HTTP_302_FOUND)
+        self.assertTrue(Project.objects.filter(pk=self.other.pk, deleted_at__isnull=False).exists())
+        Project.objects.filter(pk=self.other.pk).update(deleted_at=None)
+
+        output = io.StringIO()
+        call_command("reap_projects", "--status", stdout=output)
+        self.assertIn(f"project {self.project.pk} 'doomed' in default", output.getvalue())
+        self.assertIn("5 tasks left", output.getvalue())
+        call_command("reap_projects", "--pause", "0", stdout=output)
+        self.assertIn("1 deleted projects reaped.", output.getvalue())
+        self.assert_reaped()
+
+    @print_test_data
+    def test_admin_delete_needs_the_task_delete_permission(self):
+        """
+        Test a staff user allowed to delete projects but not tasks can't
+        delete a project with tasks from the admin.
+        """
+        staff = User.objects.create(username="staff", is_staff=True)
+        staff.user_permissions.set(
+            Permission.objects.filter(
+                content_type__app_label="taskmanager",
+                codename__in=["view_project", "delete_project"],
+            )
+        )
+        self.client.force_login(staff)
+        changelist = reverse("admin:taskmanager_project_changelist")
+        response = self.client.post(
+            changelist, {"action": "delete_selected", "_selected_action": [self.project.pk]}
+        )
+        self.assertContains(response, "permission to delete the following types of objects")
+        self.assertContains(response, "<li>task</li>", html=True)
+        response = self.client.post(
+            changelist,
+            {"action": "delete_selected", "_selected_action": [self.project.pk], "post": "yes"},
+        )
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        response = self.client.post(
+            reverse("admin:taskmanager_project_delete", args=[self.other.pk]), {"post": "yes"}
+        )
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertFalse(Project.objects.filter(deleted_at__isnull=False).exists())
+
+        staff.user_permissions.add(Permission.objects.get(codename="delete_task"))
+        staff = User.objects.get(pk=staff.pk)
+        self.client.force_login(staff)
+        response = self.client.post(
+            changelist,
+            {"action": "delete_selected", "_selected_action": [self.project.pk], "post": "yes"},
+        )
+        self.assertEqual(response.status_code, status.HTTP_302_FOUND)
+        self.project.refresh_from_db()
+        self.assertIsNotNone(self.project.deleted_at)
@@ -0,0 +1,117 @@
+import datetime
+import decimal
+import io
+import json
+import uuid
+from unittest import mock
+
+from django.urls import reverse
+from django.utils.translation import gettext_lazy
+from rest_framework import status
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APITestCase
+
+from taskmanager import membership, renderers
+from taskmanager.models import User
+from taskmanager.renderers import FastJSONParser, FastJSONRenderer
+from taskmanager.test_views import print_test_data
+from taskmanager.utils import JSONResponse
+
+
+PAYLOAD = {
+    "id": 1,
+    "title": "Tâche ✓",
+    "created": datetime.datetime(2026, 10, 18, 9, 30, 1, 123456, tzinfo=datetime.timezone.utc),
+    "naive": datetime.datetime(2026, 10, 18, 9, 30),
+    "day": datetime.date(2026, 10, 18),
+    "time": datetime.time(9, 30, 1, 500),
+    "duration": datetime.timedelta(hours=1),
+    "cost": decimal.Decimal("1.50"),
+    "uid": uuid.UUID("12345678-1234-5678-1234-567812345678"),
+    "lazy": gettext_lazy("Not found."),
+    "assignee": [1, 2, None],
+    "is_done": False,
+    10: "integer key",
+    "big": 2**70,
+}
+
+
+class JSONRendererTests(APITestCase):
+    """
+    Test cases about the orjson backed renderer and parser.
+    """
+
+    def setUp(self):
+        membership.index.clear()
+
+    @print_test_data
+    def test_same_output_as_drf(self):
+        """
+        Test the renderer writes the bytes of the DRF renderer, with and
+        without orjson.
+        """
+        expected = JSONRenderer().render(PAYLOAD)
+        self.assertEqual(FastJSONRenderer().render(PAYLOAD), expected)
+        with mock.patch.object(renderers, "orjson", None):
+            self.assertEqual(FastJSONRenderer().render(PAYLOAD), expected)
+
+        indented = "application/json; indent=2"
+        self.assertEqual(
+            FastJSONRenderer().render(PAYLOAD, indented), JSONRenderer().render(PAYLOAD, indented)
+        )
+        self.assertEqual(FastJSONRenderer().render(None), b"")
+
+    @print_test_data
+    def test_line_separators_and_floats(self):
+        """
+        Test U+2028 and U+2029 are escaped like the DRF renderer does, and
+        floats keep their value.
+        """
+        payload = {"title": "line\u2028paragraph\u2029end", "tags": ["\u2028"]}
+        self.assertEqual(FastJSONRenderer().render(payload), JSONRenderer().render(payload))
+        self.assertIn(b"\\u2028", FastJSONRenderer().render({"title": "a\u2028b"}))
+
+        payload = {"score": 1e16, "ratio": 1e-05, "half": 0.5, "rows": [{"x": 2.5e-7}]}
+        self.assertEqual(
+            json.loads(FastJSONRenderer().render(payload)),
+            json.loads(JSONRenderer().render(payload)),
+        )
+
+    @print_test_data
+    def test_prebuilt_payloads_are_objects(self):
+        """
+        Test the prebuilt payloads are written as JSON objects, not as JSON
+        strings holding an object.
+        """
+        rendered = FastJSONRenderer().render(JSONResponse.PERMISSION_DENIED)
+        self.assertEqual(rendered, b'{"message":"You dont have permission."}')
+        self.assertEqual(rendered, JSONRenderer().render(JSONResponse.PERMISSION_DENIED))
+
+        manager = User.objects.create(username="manager", user_role=User.MANAGER)
+        other = User.objects.create(username="other", user_role=User.MANAGER)
+        project = other.manager_projects.create(name="proj")
+        self.client.force_login(manager)
+        response = self.client.get(reverse("get_project_tasks", kwargs={"project_id": project.pk}))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(response.json(), {"message": "You dont have permission."})
+
+    @print_test_data
+    def test_parser(self):
+        """
+        Test the parser reads what the DRF parser reads and rejects what it
+        rejects.
+        """
+        body = '{"title": "Tâche", "assignee": [1, 2], "is_done": true}'.encode()
+        self.assertEqual(
+            FastJSONParser().parse(io.BytesIO(body)), JSONParser().parse(io.BytesIO(body))
+        )
+        latin = '{"title": "Tâche"}'.encode("latin-1")
+        self.assertEqual(
+            FastJSONParser().parse(io.BytesIO(latin), parser_context={"encoding": "latin-1"}),
+            {"title": "Tâche"},
+        )
+        for invalid in (b'{"title": ', b'{"cost": NaN}'):
+            with self.assertRaises(ParseError):
+                FastJSONParser().parse(io.BytesIO(invalid))
@@ -0,0 +1,86 @@
+import json
+
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from taskmanager import membership
+from taskmanager.models import Project, Task, User
+from taskmanager.test_views import print_test_data
+
+
+@override_settings(READ_REPLICAS=["replica"], REPLICA_PIN_SECONDS=5)
+class ReplicaRoutingTests(APITestCase):
+    """
+    Test cases about sending reads to a replica, the "replica" database of
+    `freshteam.test_settings`. Rows only written to the primary show what a
+    lagging replica would return.
+    """
+
+    databases = {"default", "replica"}
+
+    def setUp(self):
+        membership.index.clear()
+        self.manager = User.objects.create(username="manager", user_role=User.MANAGER)
+        self.project = self.manager.manager_projects.create(name="proj")
+        task = self.project.tasks.create(title="replicated", creator=self.manager)
+        # The replica has caught up with everything so far.
+        User.objects.using("replica").create(
+            pk=self.manager.pk, username="manager", user_role=User.MANAGER
+        )
+        Project.objects.using("replica").create(
+            pk=self.project.pk, name="proj", manager_id=self.manager.pk
+        )
+        Task.objects.using("replica").create(
+            pk=task.pk, title="replicated", project_id=self.project.pk, creator_id=self.manager.pk
+        )
+        self.project.tasks.create(title="not replicated yet", creator=self.manager)
+        self.url = reverse("get_project_tasks", kwargs={"project_id": self.project.pk})
+        self.client.force_login(self.manager)
+
+    def titles(self, response):
+        return [task["title"] for task in response.json()]
+
+    @print_test_data
+    def test_safe_reads_go_to_replica(self):
+        """
+        Test a task list is read from the replica, while the session, the user
+        and the membership check are read from the primary.
+        """
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.titles(response), ["replicated"])
+
+    @print_test_data
+    def test_writer_is_pinned_to_primary(self):
+        """
+        Test a client reads its own writes from the primary after writing.
+        """
+        response = self.client.post(
+            reverse("create_task", kwargs={"project_id": self.project.pk}),
+            json.dumps({"title": "new"}),
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertIn("primary_pin", response.cookies)
+
+        response = self.client.get(self.url)
+        self.assertEqual(self.titles(response), ["replicated", "not replicated yet", "new"])
+
+    @print_test_data
+    def test_writer_is_pinned_by_header(self):
+        """
+        Test the pin can be sent back in a header instead of a cookie.
+        """
+        response = self.client.post(
+            reverse("create_task", kwargs={"project_id": self.project.pk}),
+            json.dumps({"title": "new"}),
+            content_type="application/json",
+        )
+        pin = response["X-Primary-Pin"]
+        del self.client.cookies["primary_pin"]
+
+        self.assertEqual(self.titles(self.client.get(self.url)), ["replicated"])
+        response = self.client.get(self.url, HTTP_X_PRIMARY_PIN=pin)
+        self.assertEqual(len(response.json()), 3)
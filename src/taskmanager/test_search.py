@@ -0,0 +1,84 @@
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from taskmanager import membership
+from taskmanager.models import User
+from taskmanager.test_views import print_test_data
+
+
+class TaskSearchTests(APITestCase):
+    """
+    Test cases about the full-text search of project tasks.
+    """
+
+    def setUp(self):
+        membership.index.clear()
+        self.manager = User.objects.create(username="manager", user_role=User.MANAGER)
+        self.stranger = User.objects.create(username="stranger", user_role=User.MANAGER)
+        self.project = self.manager.manager_projects.create(name="proj")
+        self.other_project = self.manager.manager_projects.create(name="other")
+
+        self.in_description = self.project.tasks.create(
+            title="Fix the build", description="the login page is broken", creator=self.manager
+        )
+        self.in_title = self.project.tasks.create(
+            title="Login page redesign", creator=self.manager
+        )
+        self.project.tasks.create(title="Unrelated", creator=self.manager)
+        self.other_project.tasks.create(title="Login elsewhere", creator=self.manager)
+
+        self.client.force_login(self.manager)
+        self.url = reverse("search_project_tasks", kwargs={"project_id": self.project.pk})
+
+    @print_test_data
+    def test_search_project_tasks_ranked(self):
+        """
+        Test searching returns the project matches, title matches first.
+        """
+        response = self.client.get(self.url, {"q": "login page"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [task["id"] for task in response.data],
+            [self.in_title.id, self.in_description.id],
+        )
+        self.assertEqual(response.data[0]["title"], "Login page redesign")
+
+    @print_test_data
+    def test_search_follows_task_changes(self):
+        """
+        Test the search index follows task updates and deletes.
+        """
+        self.in_title.title = "Logout button"
+        self.in_title.save()
+        self.in_description.delete()
+
+        response = self.client.get(self.url, {"q": "login"})
+        self.assertEqual(response.data, [])
+        response = self.client.get(self.url, {"q": "logout"})
+        self.assertEqual([task["id"] for task in response.data], [self.in_title.id])
+
+    @print_test_data
+    def test_search_project_tasks_in_pages(self):
+        """
+        Test search results are paginated with a next page link.
+        """
+        response = self.client.get(self.url, {"q": "login", "page_size": 1})
+        self.assertEqual([task["id"] for task in response.data], [self.in_title.id])
+        self.assertIn("page=2", response["Link"])
+
+        response = self.client.get(self.url, {"q": "login", "page_size": 1, "page": 2})
+        self.assertEqual([task["id"] for task in response.data], [self.in_description.id])
+        self.assertFalse(response.has_header("Link"))
+
+    @print_test_data
+    def test_prevent_search_by_stranger_and_bad_query(self):
+        """
+        Test prevent searching by a stranger manager, and ignoring FTS syntax.
+        """
+        response = self.client.get(self.url, {"q": 'login" OR NEAR(*'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        self.client.force_login(self.stranger)
+        response = self.client.get(self.url, {"q": "login"})
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
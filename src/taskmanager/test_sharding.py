@@ -0,0 +1,220 @@
+import io
+import json
+import os
+from unittest import mock
+
+from django.core.management import CommandError, call_command
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from taskmanager import changes, membership, sharding, stats
+from taskmanager.models import Project, ProjectShard, ProjectTaskStats, Task, TaskTombstone, User
+from taskmanager.test_views import print_test_data
+
+
+# The default database and two more of `freshteam.test_settings`.
+SHARDS = ["default", "shard_a", "shard_b"]
+
+
+@override_settings(PROJECT_SHARDS=SHARDS)
+class ShardingTests(APITestCase):
+    """
+    Test cases about spreading the projects over several databases.
+    """
+
+    databases = set(SHARDS)
+
+    def setUp(self):
+        membership.index.clear()
+        self.manager = User.objects.create(username="manager", user_role=User.MANAGER)
+        self.developer = User.objects.create(username="developer", user_role=User.DEVELOPER)
+        self.projects = [self.manager.manager_projects.create(name=f"proj-{i}") for i in range(3)]
+        for project in self.projects:
+            project.developers.add(self.developer)
+        self.client.force_login(self.manager)
+
+    def create_task(self, project, title):
+        response = self.client.post(
+            reverse("create_task", kwargs={"project_id": project.pk}),
+            json.dumps({"title": title, "assignee": [self.developer.pk]}),
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        return response.json()["id"]
+
+    def rows_in(self, database, project_id):
+        return (
+            Project.objects.using(database).filter(pk=project_id).count(),
+            Project.developers.through.objects.using(database).filter(project_id=project_id).count(),
+            Task.objects.using(database).filter(project_id=project_id).count(),
+            Task.assignee.through.objects.using(database)
+            .filter(task__project_id=project_id)
+            .count(),
+            ProjectTaskStats.objects.using(database).filter(project_id=project_id).count(),
+        )
+
+    @print_test_data
+    def test_projects_and_tasks_live_in_their_shard(self):
+        """
+        Test every project is written to the shard of the shard map with its
+        developers and tasks, ids stay unique across shards, and the task
+        views read the project's shard.
+        """
+        databases = [sharding.database_for(project.pk) for project in self.projects]
+        self.assertEqual(sorted(databases), SHARDS)
+        self.assertEqual(len({project.pk for project in self.projects}), 3)
+
+        task_ids = [self.create_task(project, f"task {i}") for i, project in enumerate(self.projects)]
+        self.assertEqual(len(set(task_ids)), 3)
+        for project, database in zip(self.projects, databases):
+            self.assertEqual(self.rows_in(database, project.pk), (1, 1, 1, 1, 1))
+            for other in set(SHARDS) - {database}:
+                self.assertEqual(self.rows_in(other, project.pk), (0, 0, 0, 0, 0))
+
+        project = self.projects[1]
+        tasks = self.client.get(reverse("get_project_tasks", kwargs={"project_id": project.pk}))
+        self.assertEqual([task["title"] for task in tasks.json()], ["task 1"])
+        assigned = self.client.get(
+            reverse(
+                "get_project_assignee_tasks",
+                kwargs={"project_id": project.pk, "assignee_id": self.developer.pk},
+            )
+        )
+        self.assertEqual(len(assigned.json()), 1)
+        counts = self.client.get(reverse("project_task_stats", kwargs={"project_id": project.pk}))
+        self.assertEqual(counts.json()["open"], 1)
+
+        self.client.force_login(self.developer)
+        response = self.client.get(reverse("get_user_projects"), {"page_size": 2})
+        self.assertEqual(
+            [(row["id"], row["manager_name"], row["my_open"]) for row in response.json()],
+            [(project.pk, "manager", 1) for project in self.projects[:2]],
+        )
+        response = self.client.get(response["Link"].split(";")[0].strip("<>"))
+        self.assertEqual([row["id"] for row in response.json()], [self.projects[2].pk])
+
+    @print_test_data
+    def test_move_project_between_shards(self):
+        """
+        Test moving a project copies all of its rows to the target shard and
+        removes them from the source, without changing its ids, version and
+        ETag, nor leaving tombstones.
+        """
+        project = self.projects[0]
+        source = sharding.database_for(project.pk)
+        target = next(database for database in SHARDS if database != source)
+        task_ids = [self.create_task(project, f"task {i}") for i in range(3)]
+        url = reverse("get_project_tasks", kwargs={"project_id": project.pk})
+        before = self.client.get(url)
+
+        call_command("move_project", project.pk, target, batch_size=2, stdout=open(os.devnull, "w"))
+
+        self.assertEqual(ProjectShard.objects.get(project_id=project.pk).database, target)
+        self.assertEqual(self.rows_in(target, project.pk), (1, 1, 3, 3, 1))
+        self.assertEqual(self.rows_in(source, project.pk), (0, 0, 0, 0, 0))
+        self.assertFalse(TaskTombstone.objects.using(target).filter(project_id=project.pk).exists())
+
+        after = self.client.get(url)
+        self.assertEqual(after["ETag"], before["ETag"])
+        self.assertEqual(after.json(), before.json())
+        response = self.client.patch(
+            reverse("update_task", kwargs={"project_id": project.pk, "pk": task_ids[0]}),
+            json.dumps({"is_done": True}),
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertTrue(Task.objects.using(target).get(pk=task_ids[0]).is_done)
+
+    @print_test_data
+    def test_task_counters_of_every_shard(self):
+        """
+        Test the task counters are checked and rebuilt in every shard, and the
+        command reports them per shard.
+        """
+        for i, project in enumerate(self.projects):
+            self.create_task(project, f"task {i}")
+        self.assertEqual(stats.verify(), {})
+        broken = self.projects[1]
+        database = sharding.database_for(broken.pk)
+        ProjectTaskStats.objects.using(database).filter(project_id=broken.pk).update(open_tasks=5)
+        self.assertEqual(stats.verify(), {(broken.pk, None): ((5, 0), (1, 0))})
+        self.assertEqual(stats.verify(database), {(broken.pk, None): ((5, 0), (1, 0))})
+
+        out, err = io.StringIO(), io.StringIO()
+        with self.assertRaises(CommandError):
+            call_command("task_stats", stdout=out, stderr=err)
+        self.assertIn(f"{database}: project {broken.pk}: open/done 5/0, expected 1/0", err.getvalue())
+        for other in set(SHARDS) - {database}:
+            self.assertIn(f"{other}: task counters are correct.", out.getvalue())
+
+        call_command("task_stats", rebuild=True, database=database, stdout=out)
+        self.assertEqual(stats.verify(), {})
+        self.assertEqual(
+            ProjectTaskStats.objects.using(database).get(project_id=broken.pk).open_tasks, 1
+        )
+
+    @print_test_data
+    def test_write_to_a_moved_project_is_retried(self):
+        """
+        Test a write whose project left its shard while it ran gets a 409 to
+        retry, and leaves nothing behind.
+        """
+        project = self.projects[1]
+        database = sharding.database_for(project.pk)
+        task_id = self.create_task(project, "task")
+        next_seq = changes.next_seq
+
+        def moved_meanwhile(project_id, using=None):
+            # What the move deleted once the write gets the project row.
+            Project.objects.using(using).filter(pk=project_id)._raw_delete(using)
+            return next_seq(project_id, using)
+
+        with mock.patch.object(changes, "next_seq", side_effect=moved_meanwhile):
+            response = self.client.patch(
+                reverse("update_task", kwargs={"project_id": project.pk, "pk": task_id}),
+                json.dumps({"title": "late"}),
+                content_type="application/json",
+            )
+            self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+            self.assertEqual(response.json(), {"detail": "The project was moved, retry the request."})
+            response = self.client.post(
+                reverse("create_task", kwargs={"project_id": project.pk}),
+                json.dumps({"title": "late"}),
+                content_type="application/json",
+            )
+            self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(
+            list(Task.objects.using(database).filter(project_id=project.pk).values_list("title")),
+            [("task",)],
+        )
+        self.assertTrue(Project.objects.using(database).filter(pk=project.pk).exists())
+
+    @print_test_data
+    def test_admin_reaches_every_shard(self):
+        """
+        Test the project admin lists the projects of the selected shard, and
+        opens and deletes a project in its own shard.
+        """
+        admin = User.objects.create(username="admin", is_staff=True, is_superuser=True)
+        self.client.force_login(admin)
+        changelist = reverse("admin:taskmanager_project_changelist")
+        for database in SHARDS:
+            response = self.client.get(changelist, {"shard": database})
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            shown = {project.pk for project in response.context["cl"].result_list}
+            self.assertEqual(
+                shown,
+                {p.pk for p in self.projects if sharding.database_for(p.pk) == database},
+            )
+
+        project = next(p for p in self.projects if sharding.database_for(p.pk) != "default")
+        database = sharding.database_for(project.pk)
+        response = self.client.get(reverse("admin:taskmanager_project_change", args=[project.pk]))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        response = self.client.post(
+            reverse("admin:taskmanager_project_delete", args=[project.pk]), {"post": "yes"}
+        )
+        self.assertEqual(response.status_code, status.HTTP_302_FOUND)
+        self.assertIsNotNone(Project.objects.using(database).get(pk=project.pk).deleted_at)
@@ -0,0 +1,145 @@
+import json
+from io import StringIO
+
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from taskmanager import membership, stats
+from taskmanager.models import ProjectTaskStats, User
+from taskmanager.test_views import print_test_data
+
+
+class TaskStatsTests(APITestCase):
+    """
+    Test cases about the per project and per assignee task counters.
+    """
+
+    def setUp(self):
+        membership.index.clear()
+        self.manager = User.objects.create(username="manager", user_role=User.MANAGER)
+        self.dev_1 = User.objects.create(username="dev-1", user_role=User.DEVELOPER)
+        self.dev_2 = User.objects.create(username="dev-2", user_role=User.DEVELOPER)
+        self.project = self.manager.manager_projects.create(name="proj")
+        self.project.developers.add(self.dev_1, self.dev_2)
+        self.url = reverse("project_task_stats", kwargs={"project_id": self.project.pk})
+        self.client.force_login(self.manager)
+
+    def send(self, method, url, data):
+        return getattr(self.client, method)(url, json.dumps(data), content_type="application/json")
+
+    @print_test_data
+    def test_counters_follow_every_write_path(self):
+        """
+        Test the counters match the tables after creating, updating,
+        reassigning and deleting tasks one by one and in bulk.
+        """
+        response = self.send(
+            "post",
+            reverse("create_task", kwargs={"project_id": self.project.pk}),
+            {"title": "one", "assignee": [self.dev_1.pk, self.dev_2.pk]},
+        )
+        task_id = response.json()["id"]
+        self.send(
+            "put",
+            reverse("update_task", kwargs={"project_id": self.project.pk, "pk": task_id}),
+            {"title": "one", "is_done": True, "assignee": [self.dev_2.pk]},
+        )
+        self.assertEqual(stats.verify(), {})
+
+        bulk_url = reverse("bulk_tasks", kwargs={"project_id": self.project.pk})
+        self.send("post", bulk_url, {"tasks": [{"title": "a", "assignee": [self.dev_1.pk]}] * 3})
+        self.send(
+            "patch",
+            bulk_url,
+            {
+                "filter": {"assignee": self.dev_1.pk},
+                "is_done": True,
+                "assignee": {"add": [self.dev_2.pk]},
+            },
+        )
+        self.assertEqual(stats.verify(), {})
+
+        # Admin and shell paths: model saves, reverse relations and deletes.
+        task = self.project.tasks.get(pk=task_id)
+        task.is_done = False
+        task.save()
+        self.dev_2.task_set.remove(task, *self.project.tasks.exclude(pk=task_id)[:1])
+        self.dev_1.task_set.clear()
+        self.project.tasks.filter(pk=task_id).delete()
+        self.assertEqual(stats.verify(), {})
+
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            response.json(),
+            {
+                "total": 3,
+                "open": 0,
+                "done": 3,
+                "assignees": [{"assignee": self.dev_2.pk, "total": 2, "open": 0, "done": 2}],
+            },
+        )
+
+        self.project.delete()
+        self.assertEqual(stats.verify(), {})
+
+    @print_test_data
+    def test_bulk_update_counts_the_rows_it_reads(self):
+        """
+        Test a bulk update keeps the counters right from the task and
+        assignee rows it changes, without counting the tasks again.
+        """
+        bulk_url = reverse("bulk_tasks", kwargs={"project_id": self.project.pk})
+        self.send(
+            "post",
+            bulk_url,
+            {
+                "tasks": [
+                    {"title": "a", "assignee": [self.dev_1.pk, self.dev_2.pk]},
+                    {"title": "b", "assignee": [self.dev_2.pk], "is_done": True},
+                    {"title": "c"},
+                ]
+            },
+        )
+        updates = [
+            {"filter": {}, "is_done": True, "assignee": {"remove": [self.dev_1.pk]}},
+            {"filter": {}, "is_done": False, "assignee": {"replace": [self.dev_1.pk]}},
+            {"filter": {"is_done": False}, "assignee": {"add": [self.dev_2.pk]}},
+            {"filter": {"assignee": self.dev_2.pk}, "is_done": True},
+        ]
+        for update in updates:
+            with CaptureQueriesContext(connection) as captured:
+                response = self.send("patch", bulk_url, update)
+            self.assertEqual(response.status_code, status.HTTP_200_OK, response.content)
+            self.assertNotIn("COUNT(", " ".join(query["sql"] for query in captured))
+            self.assertEqual(stats.verify(), {})
+
+    @print_test_data
+    def test_stats_endpoint_reads_counters_only(self):
+        """
+        Test the stats endpoint reads the counters and not the tasks.
+        """
+        self.project.tasks.create(title="task", creator=self.manager)
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get(self.url)
+        self.assertNotIn("taskmanager_task", " ".join(query["sql"] for query in captured))
+        self.assertEqual(response.json(), {"total": 1, "open": 1, "done": 0, "assignees": []})
+
+    @print_test_data
+    def test_verify_and_rebuild_command(self):
+        """
+        Test the command reports wrong counters and rebuilds them.
+        """
+        self.project.tasks.create(title="task", creator=self.manager)
+        ProjectTaskStats.objects.filter(project=self.project).update(open_tasks=5)
+
+        with self.assertRaises(CommandError):
+            call_command("task_stats", stdout=StringIO(), stderr=StringIO())
+        call_command("task_stats", rebuild=True, stdout=StringIO())
+        out = StringIO()
+        call_command("task_stats", stdout=out)
+        self.assertIn("Task counters are correct.", out.getvalue())
@@ -0,0 +1,159 @@
+import json
+
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from taskmanager import membership, stats
+from taskmanager.models import Project, Task, User
+from taskmanager.test_views import print_test_data
+
+
+class TaskUpdateTests(APITestCase):
+    """
+    Test cases about partial and conditional task updates.
+    """
+
+    def setUp(self):
+        membership.index.clear()
+        self.manager = User.objects.create(username="manager", user_role=User.MANAGER)
+        self.devs = [
+            User.objects.create(username=f"dev-{i}", user_role=User.DEVELOPER) for i in range(3)
+        ]
+        self.project = self.manager.manager_projects.create(name="proj")
+        self.project.developers.add(*self.devs)
+        self.client.force_login(self.manager)
+        response = self.send(
+            "post",
+            reverse("create_task", kwargs={"project_id": self.project.pk}),
+            {"title": "task", "description": "text", "assignee": [self.devs[0].pk, self.devs[1].pk]},
+        )
+        self.task_id = response.json()["id"]
+        self.etag = response["ETag"]
+        self.url = reverse("update_task", kwargs={"project_id": self.project.pk, "pk": self.task_id})
+
+    def send(self, method, url, data, **headers):
+        return getattr(self.client, method)(
+            url, json.dumps(data), content_type="application/json", **headers
+        )
+
+    @print_test_data
+    def test_patch_changes_only_the_sent_fields(self):
+        """
+        Test PATCH flips `is_done` without resending the other fields, and
+        the new version is returned in the body and the `ETag` header.
+        """
+        response = self.send("patch", self.url, {"is_done": True})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        task = Task.objects.get(pk=self.task_id)
+        self.assertTrue(task.is_done)
+        self.assertEqual((task.title, task.description), ("task", "text"))
+        self.assertEqual(response.json()["assignee"], [self.devs[0].pk, self.devs[1].pk])
+        self.assertEqual(response["ETag"], f'"{task.version}"')
+        self.assertEqual(response.json()["version"], task.version)
+        self.assertNotEqual(response["ETag"], self.etag)
+
+        tasks = self.client.get(reverse("get_project_tasks", kwargs={"project_id": self.project.pk}))
+        self.assertEqual(tasks.json()[0]["version"], task.version)
+
+    @print_test_data
+    def test_if_match_rejects_concurrent_edits(self):
+        """
+        Test two clients editing the same version: the first one wins, the
+        second one gets a 412 and writes nothing.
+        """
+        response = self.send("patch", self.url, {"title": "first"}, HTTP_IF_MATCH=self.etag)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        version = Project.objects.get(pk=self.project.pk).version
+        response = self.send(
+            "put",
+            self.url,
+            {"title": "second", "is_done": True, "assignee": [self.devs[2].pk]},
+            HTTP_IF_MATCH=self.etag,
+        )
+        self.assertEqual(response.status_code, status.HTTP_412_PRECONDITION_FAILED)
+        task = Task.objects.get(pk=self.task_id)
+        self.assertEqual((task.title, task.is_done), ("first", False))
+        self.assertEqual(
+            sorted(task.assignee.values_list("id", flat=True)), [self.devs[0].pk, self.devs[1].pk]
+        )
+        self.assertEqual(Project.objects.get(pk=self.project.pk).version, version)
+
+        for if_match in ('W/"{}"'.format(task.version), '"abc"'):
+            response = self.send("patch", self.url, {"title": "third"}, HTTP_IF_MATCH=if_match)
+            self.assertEqual(response.status_code, status.HTTP_412_PRECONDITION_FAILED)
+        response = self.send("patch", self.url, {"title": "third"}, HTTP_IF_MATCH="*")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        response = self.send(
+            "patch", self.url, {"title": "fourth"}, HTTP_IF_MATCH=f'"1", {response["ETag"]}'
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+    @print_test_data
+    def test_assignee_update_writes_only_the_difference(self):
+        """
+        Test changing the assignees keeps the through rows of the assignees
+        which stay.
+        """
+        Through = Task.assignee.through
+        kept = Through.objects.get(task_id=self.task_id, user=self.devs[1])
+        response = self.send(
+            "patch", self.url, {"assignee": [self.devs[1].pk, self.devs[2].pk]}
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        links = Through.objects.filter(task_id=self.task_id).order_by("id")
+        self.assertEqual(
+            list(links.values_list("user_id", flat=True)), [self.devs[1].pk, self.devs[2].pk]
+        )
+        self.assertEqual(links[0].pk, kept.pk)
+
+    @print_test_data
+    def test_versions_are_per_task(self):
+        """
+        Test writing a task bumps its own version only, so the ETag of the
+        other tasks of the project stays valid.
+        """
+        response = self.send(
+            "post",
+            reverse("create_task", kwargs={"project_id": self.project.pk}),
+            {"title": "other"},
+        )
+        other_url = reverse(
+            "update_task", kwargs={"project_id": self.project.pk, "pk": response.json()["id"]}
+        )
+        other_etag = response["ETag"]
+
+        response = self.send("patch", self.url, {"is_done": True}, HTTP_IF_MATCH=self.etag)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.json()["version"], int(self.etag.strip('"')) + 1)
+        response = self.send("patch", other_url, {"is_done": True}, HTTP_IF_MATCH=other_etag)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.json()["version"], int(other_etag.strip('"')) + 1)
+
+    @print_test_data
+    def test_each_write_bumps_the_version_once(self):
+        """
+        Test a create and an update setting the assignees bump the version
+        once each and keep the counters right, and a model save bumps it too.
+        """
+        self.assertEqual(self.etag, '"1"')
+        response = self.send(
+            "put",
+            self.url,
+            {"title": "task", "is_done": True, "assignee": [self.devs[2].pk]},
+            HTTP_IF_MATCH=self.etag,
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual((response["ETag"], response.json()["version"]), ('"2"', 2))
+        response = self.send("patch", self.url, {"assignee": [self.devs[0].pk]})
+        self.assertEqual(response["ETag"], '"3"')
+        self.assertEqual(stats.verify(), {})
+
+        task = Task.objects.get(pk=self.task_id)
+        self.assertEqual(task.version, 3)
+        task.is_done = False
+        task.save()
+        self.assertEqual(task.version, 4)
+        self.assertEqual(Task.objects.get(pk=self.task_id).version, 4)
+        self.assertEqual(stats.verify(), {})
@@ -1,7 +1,12 @@
 import json
+from django.core.cache import caches
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APITestCase
+from taskmanager import membership
 from taskmanager.models import Task, User, Project
 from taskmanager.serializers import TaskSerializer
 from taskmanager.utils import JSONResponse
@@ -93,6 +98,8 @@ class TaskTests(APITestCase):
     """
 
     def setUp(self):
+        membership.index.clear()
+
         # Creating managers::
         self.manager_1_data = {
             "username": "manager-1",
@@ -250,6 +257,201 @@ class TaskTests(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(response.data, serializer.data)
 
+    @print_test_data
+    def test_get_project_tasks_in_keyset_pages(self):
+        """
+        Test walking through project tasks page by page with the cursor.
+        """
+        for i in range(4):
+            self.manager_1_proj_1.tasks.create(title=f"task-{i}", creator=self.manager_1)
+        expected_ids = list(
+            self.manager_1_proj_1.tasks.order_by("id").values_list("id", flat=True)
+        )
+
+        self.client.login(
+            username=self.manager_1_data["username"],
+            password=self.manager_1_data["password"],
+        )
+        url = reverse(
+            "get_project_tasks", kwargs={"project_id": self.manager_1_proj_1.pk}
+        )
+        response = self.client.get(url, {"page_size": 3})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([task["id"] for task in response.data], expected_ids[:3])
+        self.assertIn('rel="next"', response["Link"])
+
+        response = self.client.get(url, {"page_size": 3, "cursor": expected_ids[2]})
+        self.assertEqual([task["id"] for task in response.data], expected_ids[3:])
+        self.assertFalse(response.has_header("Link"))
+
+        response = self.client.get(url, {"cursor": "wrong"})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    @print_test_data
+    def test_get_project_tasks_query_count_does_not_grow(self):
+        """
+        Test a page of tasks costs the same number of queries however many
+        tasks and assignees it holds.
+        """
+        self.client.login(
+            username=self.manager_1_data["username"],
+            password=self.manager_1_data["password"],
+        )
+        url = reverse(
+            "get_project_tasks", kwargs={"project_id": self.manager_1_proj_1.pk}
+        )
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as small_page:
+            self.client.get(url)
+
+        for i in range(20):
+            task = self.manager_1_proj_1.tasks.create(
+                title=f"task-{i}", creator=self.manager_1
+            )
+            task.assignee.add(self.developer_1, self.developer_2)
+
+        with CaptureQueriesContext(connection) as big_page:
+            response = self.client.get(url)
+        self.assertEqual(len(response.data), 22)
+        self.assertEqual(len(big_page), len(small_page))
+
+    @print_test_data
+    def test_get_project_tasks_rows_match_serializer(self):
+        """
+        Test the rows built from `.values()` are the `TaskSerializer` output,
+        and `fields` keeps only the requested ones.
+        """
+        self.task_12.description = "a long description"
+        self.task_12.is_done = True
+        self.task_12.save()
+        self.task_12.assignee.add(self.developer_2, self.developer_1)
+        tasks = Task.objects.filter(project=self.manager_1_proj_1).order_by("id")
+        expected = TaskSerializer(tasks, many=True).data
+
+        self.client.login(
+            username=self.manager_1_data["username"],
+            password=self.manager_1_data["password"],
+        )
+        url = reverse(
+            "get_project_tasks", kwargs={"project_id": self.manager_1_proj_1.pk}
+        )
+        response = self.client.get(url)
+        self.assertEqual(json.loads(response.content), json.loads(json.dumps(expected)))
+
+        response = self.client.get(url, {"fields": "assignee,title", "ordering": "-id"})
+        self.assertEqual(
+            response.data,
+            [
+                {"title": task["title"], "assignee": task["assignee"]}
+                for task in reversed(expected)
+            ],
+        )
+
+        response = self.client.get(url, {"fields": "title,secret"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @print_test_data
+    def test_get_project_tasks_not_modified(self):
+        """
+        Test a task list answers 304 to its own ETag until a task changes.
+        """
+        self.client.login(
+            username=self.developer_1_data["username"],
+            password=self.developer_1_data["password"],
+        )
+        url = reverse(
+            "get_project_tasks", kwargs={"project_id": self.manager_1_proj_1.pk}
+        )
+        response = self.client.get(url)
+        etag = response["ETag"]
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertFalse(
+            [query for query in queries if '"taskmanager_task"' in query["sql"]]
+        )
+
+        self.task_12.assignee.add(self.developer_2)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response["ETag"], etag)
+
+    @print_test_data
+    @override_settings(
+        CACHES={
+            "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+            "tasks": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+        },
+        TASK_LIST_CACHE="tasks",
+    )
+    def test_get_project_tasks_from_response_cache(self):
+        """
+        Test a task list page is served from the response cache until a task changes.
+        """
+        self.client.login(
+            username=self.developer_1_data["username"],
+            password=self.developer_1_data["password"],
+        )
+        url = reverse(
+            "get_project_tasks", kwargs={"project_id": self.manager_1_proj_1.pk}
+        )
+        try:
+            first = self.client.get(url, {"page_size": 1})
+            with CaptureQueriesContext(connection) as queries:
+                second = self.client.get(url, {"page_size": 1})
+            self.assertEqual(second.data, first.data)
+            self.assertEqual(second["Link"], first["Link"])
+            self.assertFalse(
+                [query for query in queries if '"taskmanager_task"' in query["sql"]]
+            )
+
+            self.task_11.is_done = True
+            self.task_11.save()
+            third = self.client.get(url, {"page_size": 1})
+            self.assertTrue(third.data[0]["is_done"])
+        finally:
+            caches["tasks"].clear()
+
+    @print_test_data
+    def test_export_project_tasks_as_ndjson(self):
+        """
+        Test streaming the project tasks as NDJSON, in the list serializer shape.
+        """
+        manager_1_proj_tasks = Task.objects.filter(project=self.manager_1_proj_1)
+        serializer = TaskSerializer(manager_1_proj_tasks, many=True)
+
+        self.client.login(
+            username=self.developer_1_data["username"],
+            password=self.developer_1_data["password"],
+        )
+        response = self.client.get(
+            reverse(
+                "export_project_tasks", kwargs={"project_id": self.manager_1_proj_1.pk}
+            )
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        self.assertEqual([json.loads(line) for line in lines], serializer.data)
+
+    @print_test_data
+    def test_prevent_export_project_tasks_by_stranger_developer(self):
+        """
+        Test prevent exporting project tasks by a developer out of the project.
+        """
+        self.client.login(
+            username=self.developer_3_data["username"],
+            password=self.developer_3_data["password"],
+        )
+        response = self.client.get(
+            reverse(
+                "export_project_tasks", kwargs={"project_id": self.manager_1_proj_1.pk}
+            )
+        )
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
     @print_test_data
     def test_create_project_task_by_its_manager(self):
         """
@@ -352,6 +554,171 @@ class TaskTests(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
         self.assertEqual(response.data, JSONResponse.PERMISSION_DENIED)
     
+    @print_test_data
+    def test_bulk_create_project_tasks(self):
+        """
+        Test creating many tasks at once, keeping valid items when others fail.
+        """
+        self.client.login(
+            username=self.developer_1_data["username"],
+            password=self.developer_1_data["password"],
+        )
+        data = {
+            "tasks": [
+                {"title": "bulk-1", "assignee": [self.developer_1.id, self.developer_2.id]},
+                {"title": "x" * 201},
+                {"title": "bulk-3", "assignee": [self.developer_3.id]},
+                {"title": "bulk-4", "is_done": True},
+            ]
+        }
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.post(
+                reverse("bulk_tasks", kwargs={"project_id": self.manager_1_proj_1.id}),
+                data=json.dumps(data),
+                content_type="application/json",
+            )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        # The ids come from the inserts, not from reading the newest tasks back.
+        self.assertFalse([query for query in captured if '"id" DESC' in query["sql"]])
+        self.assertEqual([error["index"] for error in response.data["errors"]], [1, 2])
+
+        created = Task.objects.filter(title__startswith="bulk-").order_by("id")
+        self.assertEqual(response.data["created"], TaskSerializer(created, many=True).data)
+        self.assertEqual(
+            set(created[0].assignee.values_list("id", flat=True)),
+            {self.developer_1.id, self.developer_2.id},
+        )
+        self.assertFalse(created[1].assignee.exists())
+        self.assertEqual(created[0].creator, self.developer_1)
+
+        # Tasks created one by one in between don't take the ids of the next batch.
+        url = reverse("bulk_tasks", kwargs={"project_id": self.manager_1_proj_1.id})
+        for title in ("single-1", "single-2"):
+            self.client.post(
+                reverse("create_task", kwargs={"project_id": self.manager_1_proj_1.id}),
+                data=json.dumps({"title": title}),
+                content_type="application/json",
+            )
+            response = self.client.post(
+                url,
+                data=json.dumps({"tasks": [{"title": f"after-{title}"}, {"title": "last"}]}),
+                content_type="application/json",
+            )
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+            for row in response.data["created"]:
+                self.assertEqual(Task.objects.get(pk=row["id"]).title, row["title"])
+
+    @print_test_data
+    def test_bulk_create_project_tasks_all_or_nothing(self):
+        """
+        Test an atomic bulk create does not create anything if one item fails.
+        """
+        self.client.login(
+            username=self.manager_1_data["username"],
+            password=self.manager_1_data["password"],
+        )
+        data = {
+            "atomic": True,
+            "tasks": [{"title": "bulk-1"}, {"title": "bulk-2", "is_done": "maybe"}],
+        }
+        response = self.client.post(
+            reverse("bulk_tasks", kwargs={"project_id": self.manager_1_proj_1.id}),
+            data=json.dumps(data),
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data["errors"][0]["index"], 1)
+        self.assertFalse(Task.objects.filter(title__startswith="bulk-").exists())
+
+    @print_test_data
+    def test_prevent_bulk_create_by_stranger_manager(self):
+        """
+        Test prevent bulk creating tasks by a manager that is not the project creator.
+        """
+        self.client.login(
+            username=self.manager_2_data["username"],
+            password=self.manager_2_data["password"],
+        )
+        response = self.client.post(
+            reverse("bulk_tasks", kwargs={"project_id": self.manager_1_proj_1.id}),
+            data=json.dumps({"tasks": [{"title": "bulk-1"}]}),
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(response.data, JSONResponse.PERMISSION_DENIED)
+
+    @print_test_data
+    def test_bulk_reassign_project_tasks(self):
+        """
+        Test moving every task of one developer to another one in one request.
+        """
+        self.task_12.assignee.add(self.developer_1)
+        self.client.login(
+            username=self.manager_1_data["username"],
+            password=self.manager_1_data["password"],
+        )
+        data = {
+            "filter": {"assignee": self.developer_1.id},
+            "assignee": {"add": [self.developer_2.id], "remove": [self.developer_1.id]},
+        }
+        response = self.client.patch(
+            reverse("bulk_tasks", kwargs={"project_id": self.manager_1_proj_1.id}),
+            data=json.dumps(data),
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            response.data,
+            {"matched": 2, "updated": 0, "assignees_added": 2, "assignees_removed": 2},
+        )
+        for task in (self.task_11, self.task_12):
+            self.assertEqual(list(task.assignee.all()), [self.developer_2])
+
+    @print_test_data
+    def test_bulk_close_project_tasks(self):
+        """
+        Test setting `is_done` on a list of tasks and replacing their assignees.
+        """
+        self.client.login(
+            username=self.developer_2_data["username"],
+            password=self.developer_2_data["password"],
+        )
+        data = {
+            "filter": {"ids": [self.task_11.id, self.task_12.id]},
+            "is_done": True,
+            "assignee": {"replace": [self.developer_2.id]},
+        }
+        response = self.client.patch(
+            reverse("bulk_tasks", kwargs={"project_id": self.manager_1_proj_1.id}),
+            data=json.dumps(data),
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["updated"], 2)
+        self.assertEqual(response.data["assignees_removed"], 1)
+        self.assertFalse(self.manager_1_proj_1.tasks.filter(is_done=False).exists())
+        self.assertEqual(
+            list(self.task_11.assignee.values_list("id", flat=True)), [self.developer_2.id]
+        )
+
+    @print_test_data
+    def test_preventing_bulk_assign_to_stranger_assignee(self):
+        """
+        Test prevent bulk assigning tasks to a developer out of the project.
+        """
+        self.client.login(
+            username=self.manager_1_data["username"],
+            password=self.manager_1_data["password"],
+        )
+        response = self.client.patch(
+            reverse("bulk_tasks", kwargs={"project_id": self.manager_1_proj_1.id}),
+            data=json.dumps({"assignee": {"add": [self.developer_3.id]}}),
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data, JSONResponse.ASSIGNE_IS_NOT_PROJ_MEMBER)
+        self.assertFalse(self.developer_3.task_set.exists())
+
     @print_test_data
     def test_assign_task_to_another_assignee_by_project_manager(self):
         """
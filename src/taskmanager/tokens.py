@@ -0,0 +1,122 @@
+import secrets
+import time
+
+from django.conf import settings
+from django.core import checks, signing
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+
+from taskmanager.membership import LRUCache
+
+
+# Access and refresh tokens are HMAC-SHA256 signed (with SECRET_KEY) JSON
+# claims: user id, role, expiry time and a random token id. Checking one needs
+# no database; a revoked token id is kept in the deny-list cache until the
+# token would have expired anyway, so the deny-list only holds live tokens.
+# The deny-list cache must be shared by every worker (see
+# `TOKEN_DENY_LIST_CACHE`): a token revoked by one must be refused by all.
+#
+# Each worker remembers what the deny-list said about a token id for
+# `TOKEN_DENY_LIST_CHECK_TTL` seconds, so a token used by many requests costs
+# one deny-list read per worker and period, not one per request. A token
+# revoked by another worker is refused by this one within that delay.
+
+ACCESS = "access"
+REFRESH = "refresh"
+
+_SALTS = {
+    ACCESS: "taskmanager.tokens.access",
+    REFRESH: "taskmanager.tokens.refresh",
+}
+
+
+class InvalidToken(Exception):
+    pass
+
+
+# Token id -> whether the deny-list holds it.
+revocations = LRUCache(
+    maxsize=getattr(settings, "TOKEN_USER_CACHE_SIZE", 10000),
+    ttl=getattr(settings, "TOKEN_DENY_LIST_CHECK_TTL", 5),
+)
+
+
+def _lifetime(kind):
+    if kind == ACCESS:
+        return getattr(settings, "ACCESS_TOKEN_TTL", 300)
+    return getattr(settings, "REFRESH_TOKEN_TTL", 86400)
+
+
+def _deny_list():
+    return caches[getattr(settings, "TOKEN_DENY_LIST_CACHE", "tokens")]
+
+
+def check_deny_list(app_configs, **kwargs):
+    """
+    System check: the deny-list cache is shared by the workers.
+    """
+    alias = getattr(settings, "TOKEN_DENY_LIST_CACHE", "tokens")
+    if alias not in settings.CACHES:
+        return [
+            checks.Error(f"TOKEN_DENY_LIST_CACHE {alias!r} is not in CACHES.", id="taskmanager.E001")
+        ]
+    if isinstance(caches[alias], LocMemCache):
+        return [
+            checks.Error(
+                f"The token deny-list cache {alias!r} is local to each process.",
+                hint="Use a database, memcached or redis cache shared by every worker.",
+                id="taskmanager.E002",
+            )
+        ]
+    return []
+
+
+def make_token(user, kind):
+    claims = {
+        "uid": user.pk,
+        "role": user.user_role,
+        "exp": int(time.time()) + _lifetime(kind),
+        "jti": secrets.token_urlsafe(12),
+    }
+    return signing.Signer(salt=_SALTS[kind]).sign_object(claims)
+
+
+def issue_tokens(user):
+    return {
+        "access": make_token(user, ACCESS),
+        "refresh": make_token(user, REFRESH),
+        "expires_in": _lifetime(ACCESS),
+    }
+
+
+def read_token(token, kind):
+    """
+    Return the claims of a `kind` token, or raise `InvalidToken` if it is
+    forged, expired or revoked.
+    """
+    try:
+        claims = signing.Signer(salt=_SALTS[kind]).unsign_object(token)
+    except (signing.BadSignature, ValueError):
+        raise InvalidToken("Invalid token.")
+    if claims["exp"] <= time.time():
+        raise InvalidToken("Token expired.")
+    revoked = revocations.get(claims["jti"])
+    if revoked is None:
+        revoked = bool(_deny_list().get(f"taskmanager:denied:{claims['jti']}"))
+        revocations.set(claims["jti"], revoked)
+    if revoked:
+        raise InvalidToken("Token revoked.")
+    return claims
+
+
+def revoke(claims):
+    """
+    Revoke the token of `claims`. Returns False if it was already revoked:
+    only one of the requests revoking a token at the same time gets True,
+    the cache adds the key atomically.
+    """
+    ttl = int(claims["exp"] - time.time()) + 1
+    if ttl <= 0:
+        return False
+    revocations.set(claims["jti"], True)
+    return _deny_list().add(f"taskmanager:denied:{claims['jti']}", 1, ttl)
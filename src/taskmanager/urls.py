@@ -1,19 +1,56 @@
 from django.urls import path
-from taskmanager import views
+from taskmanager import async_views, push, views
 
 
 get_task_list = views.TaskView.as_view({"get": "list"})
 create_task = views.TaskView.as_view({"post": "create"})
-update_task = views.TaskView.as_view({"put": "update"})
+update_task = views.TaskView.as_view({"put": "update", "patch": "partial_update"})
+export_tasks = views.TaskView.as_view({"get": "export"})
+search_tasks = views.TaskView.as_view({"get": "search"})
+task_stats = views.TaskView.as_view({"get": "stats"})
+get_user_projects = views.ProjectView.as_view({"get": "list"})
+bulk_tasks = views.TaskView.as_view({"post": "bulk_create", "patch": "bulk_update"})
 
 urlpatterns = [
+    path("projects", get_user_projects, name="get_user_projects"),
     path("projects/<int:project_id>/tasks/", create_task, name="create_task"),
     path("projects/<int:project_id>/tasks", get_task_list, name="get_project_tasks"),
+    path(
+        "projects/<int:project_id>/tasks/search",
+        search_tasks,
+        name="search_project_tasks",
+    ),
+    path(
+        "projects/<int:project_id>/tasks/export",
+        export_tasks,
+        name="export_project_tasks",
+    ),
+    path(
+        "projects/<int:project_id>/tasks/stats",
+        task_stats,
+        name="project_task_stats",
+    ),
     path(
         "projects/<int:project_id>/assignee/<int:assignee_id>/tasks",
         get_task_list,
         name="get_project_assignee_tasks",
     ),
+    path("projects/<int:project_id>/tasks/bulk/", bulk_tasks, name="bulk_tasks"),
     path("projects/<int:project_id>/tasks/<int:pk>/", update_task, name="update_task"),
+    path("projects/<int:project_id>/events", push.task_events, name="project_task_events"),
+    path(
+        "async/projects/<int:project_id>/tasks",
+        async_views.project_tasks,
+        name="async_get_project_tasks",
+    ),
+    path(
+        "async/projects/<int:project_id>/assignee/<int:assignee_id>/tasks",
+        async_views.project_tasks,
+        name="async_get_project_assignee_tasks",
+    ),
     path("projects/signup/", views.CreateUserView.as_view(), name="signup"),
+    path("projects/token/", views.ObtainTokenView.as_view(), name="obtain_token"),
+    path("projects/token/refresh/", views.RefreshTokenView.as_view(), name="refresh_token"),
+    path("projects/token/revoke/", views.RevokeTokenView.as_view(), name="revoke_token"),
+    path("db/pool", views.DatabasePoolView.as_view(), name="db_pool_stats"),
 ]
@@ -1,16 +1,27 @@
 import json
 
 
+class RawJSON(dict):
+    """
+    A payload encoded once, when it is defined: `FastJSONRenderer` writes
+    `encoded` as it is, other renderers see a plain dict.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.encoded = json.dumps(self, ensure_ascii=False, separators=(",", ":")).encode()
+
+
 class JSONResponse:
 
-    PERMISSION_DENIED = json.dumps(
+    PERMISSION_DENIED = RawJSON(
         {
             "message":"You dont have permission."
         }
     )
 
-    ASSIGNE_IS_NOT_PROJ_MEMBER = json.dumps(
+    ASSIGNE_IS_NOT_PROJ_MEMBER = RawJSON(
         {
             "message":"You dont have permission."
         }
-    )
\ No newline at end of file
+    )
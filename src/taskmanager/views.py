@@ -1,21 +1,65 @@
-from taskmanager.models import Project, Task, User
+import json
+
+from taskmanager.models import (
+    AssigneeTaskStats,
+    Project,
+    ProjectTaskStats,
+    StaleTask,
+    Task,
+    User,
+)
 from rest_framework import viewsets
 from taskmanager.serializers import (
+    TaskBulkCreateSerializer,
+    TaskBulkItemSerializer,
+    TaskBulkUpdateSerializer,
+    TaskListFilterSerializer,
+    TaskSearchSerializer,
     TaskUpdateSerializer,
+    TokenObtainSerializer,
+    TokenSerializer,
     UserSignupSerializer,
     ProjectSerializer,
     TaskSerializer,
 )
 
 from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
 from rest_framework import status
 from rest_framework import permissions
 
 from rest_framework.permissions import IsAuthenticated
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Case, F, FilteredRelation, Prefetch, Q, Value, When
+from django.db.models.functions import Coalesce
+from django.http import Http404, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 
+from taskmanager import changes, membership, pool, sharding, tokens
+from taskmanager.authentication import get_user
+from taskmanager.bulk import bulk_create_tasks, bulk_update_tasks
+from taskmanager.caching import (
+    etag_matches,
+    get_cached_task_list,
+    if_match_versions,
+    set_cached_task_list,
+    task_etag,
+    task_list_etag,
+)
+from taskmanager.filters import filter_tasks
+from taskmanager.idempotency import idempotent
+from taskmanager.pagination import KeysetPagination
+from taskmanager.rows import (
+    TASK_LIST_FIELDS,
+    iter_task_rows,
+    task_rows,
+    task_values,
+    value_fields,
+)
+from taskmanager.search import search_task_ids
 from taskmanager.utils import JSONResponse
 from rest_framework.generics import CreateAPIView
+from rest_framework.views import APIView
 
 class CreateUserView(CreateAPIView):
 
@@ -26,48 +70,368 @@ class CreateUserView(CreateAPIView):
     serializer_class = UserSignupSerializer
 
 
+class ObtainTokenView(APIView):
+    """
+    Exchange a username and password for an access and a refresh token.
+    """
+
+    authentication_classes = []
+    permission_classes = [permissions.AllowAny]
+
+    def post(self, request):
+        serializer = TokenObtainSerializer(data=request.data, context={"request": request})
+        serializer.is_valid(raise_exception=True)
+        return Response(tokens.issue_tokens(serializer.validated_data["user"]))
+
+
+class RefreshTokenView(APIView):
+    """
+    Exchange a refresh token for new tokens. The refresh token is revoked,
+    each one can be used once.
+    """
+
+    authentication_classes = []
+    permission_classes = [permissions.AllowAny]
+
+    def post(self, request):
+        serializer = TokenSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        try:
+            claims = tokens.read_token(serializer.validated_data["token"], tokens.REFRESH)
+        except tokens.InvalidToken as exc:
+            return Response({"detail": str(exc)}, status=status.HTTP_401_UNAUTHORIZED)
+        user = get_user(claims["uid"])
+        if user is None or not user.is_active:
+            return Response({"detail": "Invalid token."}, status=status.HTTP_401_UNAUTHORIZED)
+        if not tokens.revoke(claims):
+            # Another request exchanged it in the meantime.
+            return Response({"detail": "Token revoked."}, status=status.HTTP_401_UNAUTHORIZED)
+        return Response(tokens.issue_tokens(user))
+
+
+class RevokeTokenView(APIView):
+    """
+    Revoke an access or a refresh token. Revoking an invalid token does nothing.
+    """
+
+    authentication_classes = []
+    permission_classes = [permissions.AllowAny]
+
+    def post(self, request):
+        serializer = TokenSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        for kind in (tokens.ACCESS, tokens.REFRESH):
+            try:
+                claims = tokens.read_token(serializer.validated_data["token"], kind)
+            except tokens.InvalidToken:
+                continue
+            tokens.revoke(claims)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class DatabasePoolView(APIView):
+    """
+    Statistics of the database connection pools of the process serving the
+    request, by database alias. Staff only.
+    """
+
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        return Response(pool.pool_stats())
+
+
+class ProjectView(viewsets.ViewSet):
+    permission_classes = [IsAuthenticated]
+    pagination_class = KeysetPagination
+
+    def list(self, request):
+        """
+        The projects the user manages or develops in, with their open and
+        done task counts and the open tasks assigned to the user.
+
+        Counts are read from the counters maintained by `taskmanager.stats`,
+        joined to the projects in a single query per shard whatever the
+        number of projects. Projects are returned in pages ordered by id
+        (see `KeysetPagination`).
+        """
+        user = request.user
+        Members = Project.developers.through
+        projects = (
+            Project.objects.live()
+            .filter(
+                Q(manager=user)
+                | Q(pk__in=Members.objects.filter(user=user).values("project_id"))
+            )
+            .annotate(
+                mine=FilteredRelation(
+                    "assignee_task_stats", condition=Q(assignee_task_stats__user=user)
+                ),
+                role=Case(
+                    When(manager=user, then=Value(User.MANAGER)), default=Value(User.DEVELOPER)
+                ),
+                open=Coalesce("task_stats__open_tasks", 0),
+                done=Coalesce("task_stats__done_tasks", 0),
+                my_open=Coalesce("mine__open_tasks", 0),
+            )
+            .values("id", "name", "manager", "role", "open", "done", "my_open")
+        )
+        paginator = self.pagination_class()
+        page = paginator.paginate_querysets(
+            [projects.using(database) for database in sharding.databases()], request
+        )
+        # Users live in the default database, not in the shards.
+        names = dict(
+            User.objects.filter(pk__in={row["manager"] for row in page}).values_list(
+                "id", "username"
+            )
+        )
+        for row in page:
+            row["manager_name"] = names.get(row["manager"])
+            row["total"] = row["open"] + row["done"]
+        return paginator.get_paginated_response(page)
+
+
 class TaskView(viewsets.ViewSet):
     permission_classes = [IsAuthenticated]
+    pagination_class = KeysetPagination
+    export_chunk_size = 1000
+
+    def dispatch(self, request, *args, **kwargs):
+        # The queries of the project tasks go to the shard of the project.
+        self.shard = sharding.database_for(kwargs["project_id"])
+        token = sharding.use_shard(self.shard)
+        try:
+            return super().dispatch(request, *args, **kwargs)
+        finally:
+            sharding.reset_shard(token)
 
     @staticmethod
     def is_user_manager_or_developer(user, project):
-        return user == project.manager or user in project.developers.all()
+        return membership.is_manager_or_developer(user, project)
 
     @staticmethod
     def is_user_task_assignee(user, task):
-        return user in task.assignee.all()
+        return membership.is_task_assignee(user, task)
 
     def list(self, request, project_id, assignee_id=None):
         """
         The method handle below tasks:
             - get projects tasks if there is only project_id in the method arguments.
             - get projects assignee tasks if there is assigne_id in the method arguments.
+
+        Both can be narrowed and ordered with the `TaskListFilterSerializer`
+        query parameters.
+
+        Tasks are returned in pages ordered by id (see `KeysetPagination`),
+        and the assignees of a page are fetched in one batched query.
+
+        Responses carry an ETag derived from `Project.version`, so a client
+        sending it back in `If-None-Match` gets a 304 without the task table
+        being read.
+
+        With `since=<cursor>` only the changes after the cursor are returned
+        (see `read_task_changes`). The cursor to start from is sent in the
+        `X-Sync-Cursor` header of the first page of the full list.
         """
-        project = get_object_or_404(Project, pk=project_id)
+        data, code, headers = self.read_task_list(
+            request, request.user, project_id, assignee_id, request.accepted_media_type
+        )
+        return Response(data, status=code, headers=headers)
+
+    @classmethod
+    def read_task_list(cls, request, user, project_id, assignee_id, media_type):
+        """
+        Build a task list page for `user`, as `(data, status, headers)`.
+        Shared by `list` and its async twin in `taskmanager.async_views`.
+        """
+        project = get_object_or_404(Project.objects.live(), pk=project_id)
         
         # Checking user is not project owner or member
+        if not cls.is_user_manager_or_developer(user, project):
+            return JSONResponse.PERMISSION_DENIED, status.HTTP_401_UNAUTHORIZED, {}
+
+        filters = TaskListFilterSerializer(data=request.query_params.dict())
+        if not filters.is_valid():
+            return filters.errors, status.HTTP_400_BAD_REQUEST, {}
+
+        etag = task_list_etag(project, request, media_type)
+        if etag_matches(request, etag):
+            return None, status.HTTP_304_NOT_MODIFIED, {"ETag": etag}
+        cached = get_cached_task_list(etag)
+        if cached is not None:
+            data, headers = cached
+            return data, status.HTTP_200_OK, headers
+
+        if assignee_id:
+            # Users and memberships may live in different databases.
+            assignee = get_object_or_404(User, pk=assignee_id)
+            if not membership.are_developers(project, [assignee.pk]):
+                raise Http404()
+            queryset = project.tasks.filter(assignee=assignee)
+        else:
+            queryset = project.tasks.all()
+
+        if "since" in filters.validated_data:
+            data, headers = cls.read_task_changes(request, project, queryset, filters.validated_data)
+            headers["ETag"] = etag
+            set_cached_task_list(etag, data, headers)
+            return data, status.HTTP_200_OK, headers
+
+        # Rows are read with `task_values()` and shaped like `TaskSerializer`
+        # output, no model instance is built.
+        fields = filters.validated_data.get("fields", TASK_LIST_FIELDS)
+        ordering = filters.validated_data["ordering"]
+        queryset = task_values(
+            filter_tasks(queryset, filters.validated_data), value_fields(fields, ordering)
+        )
+        paginator = cls.pagination_class()
+        page = paginator.paginate_queryset(queryset, request, ordering=ordering)
+        data = task_rows(page, fields)
+        # Every change up to the version read above is in the list.
+        headers = dict(paginator.get_headers(), ETag=etag)
+        headers["X-Sync-Cursor"] = changes.format_cursor((project.version, None))
+        set_cached_task_list(etag, data, headers)
+        return data, status.HTTP_200_OK, headers
+
+    @classmethod
+    def read_task_changes(cls, request, project, queryset, filters):
+        """
+        The tasks of `queryset` created or changed after the `since` cursor,
+        and the ids of the tasks deleted or no longer matching the list
+        filters, at most a page of them, as `({tasks, deleted, cursor},
+        headers)`. The work is proportional to the number of changes, not
+        to the size of the project.
+        """
+        paginator = cls.pagination_class()
+        events, cursor, more = changes.read_changes(
+            project, filters["since"], paginator.get_page_size(request)
+        )
+        changed_ids = [task_id for task_id, deleted in events if not deleted]
+
+        fields = filters.get("fields", TASK_LIST_FIELDS)
+        rows = task_values(
+            filter_tasks(queryset, filters).filter(id__in=changed_ids), value_fields(fields)
+        )
+        rows_by_id = {row["id"]: row for row in rows}
+        data = {
+            "tasks": task_rows(
+                [rows_by_id[task_id] for task_id in changed_ids if task_id in rows_by_id], fields
+            ),
+            "deleted": [
+                task_id for task_id, deleted in events if deleted or task_id not in rows_by_id
+            ],
+            "cursor": changes.format_cursor(cursor),
+        }
+        headers = {}
+        if more:
+            next_link = replace_query_param(request.build_absolute_uri(), "since", data["cursor"])
+            headers["Link"] = f'<{next_link}>; rel="next"'
+        return data, headers
+
+    def search(self, request, project_id):
+        """
+        Full-text search of the project tasks titles and descriptions.
+
+        Tasks are returned best match first, in pages of `page_size`; the
+        url of the next page is sent in the `Link` header.
+        """
+        project = get_object_or_404(Project.objects.live(), pk=project_id)
+
         if not self.is_user_manager_or_developer(request.user, project):
             return Response(
                 JSONResponse.PERMISSION_DENIED,
                 status=status.HTTP_401_UNAUTHORIZED,
             )
 
-        if assignee_id:
-            assignee = get_object_or_404(User, pk=assignee_id, projects=project)
-            queryset = project.tasks.filter(assignee=assignee)
-        else:
-            queryset = project.tasks.all()
+        params = TaskSearchSerializer(data=request.query_params.dict())
+        if not params.is_valid():
+            return Response(params.errors, status=status.HTTP_400_BAD_REQUEST)
+        page, page_size = params.validated_data["page"], params.validated_data["page_size"]
+
+        ids = search_task_ids(
+            project,
+            params.validated_data["q"],
+            limit=page_size + 1,
+            offset=(page - 1) * page_size,
+        )
+        tasks = Task.objects.filter(id__in=ids[:page_size]).prefetch_related(
+            Prefetch("assignee", queryset=User.objects.only("id"))
+        )
+        tasks_by_id = {task.id: task for task in tasks}
+        serializer = TaskSerializer(
+            [tasks_by_id[task_id] for task_id in ids[:page_size]], many=True
+        )
 
-        serializer = TaskSerializer(queryset, many=True)
-        return Response(serializer.data)
+        headers = {}
+        if len(ids) > page_size:
+            next_link = replace_query_param(request.build_absolute_uri(), "page", page + 1)
+            headers["Link"] = f'<{next_link}>; rel="next"'
+        return Response(serializer.data, headers=headers)
 
+    def export(self, request, project_id):
+        """
+        Stream every task of the project as NDJSON (one task per line).
+
+        Tasks are read in keyset chunks with their assignee ids attached per
+        chunk, so memory stays flat however big the project is and the first
+        lines are sent as soon as the first chunk is read.
+        """
+        project = get_object_or_404(Project.objects.live(), pk=project_id)
+
+        if not self.is_user_manager_or_developer(request.user, project):
+            return Response(
+                JSONResponse.PERMISSION_DENIED,
+                status=status.HTTP_401_UNAUTHORIZED,
+            )
+
+        rows = iter_task_rows(project.tasks.all(), chunk_size=self.export_chunk_size)
+        lines = (json.dumps(row, cls=DjangoJSONEncoder) + "\n" for row in rows)
+        # The lines are read once the view returned.
+        lines = sharding.iterate_in_shard(self.shard, lines)
+        return StreamingHttpResponse(lines, content_type="application/x-ndjson")
+
+    def stats(self, request, project_id):
+        """
+        Open and done task counts of the project and of each of its assignees,
+        read from the counters maintained by `taskmanager.stats`.
+        """
+        project = get_object_or_404(Project.objects.live(), pk=project_id)
+
+        if not self.is_user_manager_or_developer(request.user, project):
+            return Response(
+                JSONResponse.PERMISSION_DENIED,
+                status=status.HTTP_401_UNAUTHORIZED,
+            )
+
+        totals = ProjectTaskStats.objects.filter(project=project).first()
+        open_tasks, done_tasks = (totals.open_tasks, totals.done_tasks) if totals else (0, 0)
+        assignees = (
+            AssigneeTaskStats.objects.filter(project=project)
+            .exclude(open_tasks=0, done_tasks=0)
+            .order_by("user_id")
+            .values_list("user_id", "open_tasks", "done_tasks")
+        )
+        return Response(
+            {
+                "total": open_tasks + done_tasks,
+                "open": open_tasks,
+                "done": done_tasks,
+                "assignees": [
+                    {"assignee": user_id, "total": o + d, "open": o, "done": d}
+                    for user_id, o, d in assignees
+                ],
+            }
+        )
+
+    @idempotent
     def create(self, request, project_id):
         serializer = TaskSerializer(data=request.data)
         serializer.initial_data["project"] = project_id
         if not serializer.is_valid():
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
-        project = get_object_or_404(Project, pk=project_id)
+        project = get_object_or_404(Project.objects.live(), pk=project_id)
 
         if not self.is_user_manager_or_developer(request.user, project):
             return Response(
@@ -77,23 +441,138 @@ class TaskView(viewsets.ViewSet):
 
         # If the assignee is not one of the project developers.
         assignee = serializer.validated_data.get("assignee")
-        if assignee and not set(assignee).issubset(project.developers.all()):
+        if assignee and not membership.are_developers(project, [user.pk for user in assignee]):
             return Response(
                 JSONResponse.ASSIGNE_IS_NOT_PROJ_MEMBER, status=status.HTTP_400_BAD_REQUEST
             )
 
-        serializer.save(creator=request.user)
-        return Response(serializer.data, status=status.HTTP_201_CREATED)
+        # The task counters are updated by signals, in the same transaction,
+        # and the change is stamped at its end.
+        with changes.recording():
+            task = serializer.save(creator=request.user)
+        return Response(
+            serializer.data, status=status.HTTP_201_CREATED, headers={"ETag": task_etag(task)}
+        )
+
+    @idempotent
+    def bulk_create(self, request, project_id):
+        """
+        Create many tasks of one project in a single request.
+
+        Permission and the assignees of the project are checked once for the
+        whole batch. Every item is validated on its own and reported by its
+        index in `errors`; valid items are still created unless `atomic` is
+        set, in which case any error rejects the whole batch.
+        """
+        project = get_object_or_404(Project.objects.live(), pk=project_id)
+
+        if not self.is_user_manager_or_developer(request.user, project):
+            return Response(
+                JSONResponse.PERMISSION_DENIED,
+                status=status.HTTP_401_UNAUTHORIZED,
+            )
 
-    def update(self, request, project_id, pk=None):
-        task = get_object_or_404(Task, pk=pk)
-        project = get_object_or_404(Project, pk=project_id)
-        serializer = TaskUpdateSerializer(task, data=request.data)
+        batch = TaskBulkCreateSerializer(data=request.data)
+        if not batch.is_valid():
+            return Response(batch.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        validated, errors = {}, []
+        for index, item in enumerate(batch.validated_data["tasks"]):
+            serializer = TaskBulkItemSerializer(data=item)
+            if serializer.is_valid():
+                validated[index] = serializer.validated_data
+            else:
+                errors.append({"index": index, "errors": serializer.errors})
+
+        developer_ids = membership.developer_ids_among(
+            project,
+            [user_id for item in validated.values() for user_id in item.get("assignee", [])],
+        )
+        items = []
+        for index, item in validated.items():
+            if set(item.get("assignee", [])) <= developer_ids:
+                items.append(item)
+            else:
+                errors.append(
+                    {
+                        "index": index,
+                        "errors": {"assignee": ["Assignees must be project developers."]},
+                    }
+                )
+        errors.sort(key=lambda error: error["index"])
+
+        if errors and batch.validated_data["atomic"]:
+            return Response(
+                {"created": [], "errors": errors}, status=status.HTTP_400_BAD_REQUEST
+            )
+
+        created = bulk_create_tasks(project, request.user, items)
+        return Response({"created": created, "errors": errors}, status=status.HTTP_201_CREATED)
+
+    @idempotent
+    def bulk_update(self, request, project_id):
+        """
+        Set `is_done` and/or replace, add or remove assignees on every task
+        of the project matching `filter` (task ids, current assignee, done
+        state), in one transaction of set-based statements.
+
+        The response reports how many rows were affected instead of
+        re-serializing the tasks.
+        """
+        project = get_object_or_404(Project.objects.live(), pk=project_id)
+
+        if not self.is_user_manager_or_developer(request.user, project):
+            return Response(
+                JSONResponse.PERMISSION_DENIED,
+                status=status.HTTP_401_UNAUTHORIZED,
+            )
+
+        serializer = TaskBulkUpdateSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        assignee = serializer.validated_data.get("assignee", {})
+        new_assignees = set(assignee.get("replace", [])) | set(assignee.get("add", []))
+        if new_assignees and not membership.are_developers(project, new_assignees):
+            return Response(
+                JSONResponse.ASSIGNE_IS_NOT_PROJ_MEMBER, status=status.HTTP_400_BAD_REQUEST
+            )
+
+        counts = bulk_update_tasks(
+            project,
+            serializer.validated_data.get("filter", {}),
+            is_done=serializer.validated_data.get("is_done"),
+            replace=assignee.get("replace"),
+            add=assignee.get("add"),
+            remove=assignee.get("remove"),
+        )
+        return Response(counts)
+
+    @idempotent
+    def update(self, request, project_id, pk=None, partial=False):
+        """
+        Update a task: every field with PUT, the fields sent with PATCH.
+
+        With an `If-Match` header holding the `ETag` of the task (its
+        `version`), the task is only updated if it didn't change since: the
+        version is checked by the UPDATE statement itself, so a concurrent
+        edit gets a 412 without any row being locked up front. Without the
+        header the last writer wins.
+        """
+        project = get_object_or_404(Project.objects.live(), pk=project_id)
+        task = get_object_or_404(Task, pk=pk, project=project)
+        expected_versions = if_match_versions(request)
+        serializer = TaskUpdateSerializer(
+            task,
+            data=request.data,
+            partial=partial,
+            context={"expected_versions": expected_versions},
+        )
         if not serializer.is_valid():
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
         assignee = serializer.validated_data.get("assignee")
-        if assignee and not set(assignee).issubset(project.developers.all()):
+        if assignee and not membership.are_developers(project, [user.pk for user in assignee]):
             return Response(
                 JSONResponse.ASSIGNE_IS_NOT_PROJ_MEMBER, status=status.HTTP_400_BAD_REQUEST
             )
@@ -106,6 +585,17 @@ class TaskView(viewsets.ViewSet):
                 status=status.HTTP_401_UNAUTHORIZED,
             )
 
-        serializer.save()
-        return Response(serializer.data, status=status.HTTP_201_CREATED)
+        try:
+            with changes.recording():
+                serializer.save()
+        except StaleTask:
+            return Response(
+                {"detail": "The task was changed since this version."},
+                status=status.HTTP_412_PRECONDITION_FAILED,
+            )
+        return Response(
+            serializer.data, status=status.HTTP_201_CREATED, headers={"ETag": task_etag(task)}
+        )
 
+    def partial_update(self, request, project_id, pk=None):
+        return self.update(request, project_id, pk, partial=True)